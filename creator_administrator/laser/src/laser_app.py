@@ -10,6 +10,8 @@ from src.app import MainWindow
 from src.qmessagebox import WarningQMessageBox
 from src.threaded_mail_manager import ThreadedMailManager
 from src.qdialog import FilesSelectQDialog, FolderSelectQDialog
+from src.fs_scanner import scan_directories
+from src.imap_pool import close_imap_pools
 
 from laser_job_tracker import LaserJobTracker
 from laser_settings_dialog import LaserSettingsQDialog
@@ -29,6 +31,7 @@ class LaserMainWindow(MainWindow):
         self.job_tracker = LaserJobTracker(parent=self)
         self.job_tracker.checkHealth()
         self.refreshAllWidgets()
+        self.startJobFolderWatcher()
 
 
         # menu bar actions
@@ -39,7 +42,8 @@ class LaserMainWindow(MainWindow):
 
         self.menuSettings.setToolTipsVisible(True)
         self.editSettingsAction.triggered.connect(self.openEditSettingsDialog)
-        self.checkHealthAction.triggered.connect(self.checkHealth)
+        self.checkHealthAction.triggered.connect(lambda: self.checkHealth())
+        self.fullCheckHealthAction.triggered.connect(lambda: self.checkHealth(full_rescan=True))
 
 
     def handleNewValidMails(self):
@@ -76,30 +80,32 @@ class LaserMainWindow(MainWindow):
                 WarningQMessageBox(self, gv, text='<Folder> does not exist')
                 return
 
-            for subfolder in os.listdir(folder_global_path):
+            # list the folder and all subfolders at once
+            folder_model = scan_directories([folder_global_path], depth=1)
+
+            for subfolder in folder_model.listFolders(folder_global_path):
                 subfolder_global_path = os.path.join(folder_global_path, subfolder)
 
-                if os.path.isdir(subfolder_global_path):
-                    files_in_subfolder_global_paths = []
-                    subfolder_contains_laser_file = False
+                files_in_subfolder_global_paths = []
+                subfolder_contains_laser_file = False
 
-                    for item in os.listdir(subfolder_global_path):
-                        item_global_path = os.path.join(subfolder_global_path, item)
-                        if os.path.isdir(item_global_path):
-                            WarningQMessageBox(self, gv, text=f'{subfolder_global_path} contains a folder '\
-                                f'{item_global_path} which is skipped' )
-                            continue
+                for item, item_is_dir in folder_model.listEntries(subfolder_global_path):
+                    item_global_path = os.path.join(subfolder_global_path, item)
+                    if item_is_dir:
+                        WarningQMessageBox(self, gv, text=f'{subfolder_global_path} contains a folder '\
+                            f'{item_global_path} which is skipped' )
+                        continue
 
-                        if item_global_path.lower().endswith(gv['ACCEPTED_EXTENSIONS']):
-                            files_in_subfolder_global_paths.append(item_global_path)
-                            subfolder_contains_laser_file = True
+                    if item_global_path.lower().endswith(gv['ACCEPTED_EXTENSIONS']):
+                        files_in_subfolder_global_paths.append(item_global_path)
+                        subfolder_contains_laser_file = True
 
-                    if subfolder_contains_laser_file:
-                        files_global_paths_list.append(files_in_subfolder_global_paths)
-                        job_name_list.append(project_name+'_'+os.path.basename(subfolder))
-                    else:
-                        WarningQMessageBox(self, gv, text=f'No laser file found in {subfolder_global_path}'\
-                                f' skip this subfolder')
+                if subfolder_contains_laser_file:
+                    files_global_paths_list.append(files_in_subfolder_global_paths)
+                    job_name_list.append(project_name+'_'+os.path.basename(subfolder))
+                else:
+                    WarningQMessageBox(self, gv, text=f'No laser file found in {subfolder_global_path}'\
+                            f' skip this subfolder')
 
             if len(job_name_list) > 0:
                 CreateLaserJobsFromFileSystemQDialog(self,
@@ -120,6 +126,7 @@ class LaserMainApp(QApplication):
 
     def __init__(self, argv: list[str]) -> None:
         super().__init__(argv)
+        self.aboutToQuit.connect(close_imap_pools)
 
     def build(self):
         main_window = LaserMainWindow()
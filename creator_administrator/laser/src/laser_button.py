@@ -33,8 +33,9 @@ class LaserKlaarQPushButton(JobsQPushButton):
                                  yes_button_text='Proceed', no_button_text='Cancel').answer():
                 return
         
-        job_tracker.updateJobKey('status', job_name, 'VERWERKT')
-        job_tracker.markFilesAsDone(job_name=job_name, file_global_path=None, done=True, all_files_done=True)
+        with job_tracker.transaction():
+            job_tracker.updateJobKey('status', job_name, 'VERWERKT')
+            job_tracker.markFilesAsDone(job_name=job_name, file_global_path=None, done=True, all_files_done=True)
 
         sender_name = job_tracker.getJobValue('sender_name', job_name)
         self.window().refreshAllWidgets()
@@ -73,42 +74,56 @@ class MateriaalKlaarQPushButton(JobsQPushButton):
         else:
             return
 
-        for file_global_path in files_global_paths:
-            # find job_name
-            job_name = self.job_tracker.fileGlobalPathToJobName(file_global_path)
+        # read and write the tracker once for all selected files, no dialogs while the transaction is open
+        finished_job_names = []
+        with self.job_tracker.transaction():
+            for file_global_path in files_global_paths:
+                # find job_name
+                job_name = self.job_tracker.fileGlobalPathToJobName(file_global_path)
 
-            # material done, mark it done
-            self.job_tracker.markFilesAsDone(job_name=job_name,
-                                            file_global_path=file_global_path,
-                                            done=True)
+                # material done, mark it done
+                self.job_tracker.markFilesAsDone(job_name=job_name,
+                                                file_global_path=file_global_path,
+                                                done=True)
 
-            # if all is done, display message
-            if self.job_tracker.isJobDone(job_name):
-                # hey this material is done!
+                if self.job_tracker.isJobDone(job_name) and job_name not in finished_job_names:
+                    finished_job_names.append(job_name)
 
-                job_folder_global_path = self.job_tracker.getJobValue('job_folder_global_path', job_name)
-                sender_name = self.job_tracker.getJobValue('sender_name', job_name)
+        # hey this material is done! a job whose mail file is in use stays in the wachtrij
+        verwerkt_job_names = []
+        for job_name in finished_job_names:
+            job_folder_global_path = self.job_tracker.getJobValue('job_folder_global_path', job_name)
+            sender_name = self.job_tracker.getJobValue('sender_name', job_name)
 
-                if is_file_locked(MailManager(gv).getMailGlobalPathFromFolder(job_folder_global_path)):
-                    if not YesOrNoMessageBox(self, f'Another program is using the mail file for {sender_name}, close it and proceed.',
-                                        yes_button_text='Proceed', no_button_text='Cancel').answer():
-                        return
+            if is_file_locked(MailManager(gv).getMailGlobalPathFromFolder(job_folder_global_path)):
+                if not YesOrNoMessageBox(self, f'Another program is using the mail file for {sender_name}, close it and proceed.',
+                                    yes_button_text='Proceed', no_button_text='Cancel').answer():
+                    continue
 
+            verwerkt_job_names.append(job_name)
+
+        with self.job_tracker.transaction():
+            for job_name in verwerkt_job_names:
                 self.job_tracker.updateJobKey('status', job_name, 'VERWERKT')
-                done_files = ''
-                for laser_file_dict in self.job_tracker.getJobDict(job_name)['make_files'].values():
-                    done_files += laser_file_dict['file_name']+'\n'
-                InfoQMessageBox(self, f'For {sender_name} put into Uitgifterek:\n{done_files}')
-            
-                if not any([file.lower().endswith(('.msg', '.eml')) for file in os.listdir(job_folder_global_path)]): # pylint: disable=use-a-generator
-                    WarningQMessageBox(gv=gv, parent=self, text='No Job finished mail send because: No mail file found')
-                else:
-                    ThreadedMailManager(parent=self, gv=gv).startMailWorker(
-                            sender_name=sender_name,
-                            mail_type='FINISHED',
-                            mail_item=job_folder_global_path)
 
-        
+        for job_name in verwerkt_job_names:
+            job_dict = self.job_tracker.getJobDict(job_name)
+            job_folder_global_path = job_dict['job_folder_global_path']
+            sender_name = job_dict['sender_name']
+
+            done_files = ''
+            for laser_file_dict in job_dict['make_files'].values():
+                done_files += laser_file_dict['file_name']+'\n'
+            InfoQMessageBox(self, f'For {sender_name} put into Uitgifterek:\n{done_files}')
+
+            if not any([file.lower().endswith(('.msg', '.eml')) for file in os.listdir(job_folder_global_path)]): # pylint: disable=use-a-generator
+                WarningQMessageBox(gv=gv, parent=self, text='No Job finished mail send because: No mail file found')
+            else:
+                ThreadedMailManager(parent=self, gv=gv).startMailWorker(
+                        sender_name=sender_name,
+                        mail_type='FINISHED',
+                        mail_item=job_folder_global_path)
+
         self.window().refreshAllWidgets()
         self.parent().parent().setCurrentIndex(0)
 
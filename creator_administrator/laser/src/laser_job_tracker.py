@@ -1,5 +1,5 @@
-import json
 import os
+import copy
 from datetime import datetime
 
 from PyQt6.QtWidgets import QWidget
@@ -52,6 +52,7 @@ class LaserJobTracker(JobTracker):
                             'dynamic_job_name': str(datetime.now().strftime("%d-%m"))+'_'+job_name,
                             'status': status,
                             'created_on_date': str(datetime.now().strftime("%d-%m-%Y")),
+                            'created_on_timestamp': datetime.now().timestamp(),
                             'make_files': make_files}
 
             if sender_mail_adress is not None:
@@ -59,59 +60,39 @@ class LaserJobTracker(JobTracker):
             if sender_mail_receive_time is not None:
                 add_job_dict['sender_mail_receive_time'] = str(sender_mail_receive_time)
 
-        self.tracker_dict[job_name] = add_job_dict
+        # the tracker keeps its own copy, the caller can keep changing its dicts
+        stored_job_dict = copy.deepcopy(add_job_dict)
 
-        self.writeTrackerFile()
+        def setJob(tracker_dict: dict):
+            tracker_dict[job_name] = stored_job_dict
+
+        self.applyMutation(setJob, changed_job_names=[job_name])
 
     def getExistingMaterials(self) -> set:
         ''' Return all materials that exist in the jobs with a wachtrij status. '''
-        with open(self.tracker_file_path, 'r' ) as tracker_file:
-            tracker_dict = json.load(tracker_file)
-
-        materials = set()
-        for job_dict in tracker_dict.values():
-            if job_dict['status'] == 'WACHTRIJ':
-                for laser_file_dict in job_dict['make_files'].values():
-                    materials.add(laser_file_dict['material'])
-                    
-        return materials
+        return set(self.queryMakeFiles(where={'status': 'WACHTRIJ'}, fields='material'))
 
     def getMaterialAndThicknessList(self) -> list:
         ''' Return all materials and thickness with status WACHTRIJ. '''
 
-        with open(self.tracker_file_path, 'r' ) as tracker_file:
-            tracker_dict = json.load(tracker_file)
+        self.readTrackerFile()
 
-        materials_and_thickness_set = set()
-        for job_dict in tracker_dict.values():
-            if job_dict['status'] == 'WACHTRIJ':
-                for laser_file_dict in job_dict['make_files'].values():
-                    if not laser_file_dict['done']:
-                        materials_and_thickness_set.add(
-                                laser_file_dict['material']+'_'+laser_file_dict['thickness']+'mm')
-                    
-        return list(materials_and_thickness_set)
+        return [material+'_'+thickness+'mm' for material, thickness
+                in self.tracker_index.getMaterialKeysNotDone('WACHTRIJ')]
 
     def getLaserFilesWithMaterialThicknessInfo(self, material: str, thickness: str) -> list:
         ''' Return all names, global paths and indication if they are done
         of material with thickness and status WACHTRIJ. '''
 
-        with open(self.tracker_file_path, 'r' ) as tracker_file:
-            tracker_dict = json.load(tracker_file)
+        return self.queryMakeFiles(where={'status': 'WACHTRIJ', 'material': material, 'thickness': thickness},
+                                   fields=('file_key', 'file_global_path', 'done'))
 
-        laser_file_info_list = []
-        for job_dict in tracker_dict.values():
-            if job_dict['status'] == 'WACHTRIJ':
-                for key, laser_file_dict in job_dict['make_files'].items():
-                    if laser_file_dict['material'] == material and laser_file_dict['thickness'] == thickness:
-                        laser_file_info_list.append((key,
-                                                    laser_file_dict['file_global_path'],
-                                                    laser_file_dict['done']))
-        return laser_file_info_list 
 
+    def checkHealth(self, full_rescan=False):
+        ''' Synchonize job tracker and files on file system.
 
-    def checkHealth(self):
-        ''' Synchonize job tracker and files on file system. '''
+        Only the folders that changed since the last health check are listed, unless full_rescan.
+        '''
 
         self.system_healthy = True
 
@@ -121,16 +102,29 @@ class LaserJobTracker(JobTracker):
         if not os.path.exists(gv['JOBS_DIR_HOME']):
             os.mkdir(gv['JOBS_DIR_HOME'])
 
-        self.deleteOldJobs()
+        with self.directory_snapshot.check(full_rescan=full_rescan):
+            with self.transaction():
+                self.archiveFinishedJobs()
+                self.deleteOldJobs()
 
-        self.deleteNonExitentJobsFromTrackerFile()
-        self.deleteNonExitentFilesFromTrackerFile()
+                self.scanJobFolders()
+                self.deleteNonExitentJobsFromTrackerFile()
+                self.moveRenamedFilesInTrackerFile()
+                self.deleteNonExitentFilesFromTrackerFile()
 
-        # import here, importing at begin of file creates a circular import error
-        # pylint: disable=import-outside-toplevel
-        from laser_qdialog import CreateLaserJobsFromFileSystemQDialog
+            # import here, importing at begin of file creates a circular import error
+            # pylint: disable=import-outside-toplevel
+            from laser_qdialog import CreateLaserJobsFromFileSystemQDialog
 
-        self.addNewJobstoTrackerFile(CreateLaserJobsFromFileSystemQDialog)
-        self.addNewFilestoTrackerFile(CreateLaserJobsFromFileSystemQDialog)
+            self.addNewJobstoTrackerFile(CreateLaserJobsFromFileSystemQDialog)
+            self.addNewFilestoTrackerFile(CreateLaserJobsFromFileSystemQDialog)
 
         self.makeBackup()
+        self.hashMakeFiles()
+
+    def checkChangedFolders(self, changed_folder_paths: list):
+        ''' Synchronize job tracker with the job folders that changed. '''
+
+        # pylint: disable=import-outside-toplevel
+        from laser_qdialog import CreateLaserJobsFromFileSystemQDialog
+        self.reconcileChangedFolders(changed_folder_paths, CreateLaserJobsFromFileSystemQDialog)
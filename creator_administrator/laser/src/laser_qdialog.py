@@ -158,7 +158,7 @@ class CreateLaserJobsFromMailQDialog(CreateJobsFromMailQDialog):
                 mail_type='RECEIVED',
                 mail_item=msg,
                 move_mail_to_verwerkt=True,
-                template_content= {"{jobs_in_queue}": self.job_tracker.getNumberOfJobsWithStatus(['WACHTRIJ'])},
+                template_content= {"{jobs_in_queue}": self.job_tracker.getStats()['jobs_in_queue']},
                 sender_mail_adress=sender_mail_adress,
                 sender_mail_receive_time=sender_mail_receive_time)
 
@@ -3,34 +3,24 @@ from functools import partial
 from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import QStackedWidget, QListWidgetItem, QLabel, QTabWidget, QWidget, QDialog
 
-from src.qlist_widget import OverviewQListWidget, ContentQListWidget, JobContentQListWidget
+from src.qlist_widget import OverviewQListWidget, JobsOverviewQListWidget, ContentQListWidget, JobContentQListWidget
+from src.tracker_events import TRACKER_RELOADED
+from src.qmessagebox import YesOrNoMessageBox
 
 from global_variables import gv
 from convert import split_material_name
 from laser_job_tracker import LaserJobTracker
 
-class LaserAllJobsOverviewQListWidget(OverviewQListWidget):
+class LaserAllJobsOverviewQListWidget(JobsOverviewQListWidget):
 
     def __init__(self, parent: QWidget, *args, **kwargs):
         super().__init__(parent, gv, LaserJobTracker(self), *args, **kwargs)
 
         self.refresh()
 
-    def refresh(self):
-        ''' Initialise the list widget with jobs. '''
-        self.clear()
-        self.initialize(self.job_tracker.getStaticAndDynamicJobNames())
-
-    def refreshWithMatch(self, match_str: str):
-        ''' Initialise with all jobs that match match_str. '''
-        self.clear()
-        self.initialize(self.job_tracker.getStaticAndDynamicJobNames(filter_jobs_on='match', filter_str=match_str))
-
     def displayItem(self, item_name: str):
         ''' Display the job page and load content for the highlighted job. '''
 
-        job_status = self.job_tracker.getJobDict(item_name)['status']
-
         main_window = self.parent().window()
 
         # A dialog with this list in it embedded should set self.main_window
@@ -38,6 +28,14 @@ class LaserAllJobsOverviewQListWidget(OverviewQListWidget):
             main_window = self.main_window
             self.window().close() # close dialog
 
+        if self.job_tracker.isJobArchived(item_name):
+            if not YesOrNoMessageBox(main_window, f'{item_name} is archived, do you want to restore it?').answer():
+                return
+            self.job_tracker.restoreArchivedJob(item_name)
+            main_window.refreshAllWidgets()
+
+        job_status = self.job_tracker.getJobDict(item_name)['status']
+
         # find QStackedWidget for job_status
         stacked_widget = main_window.findChild(
                 QStackedWidget,
@@ -53,19 +51,15 @@ class LaserAllJobsOverviewQListWidget(OverviewQListWidget):
         tab_widget = main_window.findChild(QTabWidget, 'jobsQTabWidget')
         tab_widget.setCurrentIndex(gv['TAB_QSTACK_POSITIONS'][job_status]['tab_widget_position'])
 
-class LaserWachtrijJobsOverviewQListWidget(OverviewQListWidget):
+class LaserWachtrijJobsOverviewQListWidget(JobsOverviewQListWidget):
+
+    job_status = 'WACHTRIJ'
 
     def __init__(self, parent: QWidget, *args, **kwargs):
         super().__init__(parent, gv, LaserJobTracker(self), *args, **kwargs)
 
         self.refresh()
 
-    def refresh(self):
-        ''' Initialise the list widget with jobs. '''
-        self.clear()
-        self.initialize(LaserJobTracker(self).getStaticAndDynamicJobNames(
-            filter_jobs_on='status', filter_str='WACHTRIJ'))
-
 class LaserMaterialOverviewQListWidget(OverviewQListWidget):
 
     def __init__(self, parent: QWidget, *args, **kwargs):
@@ -95,35 +89,34 @@ class LaserMaterialOverviewQListWidget(OverviewQListWidget):
         self.clear()
         self.initialize(self.getItemNames())
 
+    def applyTrackerEvents(self, events: list):
+        ''' Insert or remove only the materials that appeared or disappeared. '''
+        if any(event.kind == TRACKER_RELOADED for event in events):
+            self.refresh()
+        else:
+            self.syncItems(self.getItemNames())
+
 
 
-class LaserVerwerktJobsOverviewQListWidget(OverviewQListWidget):
+class LaserVerwerktJobsOverviewQListWidget(JobsOverviewQListWidget):
+
+    job_status = 'VERWERKT'
 
     def __init__(self, parent: QWidget, *args, **kwargs):
         super().__init__(parent, gv, LaserJobTracker(self), *args, **kwargs)
 
         self.refresh()
 
-    def refresh(self):
-        ''' Initialise the list widget with jobs. '''
-        self.clear()
-        self.initialize(LaserJobTracker(self).getStaticAndDynamicJobNames(
-            filter_jobs_on='status', filter_str='VERWERKT'))
 
+class LaserAfgekeurdJobsOverviewQListWidget(JobsOverviewQListWidget):
 
-class LaserAfgekeurdJobsOverviewQListWidget(OverviewQListWidget):
+    job_status = 'AFGEKEURD'
 
     def __init__(self, parent: QWidget, *args, **kwargs):
         super().__init__(parent, gv, LaserJobTracker(self), *args, **kwargs)
 
         self.refresh()
 
-    def refresh(self):
-        ''' Initialise the list widget with jobs. '''
-        self.clear()
-        self.initialize(LaserJobTracker(self).getStaticAndDynamicJobNames(
-            filter_jobs_on='status', filter_str='AFGEKEURD'))
-
 class LaserJobContentQListWidget(JobContentQListWidget):
 
     def __init__(self, parent: QWidget, *args, **kwargs):
@@ -150,10 +143,39 @@ class LaserMaterialContentQListWidget(ContentQListWidget):
         for (dxf_name, dxf_global_path, done) in laser_file_info_list:
 
             if not done:
-                item = QListWidgetItem()
-                item.setData(1, dxf_global_path)
-                item.setFont(QFont('Cantarell', 14))
+                self.addItem(self.createItem(dxf_name, dxf_global_path))
+
+    def createItem(self, dxf_name: str, dxf_global_path: str) -> QListWidgetItem:
+        ''' Return an item for a laser file that is not done. '''
+        item = QListWidgetItem()
+        item.setData(1, dxf_global_path)
+        item.setFont(QFont('Cantarell', 14))
+
+        # Indicate if done with emotico
+        item.setText('❌ '+dxf_name)
+        return item
+
+    def applyTrackerEvents(self, events: list):
+        ''' Insert or remove only the laser files that were marked (not) done, added or removed. '''
+
+        if self.current_item_name is None:
+            return
+
+        if any(event.kind == TRACKER_RELOADED for event in events):
+            self.refresh()
+            return
+
+        material, thickness = split_material_name(self.current_item_name)
+        laser_file_info_list = LaserJobTracker(
+                self).getLaserFilesWithMaterialThicknessInfo(material, thickness)
+        wanted_files = {dxf_global_path: dxf_name for (dxf_name, dxf_global_path, done)
+                        in laser_file_info_list if not done}
+
+        for row in reversed(range(self.count())):
+            if self.item(row).data(1) not in wanted_files:
+                self.takeItem(row)
+            else:
+                wanted_files.pop(self.item(row).data(1))
 
-                # Indicate if done with emotico
-                item.setText('❌ '+dxf_name)
-                self.addItem(item)
+        for dxf_global_path, dxf_name in wanted_files.items():
+            self.addItem(self.createItem(dxf_name, dxf_global_path))
@@ -141,6 +141,41 @@ with open(settings_file_path, 'r') as settings_file:
     gv['DEFAULT_PRINTER_NAME'] = gv_data['DEFAULT_PRINTER_NAME']
 
     gv['DAYS_TO_KEEP_JOBS'] = int(gv_data['DAYS_TO_KEEP_JOBS'])
+
+    # archiving finished jobs is disabled if the setting is missing
+    if 'ARCHIVE_FINISHED_JOBS_AFTER_DAYS' in gv_data:
+        gv['ARCHIVE_FINISHED_JOBS_AFTER_DAYS'] = int(gv_data['ARCHIVE_FINISHED_JOBS_AFTER_DAYS'])
+
+    if 'TRACKER_BACKEND' in gv_data:
+        assert gv_data['TRACKER_BACKEND'] in ('json', 'sqlite', 'journal'),\
+            f"TRACKER_BACKEND should be 'json', 'sqlite' or 'journal', not {gv_data['TRACKER_BACKEND']}"
+        gv['TRACKER_BACKEND'] = gv_data['TRACKER_BACKEND']
+    else:
+        gv['TRACKER_BACKEND'] = 'json'
+
+    # incremental tracker backups, a full backup every TRACKER_BACKUP_FULL_EVERY backups
+    if 'TRACKER_BACKUPS_TO_KEEP' in gv_data:
+        gv['TRACKER_BACKUPS_TO_KEEP'] = int(gv_data['TRACKER_BACKUPS_TO_KEEP'])
+    else:
+        gv['TRACKER_BACKUPS_TO_KEEP'] = 30
+
+    if 'TRACKER_BACKUP_FULL_EVERY' in gv_data:
+        gv['TRACKER_BACKUP_FULL_EVERY'] = int(gv_data['TRACKER_BACKUP_FULL_EVERY'])
+    else:
+        gv['TRACKER_BACKUP_FULL_EVERY'] = 10
+
+    if 'TRACKER_FORMAT' in gv_data:
+        assert gv_data['TRACKER_FORMAT'] in ('json', 'compact_json', 'marshal'),\
+            f"TRACKER_FORMAT should be 'json', 'compact_json' or 'marshal', not {gv_data['TRACKER_FORMAT']}"
+        gv['TRACKER_FORMAT'] = gv_data['TRACKER_FORMAT']
+    else:
+        gv['TRACKER_FORMAT'] = 'json'
+
+    # reconcile changes in the job folders as they happen, next to the health check
+    if 'WATCH_JOB_FOLDERS' in gv_data:
+        gv['WATCH_JOB_FOLDERS'] = gv_data['WATCH_JOB_FOLDERS'] == 'true'
+    else:
+        gv['WATCH_JOB_FOLDERS'] = True
     gv['DARK_THEME'] = gv_data['DARK_THEME'] == 'true'
 
 
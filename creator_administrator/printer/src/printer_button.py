@@ -39,8 +39,6 @@ class GeslicedQPushButton(JobsQPushButton):
             WarningQMessageBox(self, gv, f'warning! no {gv["SLICED_FILE_EXTENSIONS"]} files detected, slice make files first')
             return
 
-        job_tracker.updateJobKey('status', job_name, 'GESLICED')
-
         # Rename GCODE 
         for sliced_file in sliced_files:
             try:
@@ -50,9 +48,11 @@ class GeslicedQPushButton(JobsQPushButton):
             except Exception:
                 pass # simply do not rename then
     
-        job_tracker.updateJobKey('dynamic_job_name', job_name,
-                get_date_from_dynamic_job_name(job_dict['dynamic_job_name'])+
-                gcode_files_to_max_print_time(sliced_files)+job_name)
+        with job_tracker.transaction():
+            job_tracker.updateJobKey('status', job_name, 'GESLICED')
+            job_tracker.updateJobKey('dynamic_job_name', job_name,
+                    get_date_from_dynamic_job_name(job_dict['dynamic_job_name'])+
+                    gcode_files_to_max_print_time(sliced_files)+job_name)
 
         self.window().refreshAllWidgets()
         self.parent().parent().setCurrentIndex(0)
@@ -124,8 +124,9 @@ class PrintKlaarQPushButton(JobsQPushButton):
                             yes_button_text='Proceed', no_button_text='Cancel').answer():
                 return
 
-        job_tracker.updateJobKey('status', job_name, 'VERWERKT')
-        job_tracker.markFilesAsDone(job_name=job_name, file_global_path=None, done=True, all_files_done=True)
+        with job_tracker.transaction():
+            job_tracker.updateJobKey('status', job_name, 'VERWERKT')
+            job_tracker.markFilesAsDone(job_name=job_name, file_global_path=None, done=True, all_files_done=True)
         
         self.window().refreshAllWidgets()
         self.parent().parent().setCurrentIndex(0)
@@ -1,5 +1,6 @@
 import json
 import os
+import copy
 from datetime import datetime
 
 from PyQt6.QtWidgets import QWidget
@@ -48,6 +49,7 @@ class PrintJobTracker(JobTracker):
                             'dynamic_job_name': str(datetime.now().strftime("%d-%m"))+'_'+job_name,
                             'status': status,
                             'created_on_date': str(datetime.now().strftime("%d-%m-%Y")),
+                            'created_on_timestamp': datetime.now().timestamp(),
                             'make_files': make_files,
                             'split_job': False}
 
@@ -58,23 +60,19 @@ class PrintJobTracker(JobTracker):
             if sender_mail_receive_time is not None:
                 add_job_dict['sender_mail_receive_time'] = sender_mail_receive_time
 
-        self.tracker_dict[job_name] = add_job_dict
+        # the tracker keeps its own copy, the caller can keep changing its dicts
+        stored_job_dict = copy.deepcopy(add_job_dict)
 
-        self.writeTrackerFile()
+        def setJob(tracker_dict: dict):
+            tracker_dict[job_name] = stored_job_dict
+
+        self.applyMutation(setJob, changed_job_names=[job_name])
 
         return add_job_dict
 
     def getExistingMaterials(self) -> set:
         ''' Return all materials that exist in the jobs with a wachtrij status. '''
-        self.readTrackerFile()
-
-        materials = set()
-        for job_dict in self.tracker_dict.values():
-            if job_dict['status'] == 'WACHTRIJ':
-                for print_file_dict in job_dict['make_files'].values():
-                    materials.add(print_file_dict['material'])
-                    
-        return materials
+        return set(self.queryMakeFiles(where={'status': 'WACHTRIJ'}, fields='material'))
 
     def globalPathToExecutable(self, file_global_path: str) -> str:
         ''' 
@@ -83,25 +81,23 @@ class PrintJobTracker(JobTracker):
         if so return path to slicer executable.
         '''
         assert file_global_path.lower().endswith(gv['ACCEPTED_EXTENSIONS']), f'file global path should end with an accepted extension'
-        self.readTrackerFile()
+        printer_names = self.queryMakeFiles(where={'file_global_path': file_global_path}, fields='printer_name', limit=1)
+        if len(printer_names) == 0 or printer_names[0] is None:
+            return None
+
+        if printer_names[0] == gv['DEFAULT_PRINTER_NAME']:
+            if 'DEFAULT_SLICER_EXECUTABLE_PATH' in gv:
+                return gv['DEFAULT_SLICER_EXECUTABLE_PATH']
+            return None
+        else:
+            return gv['SPECIAL_PRINTERS'][printer_names[0]]['SLICER_EXECUTABLE_PATH']
 
-        for job_dict in self.tracker_dict.values():
-            for file_dict in job_dict['make_files'].values():
-                if file_global_path == file_dict['file_global_path']:
-                    if 'printer_name' in file_dict:
-                        if file_dict['printer_name'] == gv['DEFAULT_PRINTER_NAME']:
-                            if 'DEFAULT_SLICER_EXECUTABLE_PATH' in gv:
-                                return gv['DEFAULT_SLICER_EXECUTABLE_PATH']
-                            return None
-                        else:
-                            return gv['SPECIAL_PRINTERS'][file_dict['printer_name']]['SLICER_EXECUTABLE_PATH']
-                    else:
-                        return None
-        return None
 
+    def checkHealth(self, full_rescan=False):
+        ''' Synchonize job tracker and files on file system.
 
-    def checkHealth(self):
-        ''' Synchonize job tracker and files on file system. '''
+        Only the folders that changed since the last health check are listed, unless full_rescan.
+        '''
 
         self.system_healthy = True
 
@@ -111,15 +107,28 @@ class PrintJobTracker(JobTracker):
         if not os.path.exists(gv['JOBS_DIR_HOME']):
             os.mkdir(gv['JOBS_DIR_HOME'])
 
-        self.deleteOldJobs()
+        with self.directory_snapshot.check(full_rescan=full_rescan):
+            with self.transaction():
+                self.archiveFinishedJobs()
+                self.deleteOldJobs()
 
-        self.deleteNonExitentJobsFromTrackerFile()
-        self.deleteNonExitentFilesFromTrackerFile()
+                self.scanJobFolders()
+                self.deleteNonExitentJobsFromTrackerFile()
+                self.moveRenamedFilesInTrackerFile()
+                self.deleteNonExitentFilesFromTrackerFile()
 
-        # import here, importing at begin of file creates a circular import error
-        # pylint: disable=import-outside-toplevel
-        from printer_qdialog import CreatePrintJobsFromFileSystemQDialog
-        self.addNewJobstoTrackerFile(CreatePrintJobsFromFileSystemQDialog)
-        self.addNewFilestoTrackerFile(CreatePrintJobsFromFileSystemQDialog)
+            # import here, importing at begin of file creates a circular import error
+            # pylint: disable=import-outside-toplevel
+            from printer_qdialog import CreatePrintJobsFromFileSystemQDialog
+            self.addNewJobstoTrackerFile(CreatePrintJobsFromFileSystemQDialog)
+            self.addNewFilestoTrackerFile(CreatePrintJobsFromFileSystemQDialog)
 
         self.makeBackup()
+        self.hashMakeFiles()
+
+    def checkChangedFolders(self, changed_folder_paths: list):
+        ''' Synchronize job tracker with the job folders that changed. '''
+
+        # pylint: disable=import-outside-toplevel
+        from printer_qdialog import CreatePrintJobsFromFileSystemQDialog
+        self.reconcileChangedFolders(changed_folder_paths, CreatePrintJobsFromFileSystemQDialog)
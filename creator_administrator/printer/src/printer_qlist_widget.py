@@ -3,10 +3,11 @@ from PyQt6.QtWidgets import QStackedWidget, QTabWidget, QWidget, QDialog, QLabel
 from printer_job_tracker import PrintJobTracker 
 from global_variables import gv
 from src.directory_functions import open_file
+from src.qmessagebox import YesOrNoMessageBox
 
-from src.qlist_widget import OverviewQListWidget, JobContentQListWidget
+from src.qlist_widget import JobsOverviewQListWidget, JobContentQListWidget
 
-class PrintAllJobsOverviewQListWidget(OverviewQListWidget):
+class PrintAllJobsOverviewQListWidget(JobsOverviewQListWidget):
 
     def __init__(self, parent: QWidget, *args, **kwargs):
         super().__init__(parent, gv, PrintJobTracker(self), *args, **kwargs)
@@ -30,21 +31,9 @@ class PrintAllJobsOverviewQListWidget(OverviewQListWidget):
                                  'tab_widget_position': 5}}
         self.refresh()
 
-    def refresh(self):
-        ''' Initialise the list widget with jobs. '''
-        self.clear()
-        self.initialize(self.job_tracker.getStaticAndDynamicJobNames())
-
-    def refreshWithMatch(self, match_str: str):
-        ''' Initialise with all jobs that match match_str. '''
-        self.clear()
-        self.initialize(self.job_tracker.getStaticAndDynamicJobNames(
-            filter_jobs_on='match', filter_str=match_str))
-
     def displayItem(self, item_name: str):
         ''' Display the job page and load content for the highlighted job. '''
 
-        job_status = self.job_tracker.getJobDict(item_name)['status']
         main_window = self.parent().window()
 
         # A dialog with this list in it embedded should set self.main_window
@@ -52,6 +41,14 @@ class PrintAllJobsOverviewQListWidget(OverviewQListWidget):
             main_window = self.main_window
             self.window().close() # close dialog
 
+        if self.job_tracker.isJobArchived(item_name):
+            if not YesOrNoMessageBox(main_window, f'{item_name} is archived, do you want to restore it?').answer():
+                return
+            self.job_tracker.restoreArchivedJob(item_name)
+            main_window.refreshAllWidgets()
+
+        job_status = self.job_tracker.getJobDict(item_name)['status']
+
         # find QStackedWidget for job_status
         stacked_widget = main_window.findChild(
                 QStackedWidget,
@@ -67,35 +64,29 @@ class PrintAllJobsOverviewQListWidget(OverviewQListWidget):
         tab_widget = main_window.findChild(QTabWidget, 'jobsQTabWidget')
         tab_widget.setCurrentIndex(self.widget_names[job_status]['tab_widget_position'])
 
-class PrintWachtrijJobsOverviewQListWidget(OverviewQListWidget):
+class PrintWachtrijJobsOverviewQListWidget(JobsOverviewQListWidget):
+
+    job_status = 'WACHTRIJ'
 
     def __init__(self, parent: QWidget, *args, **kwargs):
         super().__init__(parent, gv, PrintJobTracker(self), *args, **kwargs)
 
         self.refresh()
 
-    def refresh(self):
-        ''' Initialise the list widget with jobs. '''
-        self.clear()
-        self.initialize(PrintJobTracker(self).getStaticAndDynamicJobNames(
-            filter_jobs_on='status', filter_str='WACHTRIJ'))
 
+class PrintGeslicedJobsOverviewQListWidget(JobsOverviewQListWidget):
 
-class PrintGeslicedJobsOverviewQListWidget(OverviewQListWidget):
+    job_status = 'GESLICED'
 
     def __init__(self, parent: QWidget, *args, **kwargs):
         super().__init__(parent, gv, PrintJobTracker(self), *args, **kwargs)
 
         self.refresh()
 
-    def refresh(self):
-        ''' Initialise the list widget with jobs. '''
-        self.clear()
-        self.initialize(PrintJobTracker(self).getStaticAndDynamicJobNames(
-            filter_jobs_on='status', filter_str='GESLICED'))
 
+class PrintPrintenJobsOverviewQListWidget(JobsOverviewQListWidget):
 
-class PrintPrintenJobsOverviewQListWidget(OverviewQListWidget):
+    job_status = 'AAN_HET_PRINTEN'
 
     def __init__(self, parent: QWidget, *args, **kwargs):
         super().__init__(parent, gv, PrintJobTracker(self), *args, **kwargs)
@@ -104,43 +95,39 @@ class PrintPrintenJobsOverviewQListWidget(OverviewQListWidget):
 
     def refresh(self):
         ''' Initialise the list widget with jobs. '''
-        self.clear()
-        job_tracker = PrintJobTracker(self)
+        super().refresh()
+        self.updatePrintingJobsLabel()
 
-        self.initialize(job_tracker.getStaticAndDynamicJobNames(
-            filter_jobs_on='status', filter_str='AAN_HET_PRINTEN'))
+    def applyTrackerEvents(self, events: list):
+        ''' Insert, move or remove the rows of the changed jobs. '''
+        super().applyTrackerEvents(events)
+        self.updatePrintingJobsLabel()
 
+    def updatePrintingJobsLabel(self):
+        ''' Display the number of jobs that are printing. '''
         self.parent().findChild(QLabel, 'nPrintingJobsLabel').setText(str(
-                job_tracker.getNumberOfJobsWithStatus(['AAN_HET_PRINTEN'])))
+                self.job_tracker.getNumberOfJobsWithStatus(['AAN_HET_PRINTEN'])))
 
 
-class PrintVerwerktJobsOverviewQListWidget(OverviewQListWidget):
+class PrintVerwerktJobsOverviewQListWidget(JobsOverviewQListWidget):
+
+    job_status = 'VERWERKT'
 
     def __init__(self, parent: QWidget, *args, **kwargs):
         super().__init__(parent, gv, PrintJobTracker(self), *args, **kwargs)
 
         self.refresh()
 
-    def refresh(self):
-        ''' Initialise the list widget with jobs. '''
-        self.clear()
-        self.initialize(PrintJobTracker(self).getStaticAndDynamicJobNames(
-            filter_jobs_on='status', filter_str='VERWERKT'))
 
+class PrintAfgekeurdJobsOverviewQListWidget(JobsOverviewQListWidget):
 
-class PrintAfgekeurdJobsOverviewQListWidget(OverviewQListWidget):
+    job_status = 'AFGEKEURD'
 
     def __init__(self, parent: QWidget, *args, **kwargs):
         super().__init__(parent, gv, PrintJobTracker(self), *args, **kwargs)
 
         self.refresh()
 
-    def refresh(self):
-        ''' Initialise the list widget with jobs. '''
-        self.clear()
-        self.initialize(PrintJobTracker(self).getStaticAndDynamicJobNames(
-            filter_jobs_on='status', filter_str='AFGEKEURD'))
-
 class PrintJobContentQListWidget(JobContentQListWidget):
 
     def __init__(self, parent: QWidget, *args, **kwargs):
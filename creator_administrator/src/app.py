@@ -11,6 +11,7 @@ from PyQt6.uic import loadUi
 
 from src.qdialog import AboutDialog
 from src.qmessagebox import TimedMessage
+from src.fs_watcher import JobFolderWatcher
 
 class MainWindow(QMainWindow):
 
@@ -28,6 +29,7 @@ class MainWindow(QMainWindow):
                            }''')
             
         self.gv = gv
+        self.job_folder_watcher = None
 
 
         self.openDocumentationAction.triggered.connect(
@@ -36,28 +38,49 @@ class MainWindow(QMainWindow):
         self.reportaBugAction.triggered.connect(partial(webbrowser.open, 'https://github.com/GijsGroote/creator_administrator/issues'))
         self.actionAbout.triggered.connect(self.openAboutDialog)
         self.searchJobsAction.triggered.connect(self.openSearchJobDialog)
-        self.refreshJobsAction.triggered.connect(self.refreshAllWidgets)
+        self.refreshJobsAction.triggered.connect(lambda: self.refreshAllWidgets(force=True))
 
 
         # shortcut to close the application
         QShortcut(QKeySequence('Ctrl+Q'), self).activated.connect(self.close)
 
-    def checkHealth(self):
-        ''' Check health with tracker file. '''
-        self.job_tracker.checkHealth()
-        self.refreshAllWidgets()
+    def checkHealth(self, full_rescan=False):
+        ''' Check health with tracker file, with full_rescan also inspect the unchanged job folders. '''
+        self.job_tracker.checkHealth(full_rescan=full_rescan)
+        self.refreshAllWidgets(force=True)
         if self.job_tracker.system_healthy:
             TimedMessage(self, self.gv, 'System Healthy 😊!')
 
+    def startJobFolderWatcher(self):
+        ''' Synchronize the job tracker with changes in the job folders as they happen. '''
+        if not self.gv['WATCH_JOB_FOLDERS']:
+            return
+
+        self.job_folder_watcher = JobFolderWatcher(self, self.gv['JOBS_DIR_HOME'], self.checkChangedFolders)
+        self.job_folder_watcher.start()
+
+    def checkChangedFolders(self, changed_folder_paths: list):
+        ''' Synchronize the job tracker with the changed folders, then refresh the widgets. '''
+        self.job_tracker.checkChangedFolders(changed_folder_paths)
+        self.refreshAllWidgets()
+
     @abc.abstractmethod
     def openSearchJobDialog(self):
         ''' Open the search job dialog. '''
 
-    def refreshAllWidgets(self):
-        ''' Refresh the widgets. '''
+    def refreshAllWidgets(self, force=False):
+        ''' Refresh the widgets.
+
+        The widgets follow the changes made by this app through tracker events,
+        only widgets that missed changes made by another process are refreshed.
+        With force all widgets are refreshed.
+        '''
         qlist_widgets = self.findChildren(QListWidget)
         for list_widget in qlist_widgets:
-            list_widget.refresh()
+            if force or not hasattr(list_widget, 'refreshIfStale'):
+                list_widget.refresh()
+            else:
+                list_widget.refreshIfStale()
 
     def openAboutDialog(self):
         ''' Open About Dialog. '''
@@ -0,0 +1,119 @@
+'''
+Content hashes of make files.
+
+A make file that is renamed or moved to another job folder keeps its
+content, the health check finds it back by its content hash and updates the
+make file record instead of asking for the material and amount again.
+
+Hashing a large file over a network share is slow, the digests are cached
+in a json file keyed by path, size and mtime. A file with an unchanged size
+and mtime is not read again.
+'''
+
+import os
+import json
+import hashlib
+import threading
+
+from src.fs_scanner import map_in_threads, normalize_path, DEFAULT_MAX_WORKERS
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_global_path: str) -> str:
+    ''' Return the hex digest of the content of a file. '''
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_global_path, 'rb') as make_file:
+        for chunk in iter(lambda: make_file.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class ContentHashCache:
+    ''' Digests of files, persisted in a json file. '''
+
+    def __init__(self, cache_file_path: str):
+        self.cache_file_path = cache_file_path
+        # file path -> [size, mtime_ns, digest]
+        self.digests = None
+        self.lock = threading.Lock()
+        # number of files read for the digests since the cache was loaded
+        self.n_hashed = 0
+
+    def load(self):
+        ''' Read the cache file, a missing or corrupt cache file is an empty cache. '''
+        try:
+            with open(self.cache_file_path, 'r') as cache_file:
+                self.digests = json.load(cache_file)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            self.digests = {}
+
+    def save(self, keep_file_paths=None):
+        ''' Write the cache file, with keep_file_paths only keep the digests of those files. '''
+
+        with self.lock:
+            if self.digests is None:
+                return
+            if keep_file_paths is not None:
+                keep_file_paths = {normalize_path(file_path) for file_path in keep_file_paths}
+                self.digests = {file_path: entry for file_path, entry in self.digests.items() if file_path in keep_file_paths}
+            digests = dict(self.digests)
+
+        temp_cache_file_path = self.cache_file_path + '.tmp'
+        with open(temp_cache_file_path, 'w') as cache_file:
+            json.dump(digests, cache_file)
+        os.replace(temp_cache_file_path, self.cache_file_path)
+
+    def getDigest(self, file_global_path: str) -> str:
+        ''' Return the digest of a file, None if it cannot be read. '''
+
+        file_global_path = normalize_path(file_global_path)
+
+        with self.lock:
+            if self.digests is None:
+                self.load()
+
+        try:
+            stat_result = os.stat(file_global_path)
+        except OSError:
+            return None
+
+        with self.lock:
+            entry = self.digests.get(file_global_path)
+        if entry is not None and entry[0] == stat_result.st_size and entry[1] == stat_result.st_mtime_ns:
+            return entry[2]
+
+        try:
+            digest = hash_file(file_global_path)
+        except OSError:
+            return None
+
+        with self.lock:
+            self.digests[file_global_path] = [stat_result.st_size, stat_result.st_mtime_ns, digest]
+            self.n_hashed += 1
+
+        return digest
+
+    def getDigests(self, file_global_paths: list, max_workers: int=DEFAULT_MAX_WORKERS) -> dict:
+        ''' Return file path -> digest for the files that can be read, files are hashed in parallel. '''
+
+        file_global_paths = list(dict.fromkeys(file_global_paths))
+        digests = map_in_threads(self.getDigest, file_global_paths, max_workers=max_workers)
+
+        return {file_global_path: digest for file_global_path, digest in zip(file_global_paths, digests)
+                if digest is not None}
+
+
+_content_hash_caches = {}
+
+def get_content_hash_cache(gv: dict) -> ContentHashCache:
+    ''' Return the shared content hash cache that belongs to the tracker file. '''
+
+    cache_file_path = os.path.splitext(os.path.abspath(gv['TRACKER_FILE_PATH']))[0] + '_content_hashes.json'
+
+    if cache_file_path not in _content_hash_caches:
+        _content_hash_caches[cache_file_path] = ContentHashCache(cache_file_path)
+
+    return _content_hash_caches[cache_file_path]
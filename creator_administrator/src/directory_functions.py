@@ -10,6 +10,7 @@ import subprocess
 
 from PyQt6.QtWidgets import QWidget
 from src.qmessagebox import  ErrorQMessageBox
+from src.worker import Worker
 
 def copy_item(source_dir_global: str, target_dir_global: str):
     ''' Copy directory and subdirectories recursively. '''
@@ -38,6 +39,66 @@ def delete_item(parent: QWidget, gv: dict, item_global_path: str):
         except PermissionError as exc:
             ErrorQMessageBox(parent, text=f'Error Occured: {str(exc)}')
 
+def delete_items_in_background(parent: QWidget, gv: dict, item_global_paths: list):
+    ''' Delete files and folders from the file system on a worker thread.
+
+    The items are first moved to the TEMP folder, so they are gone from the
+    jobs folder immediately. Whatever is left in the TEMP folder is removed
+    when the application starts.
+    '''
+
+    moved_item_global_paths = []
+    for item_global_path in item_global_paths:
+        assert item_global_path.startswith((gv['DATA_DIR_HOME'], gv['TODO_DIR_HOME'])), f'Can only delete files in subdirectoreis of DATA_DIR_HOME or TODO_DIR_HOME.\nCannot delete {item_global_path}'
+
+        if not os.path.exists(item_global_path):
+            continue
+
+        if 'TEMP_DIR_HOME' in gv:
+            temp_item_global_path = os.path.join(gv['TEMP_DIR_HOME'], os.path.basename(item_global_path))
+            n_temp_item = 1
+            while os.path.exists(temp_item_global_path):
+                temp_item_global_path = os.path.join(gv['TEMP_DIR_HOME'],
+                        f'{os.path.basename(item_global_path)}_({n_temp_item})')
+                n_temp_item += 1
+            try:
+                os.rename(item_global_path, temp_item_global_path)
+                item_global_path = temp_item_global_path
+            except OSError:
+                pass # delete it where it is
+
+        moved_item_global_paths.append(item_global_path)
+
+    if len(moved_item_global_paths) == 0:
+        return
+
+    def show_errors(error_messages: list):
+        if len(error_messages) > 0:
+            ErrorQMessageBox(parent, text='Error Occured: ' + '\n'.join(error_messages))
+
+    if 'THREAD_POOL' in gv:
+        delete_worker = Worker(delete_items, moved_item_global_paths)
+        delete_worker.signals.result.connect(show_errors)
+        gv['THREAD_POOL'].start(delete_worker)
+    else:
+        show_errors(delete_items(moved_item_global_paths))
+
+def delete_items(item_global_paths: list) -> list:
+    ''' Delete files and folders, return the error messages of items that could not be deleted. '''
+
+    error_messages = []
+    for item_global_path in item_global_paths:
+        try:
+            if os.path.isdir(item_global_path):
+                shutil.rmtree(item_global_path)
+            else:
+                os.remove(item_global_path)
+
+        except OSError as exc:
+            error_messages.append(str(exc))
+
+    return error_messages
+
 def delete_directory_content(parent: QWidget, gv: dict, folder_global_path: str):
         ''' Delete all contents of a folder. '''
         for item in os.listdir(folder_global_path):
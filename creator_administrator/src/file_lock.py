@@ -0,0 +1,95 @@
+'''
+Lock files that work between processes and between PCs on a shared folder.
+
+The lock is a file created with O_EXCL, creating it fails if another process
+holds the lock. A lock file that was not touched for stale_after seconds is
+left behind by a crashed process and is broken. Breaking renames the lock
+file to a unique name first, so of the processes that find the same stale
+lock only one breaks it.
+
+The lock file holds a unique token of its holder. A holder that was too slow
+and had its lock broken does not remove the lock file of the next holder on
+release, the lock file is only removed if it still holds its own token.
+'''
+
+import os
+import time
+import uuid
+import socket
+
+
+class FileLock:
+    ''' Exclusive lock on a lock file, use as context manager. '''
+
+    def __init__(self, lock_file_path: str, timeout: float=30, stale_after: float=60, poll_interval: float=0.01):
+        self.lock_file_path = lock_file_path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.token = None
+
+    def acquire(self):
+        ''' Wait until the lock file could be created. '''
+
+        start_time = time.time()
+
+        while True:
+            try:
+                lock_file = os.open(self.lock_file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                self.breakStaleLock()
+
+                if time.time() - start_time > self.timeout:
+                    raise TimeoutError(f'could not acquire lock {self.lock_file_path} within {self.timeout} seconds') # pylint: disable=raise-missing-from
+                time.sleep(self.poll_interval)
+                continue
+
+            self.token = uuid.uuid4().hex
+            with os.fdopen(lock_file, 'w') as lock_file:
+                lock_file.write(f'{socket.gethostname()} {os.getpid()} {self.token}')
+            return
+
+    def release(self):
+        ''' Remove the lock file if it is still ours, it could have been broken as stale. '''
+
+        token, self.token = self.token, None
+
+        try:
+            with open(self.lock_file_path, 'r') as lock_file:
+                if lock_file.read().split(' ')[-1] != token:
+                    return
+            os.remove(self.lock_file_path)
+        except FileNotFoundError:
+            pass
+
+    def breakStaleLock(self):
+        ''' Remove the lock file if it is older than stale_after seconds.
+
+        The lock file could be released and taken again between checking its age
+        and removing it. The lock file is renamed and checked again, a lock file
+        that turns out to be fresh is linked back if the lock is still free.
+        '''
+
+        broken_lock_file_path = f'{self.lock_file_path}.{uuid.uuid4().hex}.broken'
+
+        try:
+            if time.time() - os.path.getmtime(self.lock_file_path) <= self.stale_after:
+                return
+            os.rename(self.lock_file_path, broken_lock_file_path)
+        except FileNotFoundError:
+            return
+
+        try:
+            if time.time() - os.path.getmtime(broken_lock_file_path) <= self.stale_after:
+                os.link(broken_lock_file_path, self.lock_file_path)
+        except OSError:
+            pass # the lock was taken again in the meantime
+        finally:
+            os.remove(broken_lock_file_path)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
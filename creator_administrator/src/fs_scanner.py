@@ -0,0 +1,114 @@
+'''
+Parallel directory scanning with os.scandir.
+
+Listing a directory on a network share waits for a round trip, a bounded
+thread pool lists many directories at once. os.scandir returns the entry
+type with the listing, so telling files and folders apart costs no extra
+stat per entry.
+
+scan_directories returns a FileSystemModel with the listings of all scanned
+directories, the callers look up entries in the model instead of listing
+the same directories again.
+'''
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class DirectoryListing:
+    ''' The mtime and the entries of a directory, entries map an entry name to True for folders. '''
+
+    def __init__(self, mtime_ns: int, entries: dict):
+        self.mtime_ns = mtime_ns
+        self.entries = entries
+
+
+class FileSystemModel:
+    ''' Listings of scanned directories. '''
+
+    def __init__(self):
+        # normalized directory path -> DirectoryListing, None for a missing directory
+        self.listings = {}
+
+    def addListing(self, directory_path: str, listing: DirectoryListing):
+        ''' Add the listing of a directory, None if the directory does not exist. '''
+        self.listings[normalize_path(directory_path)] = listing
+
+    def getListing(self, directory_path: str) -> DirectoryListing:
+        ''' Return the listing of a scanned directory, None if it does not exist. '''
+        directory_path = normalize_path(directory_path)
+        assert directory_path in self.listings, f'{directory_path} was not scanned'
+        return self.listings[directory_path]
+
+    def listDirectory(self, directory_path: str) -> list:
+        ''' Return the sorted entry names of a scanned directory, None if it does not exist. '''
+        listing = self.getListing(directory_path)
+        return None if listing is None else sorted(listing.entries)
+
+    def listEntries(self, directory_path: str) -> list:
+        ''' Return the sorted (entry name, is folder) of a scanned directory. '''
+        listing = self.getListing(directory_path)
+        return [] if listing is None else sorted(listing.entries.items())
+
+    def listFolders(self, directory_path: str) -> list:
+        ''' Return the sorted names of the folders in a scanned directory. '''
+        listing = self.getListing(directory_path)
+        return [] if listing is None else sorted(name for name, is_dir in listing.entries.items() if is_dir)
+
+    def listFiles(self, directory_path: str) -> list:
+        ''' Return the sorted names of the files in a scanned directory. '''
+        listing = self.getListing(directory_path)
+        return [] if listing is None else sorted(name for name, is_dir in listing.entries.items() if not is_dir)
+
+
+def normalize_path(global_path: str) -> str:
+    ''' Return the path the model stores a directory under. '''
+    return os.path.normpath(os.path.abspath(global_path))
+
+def scan_directory(directory_path: str) -> DirectoryListing:
+    ''' Return the listing of a directory, None if it does not exist. '''
+
+    try:
+        # stat before listing, a change during the listing then shows up as a newer mtime
+        mtime_ns = os.stat(directory_path).st_mtime_ns
+        with os.scandir(directory_path) as dir_entries:
+            entries = {dir_entry.name: dir_entry.is_dir() for dir_entry in dir_entries}
+
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+    return DirectoryListing(mtime_ns, entries)
+
+def map_in_threads(function, items: list, max_workers: int=DEFAULT_MAX_WORKERS) -> list:
+    ''' Return [function(item) for item in items], at most max_workers calls run at once. '''
+
+    items = list(items)
+    if len(items) <= 1 or max_workers <= 1:
+        return [function(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(function, items))
+
+def scan_directories(directory_paths: list, depth: int=0, max_workers: int=DEFAULT_MAX_WORKERS) -> FileSystemModel:
+    ''' Scan directories in parallel, and their folders up to depth levels deep. '''
+
+    model = FileSystemModel()
+
+    directory_paths = list(dict.fromkeys(normalize_path(directory_path) for directory_path in directory_paths))
+    for level in range(depth + 1):
+        listings = map_in_threads(scan_directory, directory_paths, max_workers=max_workers)
+
+        next_directory_paths = []
+        for directory_path, listing in zip(directory_paths, listings):
+            model.addListing(directory_path, listing)
+
+            if listing is not None and level < depth:
+                next_directory_paths += [os.path.join(directory_path, name)
+                                         for name, is_dir in listing.entries.items() if is_dir]
+
+        directory_paths = [directory_path for directory_path in next_directory_paths
+                           if directory_path not in model.listings]
+
+    return model
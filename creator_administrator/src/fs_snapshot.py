@@ -0,0 +1,201 @@
+'''
+Persisted snapshot of directory listings for the health check.
+
+The snapshot remembers the mtime and the entries of every listed directory.
+Adding, removing or renaming an entry changes the mtime of its directory, so
+a directory with an unchanged mtime is not listed again and the existence of
+the paths in it is answered from the snapshot, which saves many round trips
+when JOBS_DIR_HOME is on a network share. prefetch inspects many directories
+in parallel, in a check all phases share the inspected directories.
+
+A listing made within MTIME_RESOLUTION_NS of the mtime of its directory is
+listed again next time, a change in the same mtime tick (file systems such as
+FAT and some network shares have a resolution of 2 seconds) would otherwise
+go unnoticed.
+'''
+
+import os
+import json
+import time
+from contextlib import contextmanager
+
+from src.fs_scanner import scan_directory, map_in_threads, normalize_path, DEFAULT_MAX_WORKERS
+
+MTIME_RESOLUTION_NS = 2_000_000_000
+
+
+class DirectorySnapshot:
+    ''' Directory mtimes and entries, persisted in a json file. '''
+
+    def __init__(self, snapshot_file_path: str):
+        self.snapshot_file_path = snapshot_file_path
+        # directory path -> {'mtime_ns': int, 'listed_on_ns': int, 'entries': [entry names]}
+        self.directories = None
+
+        # entries of the directories checked in the current check, directory path -> set of entry names or None
+        self.checked_entries = None
+        self.full_rescan = False
+        self.prune = True
+        # number of directories listed and of directories answered from the snapshot, for the last check
+        self.n_listed = 0
+        self.n_reused = 0
+
+    def load(self):
+        ''' Read the snapshot file, a missing or corrupt snapshot file is an empty snapshot. '''
+        try:
+            with open(self.snapshot_file_path, 'r') as snapshot_file:
+                self.directories = json.load(snapshot_file)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            self.directories = {}
+
+    def save(self):
+        ''' Write the snapshot file, when pruning only keep the directories checked in the current check. '''
+
+        if self.checked_entries is not None and self.prune:
+            self.directories = {directory_path: directory_dict for directory_path, directory_dict
+                                in self.directories.items() if directory_path in self.checked_entries}
+
+        temp_snapshot_file_path = self.snapshot_file_path + '.tmp'
+        with open(temp_snapshot_file_path, 'w') as snapshot_file:
+            json.dump(self.directories, snapshot_file)
+        os.replace(temp_snapshot_file_path, self.snapshot_file_path)
+
+    @contextmanager
+    def check(self, full_rescan=False, prune=True):
+        ''' Check the file system, every directory is inspected at most once in the check.
+
+        With full_rescan all directories are listed again, ignoring the snapshot.
+        With prune the directories not inspected in the check are dropped from the
+        snapshot, a check of only some directories keeps the others.
+        '''
+
+        self.load()
+        self.checked_entries = {}
+        self.full_rescan = full_rescan
+        self.prune = prune
+        self.n_listed = 0
+        self.n_reused = 0
+        try:
+            yield self
+            self.save()
+        finally:
+            self.checked_entries = None
+            self.full_rescan = False
+            self.prune = True
+
+    def listDirectory(self, directory_path: str) -> list:
+        ''' Return the sorted entry names of a directory, or None if it does not exist.
+
+        The directory is only listed if its mtime changed since the last listing.
+        '''
+
+        entries = self.getEntries(directory_path)
+        return None if entries is None else sorted(entries)
+
+    def getEntries(self, directory_path: str) -> set:
+        ''' Return the entry names of a directory, or None if it does not exist. '''
+
+        directory_path = normalize_path(directory_path)
+
+        if self.checked_entries is not None and directory_path in self.checked_entries:
+            return self.checked_entries[directory_path]
+
+        if self.directories is None:
+            self.load()
+
+        return self.recordInspection(directory_path, self.inspectDirectory(directory_path))
+
+    def prefetch(self, directory_paths: list, max_workers: int=DEFAULT_MAX_WORKERS):
+        ''' Inspect the directories that are not yet checked in the current check in parallel. '''
+
+        assert self.checked_entries is not None, 'prefetch directories in a check'
+
+        directory_paths = [directory_path for directory_path in dict.fromkeys(map(normalize_path, directory_paths))
+                           if directory_path not in self.checked_entries]
+
+        inspections = map_in_threads(self.inspectDirectory, directory_paths, max_workers=max_workers)
+        for directory_path, inspection in zip(directory_paths, inspections):
+            self.recordInspection(directory_path, inspection)
+
+    def inspectDirectory(self, directory_path: str) -> tuple:
+        ''' Return the snapshot dict of a directory and whether it was listed again, (None, False) if it does not exist.
+
+        Only reads the snapshot, so directories can be inspected in parallel.
+        '''
+
+        try:
+            mtime_ns = os.stat(directory_path).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return None, False
+
+        snapshot_dict = self.directories.get(directory_path)
+        if (not self.full_rescan and snapshot_dict is not None and snapshot_dict['mtime_ns'] == mtime_ns
+                and snapshot_dict['listed_on_ns'] - mtime_ns >= MTIME_RESOLUTION_NS):
+            return snapshot_dict, False
+
+        listed_on_ns = time.time_ns()
+        listing = scan_directory(directory_path)
+        if listing is None:
+            return None, False
+
+        return {'mtime_ns': listing.mtime_ns, 'listed_on_ns': listed_on_ns, 'entries': sorted(listing.entries)}, True
+
+    def recordInspection(self, directory_path: str, inspection: tuple) -> set:
+        ''' Store the inspection of a directory, return its entry names or None if it does not exist. '''
+
+        snapshot_dict, listed = inspection
+
+        if snapshot_dict is None:
+            self.directories.pop(directory_path, None)
+            entries = None
+        else:
+            self.directories[directory_path] = snapshot_dict
+            entries = set(snapshot_dict['entries'])
+            if listed:
+                self.n_listed += 1
+            else:
+                self.n_reused += 1
+
+        if self.checked_entries is not None:
+            self.checked_entries[directory_path] = entries
+
+        return entries
+
+    def exists(self, global_path: str) -> bool:
+        ''' Return True if the path exists, answered from the entries of its parent directory.
+
+        A path missing from the entries is confirmed on the file system, the
+        entries do not know about e.g. case-insensitive file names.
+        '''
+
+        global_path = normalize_path(global_path)
+        parent_path = os.path.dirname(global_path)
+        if parent_path == global_path:
+            return os.path.exists(global_path)
+
+        entries = self.getEntries(parent_path)
+        if entries is None:
+            return False
+        return os.path.basename(global_path) in entries or os.path.exists(global_path)
+
+    def invalidate(self, directory_path: str):
+        ''' Forget a directory, e.g. after changing its entries, so it is listed again. '''
+
+        directory_path = normalize_path(directory_path)
+        if self.directories is not None:
+            self.directories.pop(directory_path, None)
+        if self.checked_entries is not None:
+            self.checked_entries.pop(directory_path, None)
+
+
+_directory_snapshots = {}
+
+def get_directory_snapshot(gv: dict) -> DirectorySnapshot:
+    ''' Return the shared directory snapshot that belongs to the tracker file. '''
+
+    snapshot_file_path = os.path.splitext(os.path.abspath(gv['TRACKER_FILE_PATH']))[0] + '_fs_snapshot.json'
+
+    if snapshot_file_path not in _directory_snapshots:
+        _directory_snapshots[snapshot_file_path] = DirectorySnapshot(snapshot_file_path)
+
+    return _directory_snapshots[snapshot_file_path]
@@ -0,0 +1,88 @@
+'''
+Watch the job folders for changes.
+
+A QFileSystemWatcher watches JOBS_DIR_HOME and every folder in it. The
+folders that changed are collected and handed to a callback in one batch
+when no folder changed for debounce_ms, copying many files into a job folder
+then results in one batch instead of one per file.
+
+While a modal dialog is open the batch is postponed, the dialog is often
+creating the files that changed and may itself ask the user questions.
+'''
+
+import os
+
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer
+from PyQt6.QtWidgets import QApplication
+
+from src.fs_scanner import scan_directories, normalize_path
+
+DEBOUNCE_MS = 1000
+
+
+class JobFolderWatcher(QObject):
+    ''' Report the changed folders in and including JOBS_DIR_HOME in debounced batches. '''
+
+    def __init__(self, parent: QObject, jobs_dir_home: str, callback, debounce_ms: int=DEBOUNCE_MS):
+        super().__init__(parent)
+
+        self.jobs_dir_home = normalize_path(jobs_dir_home)
+        self.callback = callback
+        self.changed_folder_paths = {}
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.collectChange)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def start(self):
+        ''' Start watching JOBS_DIR_HOME and the job folders. '''
+        self.watchJobFolders()
+
+    def stop(self):
+        ''' Stop watching, drop the changes that were not yet reported. '''
+        self.timer.stop()
+        self.changed_folder_paths = {}
+        if len(self.watcher.directories()) > 0:
+            self.watcher.removePaths(self.watcher.directories())
+
+    def watchJobFolders(self):
+        ''' Watch JOBS_DIR_HOME and the folders in it, stop watching folders that are gone. '''
+
+        model = scan_directories([self.jobs_dir_home])
+        folder_paths = [self.jobs_dir_home] + [os.path.join(self.jobs_dir_home, folder_name)
+                                               for folder_name in model.listFolders(self.jobs_dir_home)]
+
+        watched_folder_paths = set(self.watcher.directories())
+        new_folder_paths = [folder_path for folder_path in folder_paths if folder_path not in watched_folder_paths]
+        if len(new_folder_paths) > 0:
+            self.watcher.addPaths(new_folder_paths)
+
+        old_folder_paths = [folder_path for folder_path in watched_folder_paths if folder_path not in set(folder_paths)]
+        if len(old_folder_paths) > 0:
+            self.watcher.removePaths(old_folder_paths)
+
+    def collectChange(self, folder_path: str):
+        ''' Remember a changed folder, report it after the folders are quiet for a while. '''
+        self.changed_folder_paths[normalize_path(folder_path)] = None
+        self.timer.start()
+
+    def flush(self):
+        ''' Report the changed folders to the callback. '''
+
+        if QApplication.activeModalWidget() is not None:
+            self.timer.start()
+            return
+
+        changed_folder_paths = list(self.changed_folder_paths)
+        self.changed_folder_paths = {}
+        if len(changed_folder_paths) == 0:
+            return
+
+        if self.jobs_dir_home in changed_folder_paths:
+            self.watchJobFolders()
+
+        self.callback(changed_folder_paths)
@@ -0,0 +1,195 @@
+'''
+Batched IMAP fetches and BODYSTRUCTURE parsing.
+
+Deciding if a mail is a valid job request only takes the file names of its
+attachments. The BODYSTRUCTURE of a mail holds those names, so all candidate
+mails are triaged with one UID FETCH of their BODYSTRUCTURE and only the
+valid mails are downloaded, in chunks to the spool folder (see mail_spool).
+The same FETCH peeks at the From, Subject and Date headers, so the invalid
+mails can be named without downloading them.
+
+A FETCH response is parsed into one dict per mail, mapping the fetched items
+to their values: lists for parenthesized lists, str for strings and atoms,
+int for numbers, None for NIL and bytes for literals such as the RFC822 body.
+'''
+
+import re
+import urllib.parse
+from email.header import decode_header, make_header
+from email.parser import BytesHeaderParser
+from email.policy import compat32
+
+# a section such as BODY[HEADER.FIELDS (FROM DATE)] is one token, despite its parentheses
+TOKEN_PATTERN = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"\[]*\[[^\]]*\][^\s()"]*|[^\s()"]+')
+HEADER_FIELDS = 'BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE)]'
+LITERAL_SUFFIX_PATTERN = re.compile(rb'\{(\d+)\}$')
+
+
+class Literal(bytes):
+    ''' The data of a literal in a response. '''
+
+
+def tokenize_response(data: list) -> list:
+    ''' Return the tokens of a response as returned by imaplib, literals are Literal tokens. '''
+
+    tokens = []
+    for element in data:
+        if isinstance(element, tuple):
+            text, literal = element
+            tokens += TOKEN_PATTERN.findall(LITERAL_SUFFIX_PATTERN.sub(b'', text))
+            tokens.append(Literal(literal))
+        elif element is not None:
+            tokens += TOKEN_PATTERN.findall(element)
+
+    return tokens
+
+def parse_token(token: bytes):
+    ''' Return the value of a string, number, NIL or atom token. '''
+
+    if isinstance(token, Literal):
+        return bytes(token)
+    if token.startswith(b'"'):
+        return re.sub(rb'\\(.)', rb'\1', token[1:-1]).decode('utf-8', errors='replace')
+    if token.upper() == b'NIL':
+        return None
+    if token.isdigit():
+        return int(token)
+    return token.decode('utf-8', errors='replace')
+
+def parse_fetch_response(data: list) -> list:
+    ''' Return a dict of the fetched items per mail, the sequence number is stored under SEQ. '''
+
+    fetched_mails = []
+    stack = []
+    sequence_number = None
+
+    for token in tokenize_response(data):
+        if not isinstance(token, Literal) and token == b'(':
+            stack.append([])
+        elif not isinstance(token, Literal) and token == b')':
+            values = stack.pop()
+            if len(stack) > 0:
+                stack[-1].append(values)
+            else:
+                fetched_mail = {'SEQ': sequence_number}
+                for item_name, value in zip(values[0::2], values[1::2]):
+                    fetched_mail[str(item_name).upper()] = value
+                fetched_mails.append(fetched_mail)
+        elif len(stack) > 0:
+            stack[-1].append(parse_token(token))
+        elif not isinstance(token, Literal) and token.isdigit():
+            sequence_number = int(token)
+
+    return fetched_mails
+
+def get_parameter(parameters, name: str) -> str:
+    ''' Return a parameter from a BODYSTRUCTURE parameter list, joins RFC 2231 continuations. '''
+
+    if not isinstance(parameters, list):
+        return None
+
+    parameter_dict = {str(key).lower(): value for key, value in zip(parameters[0::2], parameters[1::2])}
+    name = name.lower()
+
+    if name in parameter_dict:
+        return decode_header_value(parameter_dict[name])
+
+    # RFC 2231: name*=utf-8''file.dxf or name*0*=...; name*1*=...
+    continuations = sorted((key for key in parameter_dict if key.startswith(name + '*')),
+                           key=lambda key: int(re.sub(r'\D', '', key[len(name):]) or 0))
+    if len(continuations) == 0:
+        return None
+
+    # the first encoded segment starts with charset'language', encoded segments are percent encoded
+    charset = 'utf-8'
+    value_bytes = b''
+    for position, key in enumerate(continuations):
+        segment = str(parameter_dict[key])
+        if key.endswith('*'):
+            if position == 0 and segment.count("'") >= 2:
+                charset, _, segment = segment.split("'", 2)
+                charset = charset or 'utf-8'
+            value_bytes += urllib.parse.unquote_to_bytes(segment)
+        else:
+            value_bytes += segment.encode(charset, errors='replace')
+
+    try:
+        return value_bytes.decode(charset, errors='replace')
+    except LookupError:
+        return value_bytes.decode('utf-8', errors='replace')
+
+def decode_header_value(value) -> str:
+    ''' Decode a =?charset?...?= encoded value. '''
+
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', errors='replace')
+    if value is None or '=?' not in value:
+        return value
+    return str(make_header(decode_header(value)))
+
+def get_header_fields(fetched_mail: dict):
+    ''' Return the headers fetched with HEADER_FIELDS as an email.message.Message without body. '''
+
+    header_bytes = next((value for item, value in fetched_mail.items() if item.startswith('BODY[HEADER')), None)
+    if isinstance(header_bytes, str):
+        header_bytes = header_bytes.encode('utf-8', errors='replace')
+
+    return BytesHeaderParser(policy=compat32).parsebytes(header_bytes or b'', headersonly=True)
+
+def get_attachments(bodystructure: list) -> list:
+    ''' Return the file names of the parts in a BODYSTRUCTURE with a content disposition and a file name.
+
+    These are the parts MailManager.getAttachments returns for a downloaded mail.
+    '''
+
+    if not isinstance(bodystructure, list) or len(bodystructure) == 0:
+        return []
+
+    # multipart: the parts, followed by the subtype and the extension data
+    if isinstance(bodystructure[0], list):
+        attachments = []
+        for part in bodystructure:
+            if not isinstance(part, list):
+                break
+            attachments += get_attachments(part)
+        return attachments
+
+    media_type = str(bodystructure[0]).lower()
+    media_subtype = str(bodystructure[1]).lower()
+
+    # the disposition follows the md5, which follows the type specific fields
+    attachments = []
+    if media_type == 'text':
+        disposition_position = 9
+    elif media_type == 'message' and media_subtype == 'rfc822':
+        disposition_position = 11
+        # the attachments of an attached mail are attachments as well
+        if len(bodystructure) > 8:
+            attachments = get_attachments(bodystructure[8])
+    else:
+        disposition_position = 8
+
+    disposition = bodystructure[disposition_position] if len(bodystructure) > disposition_position else None
+    if not isinstance(disposition, list):
+        return attachments
+
+    file_name = get_parameter(disposition[1] if len(disposition) > 1 else None, 'filename')
+    if file_name is None:
+        file_name = get_parameter(bodystructure[2], 'name')
+    if not file_name:
+        return attachments
+
+    return [file_name] + attachments
+
+def to_sequence_set(numbers: list) -> str:
+    ''' Return an IMAP sequence set, consecutive numbers are joined in a range: 1:3,7. '''
+
+    numbers = sorted(set(int(number) for number in numbers))
+    ranges = []
+    for number in numbers:
+        if len(ranges) > 0 and ranges[-1][1] == number - 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+
+    return ','.join(str(start) if start == end else f'{start}:{end}' for start, end in ranges)
@@ -0,0 +1,186 @@
+'''
+Pool of logged in IMAP sessions.
+
+Logging in to the IMAP server costs a TLS handshake, LOGIN, SELECT and
+LIST. The pool keeps sessions open between mail operations, so fetching the
+new mails and moving and flagging every imported mail share one session.
+
+A session that was idle for longer than noop_after_seconds is checked with
+a NOOP before it is handed out, servers silently drop idle sessions. A
+session that fails the NOOP or drops during an operation is discarded, run
+then retries an idempotent operation once on a newly logged in session. An
+operation that changes the mailbox (e.g. COPY) is not retried, its session
+is always checked with a NOOP first. The apps log out of all sessions when
+they quit.
+'''
+
+import time
+import imaplib
+import threading
+from contextlib import contextmanager
+
+NOOP_AFTER_SECONDS = 30
+MAX_IDLE_SECONDS = 600
+MAX_IDLE_SESSIONS = 2
+
+# a dropped connection, ssl and socket errors are an OSError
+CONNECTION_ERRORS = (imaplib.IMAP4.abort, OSError, EOFError)
+
+
+class ImapSessionPool:
+    ''' Logged in IMAP sessions, connect() logs in a new session with the inbox selected. '''
+
+    def __init__(self, connect,
+                 max_idle_sessions: int=MAX_IDLE_SESSIONS,
+                 noop_after_seconds: float=NOOP_AFTER_SECONDS,
+                 max_idle_seconds: float=MAX_IDLE_SECONDS):
+        self.connect = connect
+        self.max_idle_sessions = max_idle_sessions
+        self.noop_after_seconds = noop_after_seconds
+        self.max_idle_seconds = max_idle_seconds
+
+        # (session, released on monotonic time) of the sessions not in use
+        self.idle_sessions = []
+        self.lock = threading.Lock()
+        # number of sessions logged in, for tests and diagnostics
+        self.n_connects = 0
+
+    def acquire(self, check_alive=False) -> imaplib.IMAP4:
+        ''' Return a healthy idle session, or log in a new session.
+
+        With check_alive an idle session is checked with a NOOP, however short it was idle.
+        '''
+
+        while True:
+            with self.lock:
+                if len(self.idle_sessions) == 0:
+                    break
+                imap_mail, released_on = self.idle_sessions.pop()
+
+            idle_seconds = time.monotonic() - released_on
+            if idle_seconds > self.max_idle_seconds:
+                self.logout(imap_mail)
+                continue
+
+            if (check_alive or idle_seconds > self.noop_after_seconds) and not self.isAlive(imap_mail):
+                self.discard(imap_mail)
+                continue
+
+            return imap_mail
+
+        imap_mail = self.connect()
+        with self.lock:
+            self.n_connects += 1
+        return imap_mail
+
+    def release(self, imap_mail: imaplib.IMAP4):
+        ''' Return a session to the pool, log out if the pool holds enough idle sessions. '''
+
+        with self.lock:
+            if len(self.idle_sessions) < self.max_idle_sessions:
+                self.idle_sessions.append((imap_mail, time.monotonic()))
+                return
+
+        self.logout(imap_mail)
+
+    @contextmanager
+    def session(self, check_alive=False):
+        ''' Use a session, a session whose connection dropped is discarded instead of returned to the pool.
+
+        Usage:
+            with imap_pool.session() as imap_mail:
+                imap_mail.search(None, 'ALL')
+        '''
+
+        imap_mail = self.acquire(check_alive=check_alive)
+        try:
+            yield imap_mail
+        except CONNECTION_ERRORS:
+            self.discard(imap_mail)
+            # the idle sessions most likely lost their connection as well
+            self.discardIdleSessions()
+            raise
+        except BaseException:
+            self.release(imap_mail)
+            raise
+
+        self.release(imap_mail)
+
+    def run(self, operation, idempotent=True):
+        ''' Return operation(imap_mail) run on a pooled session.
+
+        If the connection dropped an idempotent operation is run once more on a new session.
+        An operation that is not idempotent could have been (partly) done by the server, it
+        is not run again, instead the session is checked with a NOOP before the operation.
+        '''
+
+        if not idempotent:
+            with self.session(check_alive=True) as imap_mail:
+                return operation(imap_mail)
+
+        try:
+            with self.session() as imap_mail:
+                return operation(imap_mail)
+        except CONNECTION_ERRORS:
+            pass
+
+        with self.session() as imap_mail:
+            return operation(imap_mail)
+
+    def isAlive(self, imap_mail: imaplib.IMAP4) -> bool:
+        ''' Return True if the session answers a NOOP. '''
+        try:
+            status, _ = imap_mail.noop()
+        except CONNECTION_ERRORS + (imaplib.IMAP4.error,):
+            return False
+        return status == 'OK'
+
+    def logout(self, imap_mail: imaplib.IMAP4):
+        ''' Log out of a session, ignore a connection that is already gone. '''
+        try:
+            imap_mail.logout()
+        except CONNECTION_ERRORS + (imaplib.IMAP4.error,):
+            self.discard(imap_mail)
+
+    def discard(self, imap_mail: imaplib.IMAP4):
+        ''' Close the connection of a broken session. '''
+        try:
+            imap_mail.shutdown()
+        except CONNECTION_ERRORS:
+            pass
+
+    def discardIdleSessions(self):
+        ''' Close the connections of all idle sessions. '''
+        with self.lock:
+            idle_sessions = self.idle_sessions
+            self.idle_sessions = []
+
+        for imap_mail, _ in idle_sessions:
+            self.discard(imap_mail)
+
+    def closeAll(self):
+        ''' Log out of all idle sessions. '''
+        with self.lock:
+            idle_sessions = self.idle_sessions
+            self.idle_sessions = []
+
+        for imap_mail, _ in idle_sessions:
+            self.logout(imap_mail)
+
+
+_imap_pools = {}
+
+def get_imap_pool(gv: dict, connect) -> ImapSessionPool:
+    ''' Return the shared session pool of the mail account in the settings. '''
+
+    account = (gv.get('MAIL_ADRESS'), gv.get('MAIL_INBOX_NAME'))
+
+    if account not in _imap_pools:
+        _imap_pools[account] = ImapSessionPool(connect)
+
+    return _imap_pools[account]
+
+def close_imap_pools():
+    ''' Log out of the idle sessions of all shared session pools, call when the app quits. '''
+    for imap_pool in _imap_pools.values():
+        imap_pool.closeAll()
@@ -0,0 +1,146 @@
+'''
+Incremental IMAP sync state.
+
+When all mails are imported, not only the unread mails, every import used
+to download and evaluate every mail in the inbox. Invalid mails stay in the
+inbox and were reported again on every import.
+
+The sync state remembers per mailbox the UIDVALIDITY, the last UID seen and
+a ledger of the valid mails that are not imported yet. An import only
+triages the mails with a UID above the last UID seen and downloads the
+valid mails in the ledger, so import time grows with the new mail instead
+of with the inbox. Invalid and imported mails are at or below the last UID
+seen, they are never offered again and are pruned from the ledger.
+
+UIDs are only meaningful for one UIDVALIDITY, if the server reports another
+UIDVALIDITY the state of that mailbox starts over.
+'''
+
+import os
+import json
+import threading
+
+VALID = 'valid'
+INVALID = 'invalid'
+
+
+class ImapSyncState:
+    ''' UIDVALIDITY, last seen UID and classified UIDs per mailbox, persisted in a json file. '''
+
+    def __init__(self, state_file_path: str):
+        self.state_file_path = state_file_path
+        # mailbox key -> {'uid_validity': int, 'last_seen_uid': int, 'ledger': {uid: classification}}
+        self.mailboxes = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        ''' Read the state file, a missing or corrupt state file is an empty state. '''
+        try:
+            with open(self.state_file_path, 'r') as state_file:
+                self.mailboxes = json.load(state_file)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            self.mailboxes = {}
+
+    def save(self):
+        ''' Write the state file. '''
+
+        with self.lock:
+            if self.mailboxes is None:
+                return
+            mailboxes = json.dumps(self.mailboxes)
+
+        temp_state_file_path = self.state_file_path + '.tmp'
+        with open(temp_state_file_path, 'w') as state_file:
+            state_file.write(mailboxes)
+        os.replace(temp_state_file_path, self.state_file_path)
+
+    def getMailboxState(self, mailbox_key: str, uid_validity: int) -> dict:
+        ''' Return the state of a mailbox, a new state if it has no state or another UIDVALIDITY.
+
+        Call with self.lock held.
+        '''
+
+        if self.mailboxes is None:
+            self.load()
+
+        mailbox_state = self.mailboxes.get(mailbox_key)
+        if mailbox_state is None or mailbox_state['uid_validity'] != uid_validity:
+            mailbox_state = {'uid_validity': uid_validity, 'last_seen_uid': 0, 'ledger': {}}
+            self.mailboxes[mailbox_key] = mailbox_state
+
+        prune_ledger(mailbox_state)
+        return mailbox_state
+
+    def startSync(self, mailbox_key: str, uid_validity: int) -> tuple[int, list]:
+        ''' Return the last seen UID and the valid UIDs that are not imported yet. '''
+
+        with self.lock:
+            mailbox_state = self.getMailboxState(mailbox_key, uid_validity)
+            return (mailbox_state['last_seen_uid'],
+                    sorted(int(uid) for uid, classification in mailbox_state['ledger'].items() if classification == VALID))
+
+    def recordClassifications(self, mailbox_key: str, uid_validity: int, classifications: dict, last_seen_uid: int):
+        ''' Store uid -> valid or invalid for newly triaged mails and the last UID seen. '''
+
+        with self.lock:
+            mailbox_state = self.getMailboxState(mailbox_key, uid_validity)
+            for uid, classification in classifications.items():
+                mailbox_state['ledger'][str(uid)] = classification
+            mailbox_state['last_seen_uid'] = max(mailbox_state['last_seen_uid'], int(last_seen_uid))
+            prune_ledger(mailbox_state)
+
+        self.save()
+
+    def forgetUids(self, mailbox_key: str, uids: list):
+        ''' Remove UIDs that are no longer in the mailbox from the ledger. '''
+
+        with self.lock:
+            if self.mailboxes is None:
+                self.load()
+            mailbox_state = self.mailboxes.get(mailbox_key)
+            if mailbox_state is None:
+                return
+            for uid in uids:
+                mailbox_state['ledger'].pop(str(uid), None)
+
+        self.save()
+
+    def markImported(self, mailbox_key: str, uid: int):
+        ''' Remove an imported mail from the ledger, it is not offered again whether it left the mailbox or not. '''
+
+        with self.lock:
+            if self.mailboxes is None:
+                self.load()
+            mailbox_state = self.mailboxes.get(mailbox_key)
+            if mailbox_state is None:
+                return
+            mailbox_state['ledger'].pop(str(uid), None)
+
+        self.save()
+
+
+def prune_ledger(mailbox_state: dict):
+    ''' Remove the UIDs at or below the last UID seen that will not be offered again, only valid UIDs are kept. '''
+
+    ledger = mailbox_state['ledger']
+    for uid in [uid for uid, classification in ledger.items()
+                if classification != VALID and int(uid) <= mailbox_state['last_seen_uid']]:
+        del ledger[uid]
+
+
+def get_mailbox_key(gv: dict) -> str:
+    ''' Return the key of the inbox in the settings. '''
+    return f"{gv['MAIL_ADRESS']}/{gv['MAIL_INBOX_NAME']}"
+
+
+_imap_sync_states = {}
+
+def get_imap_sync_state(gv: dict) -> ImapSyncState:
+    ''' Return the shared sync state stored in DATA_DIR_HOME. '''
+
+    state_file_path = os.path.join(os.path.abspath(gv['DATA_DIR_HOME']), 'imap_sync_state.json')
+
+    if state_file_path not in _imap_sync_states:
+        _imap_sync_states[state_file_path] = ImapSyncState(state_file_path)
+
+    return _imap_sync_states[state_file_path]
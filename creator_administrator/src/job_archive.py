@@ -0,0 +1,149 @@
+'''
+Archive for finished jobs.
+
+Finished jobs are moved out of the live tracker into an append-only archive
+file, every append adds a gzip member with one json line per job. The job
+folders are zipped into the archive folder. A job that is archived more than
+once (e.g. after it was restored) keeps its latest archive record. New
+jobs do not reuse the name of an archived job, the job name identifies the
+archive record, the zip and the staged job folder.
+'''
+
+import os
+import json
+import gzip
+import shutil
+import zlib
+
+from src.tracker_index import job_name_suffixes
+
+
+class JobArchive:
+    ''' Append-only, compressed archive of job dicts and zipped job folders. '''
+
+    def __init__(self, archive_file_path: str, archive_folder_path: str):
+        self.archive_file_path = archive_file_path
+        self.archive_folder_path = archive_folder_path
+        self.signature = None
+        self.archived_jobs = {}
+        # base name -> highest NUMBER of the archived jobs named base_name_(NUMBER)
+        self.job_name_suffixes = {}
+
+    def archiveJobs(self, job_dicts: list):
+        ''' Append job dicts to the archive file. '''
+
+        with gzip.open(self.archive_file_path, 'ab') as archive_file:
+            for job_dict in job_dicts:
+                archive_file.write(json.dumps(job_dict).encode('utf-8') + b'\n')
+
+    def loadJobs(self) -> dict:
+        ''' Return all archived job dicts, only read the archive file if it changed. '''
+
+        if not os.path.exists(self.archive_file_path):
+            return {}
+
+        stat = os.stat(self.archive_file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        if signature != self.signature:
+            self.archived_jobs = {}
+            try:
+                with gzip.open(self.archive_file_path, 'rb') as archive_file:
+                    for line in archive_file:
+                        if not line.endswith(b'\n'):
+                            break
+                        job_dict = json.loads(line)
+                        self.archived_jobs.pop(job_dict['job_name'], None)
+                        self.archived_jobs[job_dict['job_name']] = job_dict
+
+            except (EOFError, gzip.BadGzipFile, zlib.error, json.decoder.JSONDecodeError):
+                pass # the last append was interrupted, keep what was read before it
+
+            self.job_name_suffixes = {}
+            for job_name in self.archived_jobs:
+                for base_name, suffix in job_name_suffixes(job_name):
+                    self.job_name_suffixes[base_name] = max(suffix, self.job_name_suffixes.get(base_name, 0))
+
+            self.signature = signature
+
+        return self.archived_jobs
+
+    def getHighestJobNameSuffix(self, job_name: str) -> int:
+        ''' Return the highest NUMBER of the archived jobs named job_name_(NUMBER).
+
+        Return 0 if only job_name itself is archived and None if neither is archived.
+        '''
+        self.loadJobs()
+        return self.job_name_suffixes.get(job_name)
+
+    def getJobDict(self, job_name: str) -> dict:
+        ''' Return the archived job dict, or None if the job is not archived. '''
+        return self.loadJobs().get(job_name)
+
+    def searchJobs(self, match_str: str) -> list:
+        ''' Return the archived job dicts with a job name containing match_str. '''
+        return [job_dict for job_name, job_dict in self.loadJobs().items()
+                if match_str.lower() in job_name.lower()]
+
+    def getZipGlobalPath(self, job_name: str) -> str:
+        ''' Return the path toward the zipped job folder. '''
+        return os.path.join(self.archive_folder_path, job_name + '.zip')
+
+    def getStagedFolderGlobalPath(self, job_name: str) -> str:
+        ''' Return where a job folder waits to be zipped. '''
+        return os.path.join(self.archive_folder_path, job_name)
+
+    def stageJobFolder(self, job_name: str, job_folder_global_path: str) -> str:
+        ''' Move the job folder to the archive folder, return where it was moved to. '''
+
+        if not os.path.exists(self.archive_folder_path):
+            os.mkdir(self.archive_folder_path)
+
+        staged_folder_global_path = self.getStagedFolderGlobalPath(job_name)
+        if os.path.exists(staged_folder_global_path):
+            shutil.rmtree(staged_folder_global_path)
+
+        shutil.move(job_folder_global_path, staged_folder_global_path)
+        return staged_folder_global_path
+
+    def zipStagedJobFolders(self, job_names: list) -> list:
+        ''' Zip staged job folders and remove them, return error messages. '''
+
+        error_messages = []
+        for job_name in job_names:
+            staged_folder_global_path = self.getStagedFolderGlobalPath(job_name)
+            try:
+                shutil.make_archive(os.path.splitext(self.getZipGlobalPath(job_name))[0],
+                                    'zip', root_dir=staged_folder_global_path)
+                shutil.rmtree(staged_folder_global_path)
+            except OSError as exc:
+                error_messages.append(str(exc))
+
+        return error_messages
+
+    def restoreJobFolder(self, job_name: str, job_folder_global_path: str):
+        ''' Restore a job folder from its zip, or from the archive folder if it was not yet zipped. '''
+
+        staged_folder_global_path = self.getStagedFolderGlobalPath(job_name)
+        zip_global_path = self.getZipGlobalPath(job_name)
+
+        if os.path.exists(staged_folder_global_path):
+            shutil.copytree(staged_folder_global_path, job_folder_global_path)
+        elif os.path.exists(zip_global_path):
+            shutil.unpack_archive(zip_global_path, job_folder_global_path, 'zip')
+        else:
+            raise FileNotFoundError(f'could not find archived job folder {zip_global_path}')
+
+
+_job_archives = {}
+
+def get_job_archive(gv: dict) -> JobArchive:
+    ''' Return the shared job archive that belongs to the tracker file. '''
+
+    tracker_file_root = os.path.splitext(os.path.abspath(gv['TRACKER_FILE_PATH']))[0]
+
+    if tracker_file_root not in _job_archives:
+        _job_archives[tracker_file_root] = JobArchive(tracker_file_root + '_archive.jsonl.gz',
+                                                      tracker_file_root + '_archive')
+
+    return _job_archives[tracker_file_root]
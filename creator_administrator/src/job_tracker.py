@@ -1,18 +1,31 @@
 import sys
 import json
-import shutil
+import sqlite3
 import copy
 import os
 import abc
 import re
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from unidecode import unidecode
 
 from PyQt6.QtWidgets import QWidget
 
-from src.directory_functions import delete_item
+from src.directory_functions import delete_item, delete_items_in_background
 from src.qmessagebox import YesOrNoMessageBox, InfoQMessageBox, TimedMessage, WarningQMessageBox
 from src.mail_manager import MailManager
+from src.tracker_cache import get_tracker_cache, TrackerConflictError
+from src.tracker_storage import migrate_json_to_sqlite, JournalTrackerStorage
+from src.tracker_serializers import get_tracker_serializer, TrackerFormatError
+from src.worker import Worker
+from src.job_archive import get_job_archive
+from src.tracker_backup import get_tracker_backup
+from src.tracker_search import get_tracker_search, tokenize
+from src.tracker_query import query_jobs, query_make_files
+from src.fs_snapshot import get_directory_snapshot
+from src.fs_scanner import normalize_path
+from src.sync_engine import find_missing_jobs, find_missing_files, find_orphan_folders, find_new_files, match_moved_files
+from src.content_hash import get_content_hash_cache
 
 class JobTracker:
     '''
@@ -27,11 +40,19 @@ class JobTracker:
         self.gv = gv
         self.parent= parent
         self.job_keys = ['job_name', 'job_folder_global_path', 'dynamic_job_name', 'status',
-                          'created_on_date', 'make_files', 'sender_name', 'sender_mail_adress', 'sender_mail_receive_time']
+                          'created_on_date', 'created_on_timestamp', 'make_files', 'sender_name', 'sender_mail_adress', 'sender_mail_receive_time']
         #TODO: its this actually needed? these job keys? sender_name is not always present for example
-        self.tracker_file_path = gv['TRACKER_FILE_PATH']
-        self.tracker_backup_file_path = gv['TRACKER_FILE_PATH'].replace("job_log.json",
-                                        "job_log_backup.json")
+        self.tracker_cache = get_tracker_cache(gv)
+        self.tracker_index = self.tracker_cache.index
+        self.job_archive = get_job_archive(gv)
+        self.tracker_search = get_tracker_search(self.tracker_cache, self.job_archive)
+        self.directory_snapshot = get_directory_snapshot(gv)
+        self.content_hash_cache = get_content_hash_cache(gv)
+        self.tracker_backup = get_tracker_backup(gv)
+        self.tracker_file_path = self.tracker_cache.storage.storage_path
+        tracker_file_root, tracker_file_extension = os.path.splitext(self.tracker_file_path)
+        # single backup copy made by older versions, replaced by the incremental tracker backups
+        self.tracker_backup_file_path = tracker_file_root + '_backup' + tracker_file_extension
 
     @abc.abstractmethod
     def addJob(self,
@@ -46,73 +67,230 @@ class JobTracker:
         ''' Add a job to the tracker. '''
 
     def readTrackerFile(self):
-        ''' Read the tracker file. '''
+        ''' Read the tracker file, the tracker file is only parsed if it changed.
 
-        with open(self.tracker_file_path, 'r' ) as tracker_file:
-            self.tracker_dict = json.load(tracker_file)
+        self.tracker_dict is the dict shared by all job trackers, only change it
+        through applyMutation so the index, the events and the storage follow.
+        '''
+        self.tracker_dict = self.tracker_cache.load()
+
+    def writeTrackerFile(self, changed_job_names=None, removed_job_names=None, mutation=None):
+        ''' Write the tracker file.
+
+        Pass the names of the changed and removed jobs so the storage backend only
+        has to write those, without job names the entire tracker is written.
+
+        Pass the mutation that changed the tracker dict, so it can be applied again
+        if another process wrote the tracker file in the meantime.
+        '''
+        try:
+            self.tracker_cache.dump(self.tracker_dict,
+                                    changed_job_names=changed_job_names,
+                                    removed_job_names=removed_job_names,
+                                    mutation=mutation)
+        except TrackerConflictError as exc:
+            self.warnTrackerConflict(exc)
+
+        self.compactJournalIfNeeded()
+
+    def warnTrackerConflict(self, exc: TrackerConflictError):
+        ''' Warn that changes were dropped because another PC changed the same jobs. '''
+        WarningQMessageBox(parent=self.parent, gv=self.gv,
+                text='Another PC changed the job tracker at the same time, these changes are not saved: '\
+                        + ', '.join(exc.mutation_names))
+
+    def applyMutation(self, mutation, changed_job_names=None, removed_job_names=None):
+        ''' Apply a mutation function to the tracker dict and write the tracker file. '''
+        mutation(self.tracker_dict)
+        self.writeTrackerFile(changed_job_names=changed_job_names,
+                              removed_job_names=removed_job_names,
+                              mutation=mutation)
+
+    @contextmanager
+    def transaction(self):
+        ''' Group tracker mutations, the tracker is read once and written once at the end.
+
+        Usage:
+            with job_tracker.transaction():
+                job_tracker.markFilesAsDone(...)
+                job_tracker.updateJobKey(...)
+
+        If an exception is raised nothing is written and the tracker is read again.
+        '''
+
+        self.readTrackerFile()
+        self.tracker_cache.begin()
+        try:
+            yield self
+        except BaseException:
+            self.tracker_cache.rollback()
+            raise
+
+        try:
+            self.tracker_cache.commit()
+        except TrackerConflictError as exc:
+            self.warnTrackerConflict(exc)
+        self.compactJournalIfNeeded()
 
-    def writeTrackerFile(self):
-        ''' Write the tracker file. '''
-        with open(self.tracker_file_path, 'w' ) as tracker_file:
-            json.dump(self.tracker_dict, tracker_file, indent=4)
+    def subscribeToChanges(self, callback) -> int:
+        ''' Call callback with a list of TrackerEvents after every tracker write, return the subscription id. '''
+        return self.tracker_cache.event_feed.subscribe(callback)
+
+    def unsubscribeFromChanges(self, subscription_id: int):
+        ''' Stop calling the callback of a subscription. '''
+        self.tracker_cache.event_feed.unsubscribe(subscription_id)
+
+    def getTrackerLoadCount(self) -> int:
+        ''' Return how often the tracker was read from storage.
+
+        If the count changed the tracker was (also) written by another process,
+        those changes are not published as TrackerEvents.
+        '''
+        self.readTrackerFile()
+        return self.tracker_cache.load_count
+
+    def compactJournalIfNeeded(self):
+        ''' Compact the journal in the background once it passed the threshold. '''
+
+        storage = self.tracker_cache.storage
+        if isinstance(storage, JournalTrackerStorage) and storage.needsCompaction():
+            if 'THREAD_POOL' in self.gv:
+                self.gv['THREAD_POOL'].start(Worker(storage.compact))
+            else:
+                storage.compact()
 
     def deleteJob(self, job_name: str):
         ''' Delete a job from the job tracker. '''
 
         self.readTrackerFile()
 
-        deleted_job_dict = self.tracker_dict.pop(job_name)
-        delete_item(self.parent, self.gv, deleted_job_dict['job_folder_global_path'])
+        job_folder_global_path = self.tracker_dict[job_name]['job_folder_global_path']
+
+        def removeJob(tracker_dict: dict):
+            tracker_dict.pop(job_name, None)
 
-        self.writeTrackerFile()
+        self.applyMutation(removeJob, removed_job_names=[job_name])
+
+        delete_item(self.parent, self.gv, job_folder_global_path)
+
+    def deleteJobs(self, job_names: list):
+        ''' Delete jobs from the job tracker with a single write, the job folders are removed in the background. '''
+
+        self.readTrackerFile()
+
+        job_folder_global_paths = [self.tracker_dict[job_name]['job_folder_global_path'] for job_name in job_names]
+
+        def removeJobs(tracker_dict: dict):
+            for job_name in job_names:
+                tracker_dict.pop(job_name, None)
+
+        self.applyMutation(removeJobs, removed_job_names=job_names)
+
+        delete_items_in_background(self.parent, self.gv, job_folder_global_paths)
+
+    @abc.abstractmethod
+    def checkHealth(self, full_rescan=False):
+        ''' Check and repair system, with full_rescan also inspect the folders that did not change. '''
 
     @abc.abstractmethod
-    def checkHealth(self):
-        ''' Check and repair system. '''
+    def checkChangedFolders(self, changed_folder_paths: list):
+        ''' Synchronize the tracker with the folders the job folder watcher saw change. '''
+
+    def usesJournal(self) -> bool:
+        ''' Return True if the tracker is stored as a snapshot with a journal. '''
+        return isinstance(self.tracker_cache.storage, JournalTrackerStorage)
 
     def createTrackerFile(self):
         ''' Create the file that tracks jobs. '''
-        if os.path.exists(self.tracker_backup_file_path):
+        if self.migrateJsonTrackerFile():
+            return
+
+        if self.hasBackup():
             if YesOrNoMessageBox(self.parent,
-                     text=f"Backup file detected at: {self.tracker_backup_file_path}'\
-                         ', do you want to restore it?").answer():
-                os.rename(self.tracker_backup_file_path, self.tracker_file_path)
+                     text=f"Backup detected from {self.getBackupDescription()}, do you want to restore it?").answer():
+                self.restoreLatestBackup()
                 InfoQMessageBox(self.parent, "Backup restored!")
                 return
 
-        with open(self.tracker_file_path, 'w' ) as tracker_file:
-            json.dump({}, tracker_file, indent=4)
+        self.tracker_cache.storage.create()
+        self.tracker_cache.invalidate()
 
         InfoQMessageBox(self.parent, text='New job tracker file created')
 
+    def migrateJsonTrackerFile(self) -> bool:
+        ''' Migrate an existing json tracker file to the SQLite backend, return True if migrated. '''
+
+        json_tracker_file_path = self.gv['TRACKER_FILE_PATH']
+
+        if self.gv.get('TRACKER_BACKEND', 'json') != 'sqlite' or not os.path.exists(json_tracker_file_path):
+            return False
+
+        n_jobs = migrate_json_to_sqlite(json_tracker_file_path, self.tracker_file_path)
+        self.tracker_cache.invalidate()
+        InfoQMessageBox(self.parent, text=f'Migrated {n_jobs} jobs from {json_tracker_file_path} to {self.tracker_file_path}')
+        return True
+
     def checkTrackerFileHealth(self):
         if not os.path.exists(self.tracker_file_path):
             self.createTrackerFile()
 
+        # fold a journal left behind by the journal backend into the json tracker file
+        journal_storage = JournalTrackerStorage(self.gv['TRACKER_FILE_PATH'], get_tracker_serializer(self.gv))
+        if not self.usesJournal() and journal_storage.exists() and os.path.exists(journal_storage.journal_path):
+            journal_storage.compact()
+            os.remove(journal_storage.journal_path)
+            self.tracker_cache.invalidate()
+
         try:
             self.readTrackerFile()
-        except json.decoder.JSONDecodeError:
-            if os.path.isfile(self.tracker_backup_file_path):
+        except (json.decoder.JSONDecodeError, TrackerFormatError, sqlite3.DatabaseError):
+            if self.hasBackup():
                 if YesOrNoMessageBox(self.parent,
-                             'Do you want to restore the backup tracker file (Y/n)?'):
+                             f'Do you want to restore the backup from {self.getBackupDescription()} (Y/n)?').answer():
                     os.remove(self.tracker_file_path)
-                    os.rename(self.tracker_backup_file_path, self.tracker_file_path)
+                    self.restoreLatestBackup()
 
             elif YesOrNoMessageBox(self.parent,
-                           'Do you want to create a new empty tracker file (Y/n)?'):
-                with open(self.tracker_file_path, 'w' ) as tracker_file:
-                    json.dump({}, tracker_file, indent=4)
+                           'Do you want to create a new empty tracker file (Y/n)?').answer():
+                os.remove(self.tracker_file_path)
+                self.tracker_cache.storage.create()
+                self.tracker_cache.invalidate()
             else:
                 InfoQMessageBox(self.parent, "Could not load tracker file, closing application.")
                 sys.exit(0)
 
     def makeBackup(self):
-        ''' Make a backup of the tracker file. '''
-        try:
-            shutil.copy(self.tracker_file_path, self.tracker_backup_file_path)
-        except FileExistsError:
+        ''' Back up the jobs that changed since the last backup. '''
+
+        self.readTrackerFile()
+        self.tracker_backup.backup(self.tracker_dict)
+
+        if os.path.exists(self.tracker_backup_file_path):
             os.remove(self.tracker_backup_file_path)
-            shutil.copy(self.tracker_file_path, self.tracker_backup_file_path)
+
+    def hasBackup(self) -> bool:
+        ''' Return True if there is a backup to restore. '''
+        return len(self.tracker_backup.listBackupNames()) > 0 or os.path.exists(self.tracker_backup_file_path)
+
+    def getBackupDescription(self) -> str:
+        ''' Return when the latest backup was made. '''
+
+        backups = self.tracker_backup.listBackups()
+        if len(backups) > 0:
+            return f'{backups[-1][1]:%d-%m-%Y %H:%M}'
+        return self.tracker_backup_file_path
+
+    def restoreLatestBackup(self):
+        ''' Replace the tracker with the latest backup. '''
+
+        if len(self.tracker_backup.listBackupNames()) > 0:
+            tracker_dict = self.tracker_backup.restore()
+            self.tracker_cache.storage.create()
+            self.tracker_cache.storage.dump(tracker_dict)
+        else:
+            os.rename(self.tracker_backup_file_path, self.tracker_file_path)
+
+        self.tracker_cache.invalidate()
 
     def updateJobKey(self, job_key: str, job_name: str, new_value: str):
         ''' Update job key with a new value. '''
@@ -123,9 +301,10 @@ class JobTracker:
         assert job_key in self.job_keys, f'job key {job_key} is not an existing job key'
         assert job_key in self.tracker_dict[job_name], f'{job_key} not found in job {job_name}'
 
-        self.tracker_dict[job_name][job_key] = new_value
+        def setJobKey(tracker_dict: dict):
+            tracker_dict[job_name][job_key] = new_value
 
-        self.writeTrackerFile()
+        self.applyMutation(setJobKey, changed_job_names=[job_name])
 
     def markFilesAsDone(self, job_name: str, file_global_path: str, done: bool, all_files_done=False):
         ''' Update one or all make files to done. '''
@@ -136,14 +315,14 @@ class JobTracker:
         assert isinstance(done, bool), 'done is not a boolean'
         assert job_name in self.tracker_dict, f'job name {job_name} not found in tracker dict'
 
-
-        for file_dict in self.tracker_dict[job_name]['make_files'].values():
-            if all_files_done:
-                file_dict['done'] = done
-            elif file_dict['file_global_path']==file_global_path:
+        def setFilesDone(tracker_dict: dict):
+            for file_dict in tracker_dict[job_name]['make_files'].values():
+                if all_files_done:
                     file_dict['done'] = done
+                elif file_dict['file_global_path']==file_global_path:
+                        file_dict['done'] = done
 
-        self.writeTrackerFile()
+        self.applyMutation(setFilesDone, changed_job_names=[job_name])
 
     def updateJobName(self, job_name: str, new_job_name: str):
         ''' Update job name to new job name. '''
@@ -152,12 +331,14 @@ class JobTracker:
         assert job_name in self.tracker_dict, f'could not find job name {job_name} in tracker file.'
         assert new_job_name not in self.tracker_dict, f'already found new job name {job_name} in tracker file.'
 
-        job_dict = self.tracker_dict.pop(job_name)
-        job_dict['job_name'] = new_job_name
-        job_dict['dynamic_job_name'] = job_dict['dynamic_job_name'].replace(job_name, new_job_name)
-        self.tracker_dict[new_job_name] = job_dict
+        def renameJob(tracker_dict: dict):
+            assert new_job_name not in tracker_dict, f'already found new job name {job_name} in tracker file.'
+            job_dict = tracker_dict.pop(job_name)
+            job_dict['job_name'] = new_job_name
+            job_dict['dynamic_job_name'] = job_dict['dynamic_job_name'].replace(job_name, new_job_name)
+            tracker_dict[new_job_name] = job_dict
 
-        self.writeTrackerFile()
+        self.applyMutation(renameJob, changed_job_names=[new_job_name], removed_job_names=[job_name])
 
     def isJobOld(self, created_on_date: str) -> bool:
         ''' Check if the job is old. '''
@@ -173,12 +354,12 @@ class JobTracker:
         return all(file_dict['done'] for file_dict in self.tracker_dict[job_name]['make_files'].values())
 
     def getJobDict(self, job_name: str) -> dict:
-        ''' Return the job dict from a job name. '''
+        ''' Return a copy of the job dict from a job name, change the job with applyMutation or updateJobKey. '''
 
         self.readTrackerFile()
 
         if job_name in self.tracker_dict:
-            return self.tracker_dict[job_name]
+            return copy.deepcopy(self.tracker_dict[job_name])
         return None
 
     def getMakeFilesString(self, job_name: str) -> str:
@@ -204,8 +385,11 @@ class JobTracker:
         return self.tracker_dict[job_name][job_key]
 
 
-    def getStaticAndDynamicJobNames(self, filter_jobs_on=None, filter_str=None) -> list[tuple]:
-        ''' Return a list containing all static and dynamic job names that can be filtered on status and matching pattern. '''
+    def getStaticAndDynamicJobNames(self, filter_jobs_on=None, filter_str=None, include_archived=False) -> list[tuple]:
+        ''' Return a list containing all static and dynamic job names that can be filtered on status and matching pattern.
+
+        With include_archived the matching archived jobs are added, their dynamic job name is marked as archived.
+        '''
 
         if filter_jobs_on is not None:
             assert filter_str is not None, 'filter string should not be None'
@@ -214,34 +398,84 @@ class JobTracker:
         self.readTrackerFile()
 
         if filter_jobs_on is None:
-            return [(job_name, job_dict['dynamic_job_name']) for job_name, job_dict in self.tracker_dict.items()]
+            return self.queryJobs(fields=('job_name', 'dynamic_job_name'))
 
         if filter_jobs_on == 'status':
-            return [(job_name, job_dict['dynamic_job_name']) for 
-                job_name, job_dict in self.tracker_dict.items() if job_dict['status'] == filter_str]
+            return self.queryJobs(where={'status': filter_str}, fields=('job_name', 'dynamic_job_name'))
 
         if filter_jobs_on == 'match':
-            return [(job_name, job_dict['dynamic_job_name']) for 
-                job_name, job_dict in self.tracker_dict.items() if filter_str.lower() in job_name.lower()]
+            job_names = self.queryJobs(where={'job_name': lambda job_name: filter_str.lower() in job_name.lower()},
+                                       fields=('job_name', 'dynamic_job_name'))
+
+            if include_archived:
+                job_names += [(job_dict['job_name'], job_dict['dynamic_job_name']+' (archived)') for
+                    job_dict in self.job_archive.searchJobs(filter_str) if job_dict['job_name'] not in self.tracker_dict]
+
+            return job_names
 
         raise ValueError('Should not reach this point')
 
+    def queryJobs(self, where=None, order_by=None, descending=False, fields=None, limit=None) -> list:
+        ''' Return the jobs that meet all where conditions, see src.tracker_query.
+
+        e.g. queryJobs(where={'status': ('WACHTRIJ', 'GESLICED')}, order_by='created_on_timestamp',
+                       fields=('job_name', 'dynamic_job_name'), limit=10)
+        '''
+
+        self.readTrackerFile()
+
+        return query_jobs(self.tracker_dict, self.tracker_index, where=where, order_by=order_by,
+                          descending=descending, fields=fields, limit=limit)
+
+    def queryMakeFiles(self, where=None, order_by=None, descending=False, fields=None, limit=None) -> list:
+        ''' Return the make files that meet all where conditions, see src.tracker_query.
+
+        e.g. queryMakeFiles(where={'status': 'WACHTRIJ', 'material': 'MDF', 'done': False},
+                            fields=('file_key', 'file_global_path'))
+        '''
+
+        self.readTrackerFile()
+
+        return query_make_files(self.tracker_dict, self.tracker_index, where=where, order_by=order_by,
+                                descending=descending, fields=fields, limit=limit)
+
+    def searchJobs(self, query: str, include_archived=True) -> list[tuple]:
+        ''' Return static and dynamic job names of the jobs matching the query, best match first.
+
+        Every word in the query should start a word in the job name, sender, make files, material or status.
+        Without words in the query all jobs are returned.
+        '''
+
+        if len(tokenize(query)) == 0:
+            return self.getStaticAndDynamicJobNames(filter_jobs_on='match', filter_str='', include_archived=include_archived)
+
+        return self.tracker_search.search(query, include_archived=include_archived)
+
+    def getStats(self, queue_statuses=('WACHTRIJ',)) -> dict:
+        ''' Return the number of jobs per status, the number of jobs with a queue status and
+        per material the jobs and make files with a queue status, without looking at the jobs.
+
+        {'jobs_per_status': {status: number of jobs},
+         'jobs_in_queue': number of jobs,
+         'materials_in_queue': {material: {'jobs': n, 'make_files': n, 'make_files_not_done': n}}}
+        '''
+
+        self.readTrackerFile()
+
+        return self.tracker_index.getStats(queue_statuses)
+
     def getNumberOfJobsWithStatus(self, status_list: list) -> int:
         ''' Return the number of jobs that have a certain status. '''
 
         self.readTrackerFile()
 
-        return len([job_key for job_key, job_value in self.tracker_dict.items() if job_value['status'] in status_list])
+        return sum(self.tracker_index.getNumberOfJobsWithStatus(status) for status in status_list)
 
     def fileGlobalPathToJobName(self, file_global_path: str) -> str:
         ''' Return a job name from file any file in the job folder. '''
         self.readTrackerFile()
 
-        for job_dict in self.tracker_dict.values():
-            if file_global_path.startswith(job_dict['job_folder_global_path']):
-                return job_dict['job_name']
-            
-        return None
+        return self.tracker_index.getJobNameFromPath(file_global_path)
 
 
     def makeJobNameUnique(self, job_name: str) -> str:
@@ -249,54 +483,170 @@ class JobTracker:
 
         if the job name already exists append _(NUMBER) to job name to make it unique
         if the job_name is unique but job_name_(NUMBER) exist then return job_name_(NUMBER+1).
+        Archived jobs count as existing jobs, their records and zips are stored by job name.
         '''
 
         job_name = unidecode(job_name)
 
-        max_job_number = 0
-        does_job_name_exist = False
-
         self.readTrackerFile()
 
-        for job_dict in self.tracker_dict.values():
-
-            match_job_number= re.search(rf'{job_name}_\((\d+)\)$', job_dict['job_name'])
-            if job_name == job_dict['job_name']:
-                does_job_name_exist = True
-
-            if match_job_number:
-                does_job_name_exist = True
-                job_number = int(match_job_number.group(1))
-                max_job_number = max(job_number, max_job_number)
+        max_job_numbers = [max_job_number for max_job_number
+                           in (self.tracker_index.getHighestJobNameSuffix(job_name),
+                               self.job_archive.getHighestJobNameSuffix(job_name))
+                           if max_job_number is not None]
 
-        if max_job_number == 0:
-            if does_job_name_exist:
-                return job_name + '_(1)'
+        if len(max_job_numbers) == 0:
             return job_name
-        return job_name + '_(' + str(max_job_number + 1) + ')'
+        return job_name + '_(' + str(max(max_job_numbers) + 1) + ')'
 
     def deleteOldJobs(self):
         ''' Delete the old jobs from tracker and file system. '''
 
         self.readTrackerFile()
 
-        # remove old jobs
-        n_old_jobs = 0
+        # a job is old if more than DAYS_TO_KEEP_JOBS entire days passed since it was created
+        cutoff_timestamp = (datetime.now() - timedelta(days=self.gv['DAYS_TO_KEEP_JOBS'] + 1)).timestamp()
+        old_job_names = self.tracker_index.getExpiredJobNames(cutoff_timestamp)
+        n_old_jobs = len(old_job_names)
 
-        for job_key, job_dict in self.tracker_dict.items():
-            created_on_date_object = datetime.strptime(job_dict['created_on_date'], "%d-%m-%Y")
-            current_date_object = datetime.now()
-            date_difference = current_date_object - created_on_date_object
+        if n_old_jobs > 0:
+            self.deleteJobs(old_job_names)
 
+            TimedMessage(parent=self.parent, gv=self.gv, text=f'Removed {str(n_old_jobs)} old jobs')
 
-            if date_difference.days > self.gv['DAYS_TO_KEEP_JOBS'] and job_dict['status'] != 'WACHTRIJ':
-                n_old_jobs += 1
-                self.deleteJob(job_key)
+    def archiveFinishedJobs(self):
+        ''' Move finished jobs older than ARCHIVE_FINISHED_JOBS_AFTER_DAYS from the tracker to the job archive. '''
 
-        if n_old_jobs > 0:
-            TimedMessage(parent=self.parent, gv=self.gv, text=f'Removed {str(n_old_jobs)} old jobs')
+        if self.gv.get('ARCHIVE_FINISHED_JOBS_AFTER_DAYS') is None:
+            return
+
+        self.readTrackerFile()
+
+        cutoff_timestamp = (datetime.now() - timedelta(days=self.gv['ARCHIVE_FINISHED_JOBS_AFTER_DAYS'] + 1)).timestamp()
+        finished_job_names = [job_name for job_name in self.tracker_index.getExpiredJobNames(cutoff_timestamp)
+                              if self.tracker_dict[job_name]['status'] in ('VERWERKT', 'AFGEKEURD')]
+
+        if len(finished_job_names) == 0:
+            return
 
-        self.writeTrackerFile()
+        archived_on_timestamp = datetime.now().timestamp()
+        archive_job_dicts = [dict(self.tracker_dict[job_name], archived_on_timestamp=archived_on_timestamp)
+                             for job_name in finished_job_names]
+
+        # first archive, then remove from the tracker, a crash in between leaves the job in both
+        self.job_archive.archiveJobs(archive_job_dicts)
+
+        job_folder_global_paths = [self.tracker_dict[job_name]['job_folder_global_path'] for job_name in finished_job_names]
+
+        def removeJobs(tracker_dict: dict):
+            for job_name in finished_job_names:
+                tracker_dict.pop(job_name, None)
+
+        self.applyMutation(removeJobs, removed_job_names=finished_job_names)
+
+        def show_errors(error_messages: list):
+            if len(error_messages) > 0:
+                WarningQMessageBox(parent=self.parent, gv=self.gv, text='Could not zip archived jobs: ' + '\n'.join(error_messages))
+
+        def stage_job_folders():
+            # the job folders are only moved once the jobs are removed from the tracker file
+            self.readTrackerFile()
+
+            staged_job_names = []
+            for job_name, job_folder_global_path in zip(finished_job_names, job_folder_global_paths):
+                if job_name not in self.tracker_dict and os.path.exists(job_folder_global_path):
+                    self.job_archive.stageJobFolder(job_name, job_folder_global_path)
+                    staged_job_names.append(job_name)
+
+            if 'THREAD_POOL' in self.gv:
+                zip_worker = Worker(self.job_archive.zipStagedJobFolders, staged_job_names)
+                zip_worker.signals.result.connect(show_errors)
+                self.gv['THREAD_POOL'].start(zip_worker)
+            else:
+                show_errors(self.job_archive.zipStagedJobFolders(staged_job_names))
+
+            TimedMessage(parent=self.parent, gv=self.gv, text=f'Archived {str(len(finished_job_names))} finished jobs')
+
+        # inside a transaction (e.g. checkHealth) a rollback keeps the jobs, so their folders should stay too
+        self.tracker_cache.afterCommit(stage_job_folders)
+
+    def isJobArchived(self, job_name: str) -> bool:
+        ''' Return True if the job is in the job archive and not in the tracker. '''
+        self.readTrackerFile()
+        return job_name not in self.tracker_dict and self.job_archive.getJobDict(job_name) is not None
+
+    def restoreArchivedJob(self, job_name: str):
+        ''' Copy an archived job and its job folder back into the tracker. '''
+
+        self.readTrackerFile()
+
+        job_dict = copy.deepcopy(self.job_archive.getJobDict(job_name))
+        job_dict.pop('archived_on_timestamp', None)
+
+        if not os.path.exists(job_dict['job_folder_global_path']):
+            self.job_archive.restoreJobFolder(job_name, job_dict['job_folder_global_path'])
+
+        def addJob(tracker_dict: dict):
+            tracker_dict[job_name] = job_dict
+
+        self.applyMutation(addJob, changed_job_names=[job_name])
+
+    def scanJobFolders(self):
+        ''' Inspect JOBS_DIR_HOME and all job folders in parallel.
+
+        The health check phases that follow read the listings from the directory
+        snapshot, instead of listing the same folders one by one.
+        '''
+
+        self.readTrackerFile()
+
+        job_folder_global_paths = {job_dict['job_folder_global_path'] for job_dict in self.tracker_dict.values()
+                                   if 'job_folder_global_path' in job_dict}
+
+        self.directory_snapshot.prefetch([self.gv['JOBS_DIR_HOME']] +
+                                         [os.path.dirname(job_folder_global_path) for job_folder_global_path in job_folder_global_paths])
+
+        job_folder_names = self.directory_snapshot.getEntries(self.gv['JOBS_DIR_HOME']) or set()
+        self.directory_snapshot.prefetch(sorted(job_folder_global_paths | {os.path.join(self.gv['JOBS_DIR_HOME'], job_folder_name)
+                                                                           for job_folder_name in job_folder_names}))
+
+    def reconcileChangedFolders(self, changed_folder_paths: list, create_jobs_from_file_system_dialog):
+        ''' Synchronize the tracker with changed folders, only the jobs in those folders are checked.
+
+        A changed JOBS_DIR_HOME means job folders were added or removed, a changed
+        job folder means files in that job were added, removed or renamed.
+        '''
+
+        jobs_dir_home = normalize_path(self.gv['JOBS_DIR_HOME'])
+        changed_folder_paths = [normalize_path(folder_path) for folder_path in changed_folder_paths]
+
+        self.system_healthy = True
+
+        with self.directory_snapshot.check(prune=False):
+            for folder_path in changed_folder_paths:
+                self.directory_snapshot.invalidate(folder_path)
+            self.directory_snapshot.prefetch(changed_folder_paths)
+
+            changed_job_names = [self.fileGlobalPathToJobName(folder_path) for folder_path in changed_folder_paths]
+
+            changed_job_names = [job_name for job_name in changed_job_names if job_name is not None]
+            changed_job_folder_paths = [folder_path for folder_path in changed_folder_paths
+                                        if os.path.dirname(folder_path) == jobs_dir_home]
+
+            with self.transaction():
+                if jobs_dir_home in changed_folder_paths:
+                    self.deleteNonExitentJobsFromTrackerFile()
+                self.moveRenamedFilesInTrackerFile(job_folder_global_paths=changed_job_folder_paths,
+                                                   job_names=changed_job_names)
+                self.deleteNonExitentFilesFromTrackerFile(job_names=changed_job_names)
+
+            if jobs_dir_home in changed_folder_paths:
+                self.addNewJobstoTrackerFile(create_jobs_from_file_system_dialog)
+
+            self.addNewFilestoTrackerFile(create_jobs_from_file_system_dialog,
+                                          job_folder_global_paths=changed_job_folder_paths)
+
+        self.hashMakeFiles()
 
     def deleteNonExitentJobsFromTrackerFile(self):
         ''' Delete the jobs from tracker file that cannot be found on the file system. '''
@@ -304,33 +654,105 @@ class JobTracker:
         self.readTrackerFile()
 
         # find non existent jobs
-        non_existent_job_keys = []
-        for job_key, job_dict in self.tracker_dict.items():
-            if not os.path.exists(job_dict['job_folder_global_path']):
-                non_existent_job_keys.append(job_key)
+        non_existent_job_keys = find_missing_jobs(self.tracker_dict, self.directory_snapshot.exists)
+
+        if len(non_existent_job_keys) == 0:
+            return
 
         # delete non existent jobs from tracker file
-        for key in non_existent_job_keys:
-            self.tracker_dict.pop(key) 
+        def removeJobs(tracker_dict: dict):
+            for key in non_existent_job_keys:
+                tracker_dict.pop(key, None)
+
+        self.applyMutation(removeJobs, removed_job_names=non_existent_job_keys)
+
+    def moveRenamedFilesInTrackerFile(self, job_folder_global_paths=None, job_names=None):
+        ''' Update the make files that were renamed or moved to another job folder, matched by content hash.
+
+        With job_folder_global_paths and job_names only the new files in those
+        job folders and the missing files of those jobs are matched.
+        '''
 
-        self.writeTrackerFile()
+        self.readTrackerFile()
+
+        missing_files = find_missing_files(self.tracker_dict, self.directory_snapshot.exists, job_names=job_names)
+        if len(missing_files) == 0:
+            return
+
+        if job_folder_global_paths is None:
+            job_folder_global_paths = [os.path.join(self.gv['JOBS_DIR_HOME'], job_folder_name)
+                                       for job_folder_name in self.directory_snapshot.listDirectory(self.gv['JOBS_DIR_HOME']) or []]
+
+        new_files = find_new_files(self.tracker_dict, job_folder_global_paths,
+                                   self.directory_snapshot.getEntries, self.gv['ACCEPTED_EXTENSIONS'])
+
+        moved_files = match_moved_files(self.tracker_dict, missing_files, new_files, self.content_hash_cache.getDigest)
+        if len(moved_files) == 0:
+            return
+
+        def moveMakeFiles(tracker_dict: dict):
+            for job_name, file_key, new_job_name, new_file_global_path in moved_files:
+                file_dict = tracker_dict[job_name]['make_files'].pop(file_key)
+                file_name = os.path.basename(new_file_global_path)
+                file_dict['file_name'] = file_name
+                file_dict['file_global_path'] = new_file_global_path
+                tracker_dict[new_job_name]['make_files'][new_job_name + '_' + file_name] = file_dict
+
+        self.applyMutation(moveMakeFiles, changed_job_names=list(dict.fromkeys(
+            job_name for moved_file in moved_files for job_name in (moved_file[0], moved_file[2]))))
+
+    def hashMakeFiles(self):
+        ''' Record the content hash of the make files that have none, hashing runs in the background. '''
+
+        file_global_paths = self.queryMakeFiles(where={'content_hash': None}, fields='file_global_path')
+        if len(file_global_paths) == 0:
+            return
+
+        if 'THREAD_POOL' in self.gv:
+            hash_worker = Worker(self.content_hash_cache.getDigests, file_global_paths)
+            hash_worker.signals.result.connect(self.recordContentHashes)
+            self.gv['THREAD_POOL'].start(hash_worker)
+        else:
+            self.recordContentHashes(self.content_hash_cache.getDigests(file_global_paths))
+
+    def recordContentHashes(self, digests: dict):
+        ''' Store the content hashes in the make files, digests map a file global path to its digest. '''
 
-    def deleteNonExitentFilesFromTrackerFile(self):
-        ''' Delete job files from tracker file that cannot be found on the file system. '''
         self.readTrackerFile()
 
-        for job_dict in self.tracker_dict.values():
-            temp_remove_keys = []
-            # find non existent make files
-            for file_key, file_dict in job_dict['make_files'].items():
-                if not os.path.exists(file_dict['file_global_path']):
-                    temp_remove_keys.append(file_key)
+        make_file_digests = [(job_name, file_key, digests[file_global_path]) for job_name, file_key, file_global_path
+                             in self.queryMakeFiles(where={'file_global_path': tuple(digests)},
+                                                    fields=('job_name', 'file_key', 'file_global_path'))]
+
+        def setContentHashes(tracker_dict: dict):
+            for job_name, file_key, digest in make_file_digests:
+                tracker_dict[job_name]['make_files'][file_key]['content_hash'] = digest
 
-            # delete non existent make files from tracker file
-            for key in temp_remove_keys:
-                job_dict['make_files'].pop(key) 
+        if len(make_file_digests) > 0:
+            self.applyMutation(setContentHashes, changed_job_names=list(dict.fromkeys(
+                job_name for job_name, _, _ in make_file_digests)))
 
-        self.writeTrackerFile()
+        self.content_hash_cache.save(keep_file_paths=self.queryMakeFiles(fields='file_global_path'))
+
+    def deleteNonExitentFilesFromTrackerFile(self, job_names=None):
+        ''' Delete job files from tracker file that cannot be found on the file system.
+
+        With job_names only the files of those jobs are checked.
+        '''
+        self.readTrackerFile()
+
+        missing_files = find_missing_files(self.tracker_dict, self.directory_snapshot.exists, job_names=job_names)
+
+        if len(missing_files) == 0:
+            return
+
+        # delete non existent make files from tracker file
+        def removeMakeFiles(tracker_dict: dict):
+            for job_name, file_keys in missing_files.items():
+                for key in file_keys:
+                    tracker_dict[job_name]['make_files'].pop(key, None)
+
+        self.applyMutation(removeMakeFiles, changed_job_names=list(missing_files))
 
     def addNewJobstoTrackerFile(self, create_jobs_from_file_system_dialog): # pylint: disable=too-complex
         '''
@@ -343,11 +765,8 @@ class JobTracker:
         self.readTrackerFile()
 
         # find job on file system that are not in the tracker file
-        job_folder_not_in_tracker_global_paths = []
-        for job_folder_global_path in os.listdir(self.gv['JOBS_DIR_HOME']):
-            if not any([job_dict['job_folder_global_path'] == os.path.join(self.gv['JOBS_DIR_HOME'], job_folder_global_path) for job_dict in self.tracker_dict.values()]): # pylint: disable=use-a-generator
-
-                job_folder_not_in_tracker_global_paths.append(os.path.join(self.gv['JOBS_DIR_HOME'], job_folder_global_path))
+        job_folder_not_in_tracker_global_paths = find_orphan_folders(self.tracker_dict, self.gv['JOBS_DIR_HOME'],
+                                                                     self.directory_snapshot.getEntries)
 
         if len(job_folder_not_in_tracker_global_paths) > 0:
 
@@ -378,19 +797,21 @@ class JobTracker:
 
                 file_global_path_list = []
                 job_dict_list = []
+                added_job_names = []
 
                 for job_name, job_folder_global_path in zip(job_names_no_dates, job_folder_not_in_tracker_global_paths):
 
-                    file_global_path_list.append(os.listdir(job_folder_global_path))
+                    file_global_path_list.append(self.directory_snapshot.listDirectory(job_folder_global_path))
 
                     job_dict = {'job_name': job_name,
                                 'job_folder_global_path': job_folder_global_path,
                                 'make_files': {},
                                 'status': 'WACHTRIJ',
                                 'created_on_date': str(datetime.now().strftime("%d-%m-%Y")),
+                                'created_on_timestamp': datetime.now().timestamp(),
                                 'dynamic_job_name': str(datetime.now().strftime("%d-%m"))+'_'+job_name}
 
-                    mail_item_list = [os.path.join(job_folder_global_path, file) for file in os.listdir(job_folder_global_path) if file.lower().endswith(('.eml', '.msg'))]
+                    mail_item_list = [os.path.join(job_folder_global_path, file) for file in self.directory_snapshot.listDirectory(job_folder_global_path) if file.lower().endswith(('.eml', '.msg'))]
                     if len(mail_item_list) > 0:
 
                         job_dict['sender_name'] = MailManager(self.gv).getSenderName(mail_item_list[0])
@@ -400,9 +821,16 @@ class JobTracker:
                     job_dict_list.append(job_dict)
 
                     if job_dict['job_name'] not in self.tracker_dict:
-                        self.tracker_dict[job_dict['job_name']] = job_dict
+                        added_job_names.append(job_dict['job_name'])
+
+                added_job_dicts = {added_job_dict['job_name']: copy.deepcopy(added_job_dict) for added_job_dict in job_dict_list
+                                   if added_job_dict['job_name'] in added_job_names}
+
+                def addJobs(tracker_dict: dict):
+                    for added_job_name, added_job_dict in added_job_dicts.items():
+                        tracker_dict.setdefault(added_job_name, added_job_dict)
 
-                self.writeTrackerFile()
+                self.applyMutation(addJobs, changed_job_names=added_job_names)
 
                 # check for jobs with no make files, add them.
                 job_names_no_make_files = []
@@ -444,7 +872,11 @@ class JobTracker:
                                               update_existing_job=True,
                                               job_dict_list=job_dict_list)
 
-                    if dialog.exec() == 1:
+                    dialog_result = dialog.exec()
+                    for job_folder_global_path in job_folder_not_in_tracker_global_paths:
+                        self.directory_snapshot.invalidate(job_folder_global_path)
+
+                    if dialog_result == 1:
                         InfoQMessageBox(parent=self.parent,
                                 text=f'Added {len(job_folder_not_in_tracker_global_paths)} jobs to the Job Tracker.')
 
@@ -456,107 +888,77 @@ class JobTracker:
             else:
                 for job_folder_global_path in job_folder_not_in_tracker_global_paths:
                     delete_item(self.parent, self.gv, job_folder_global_path)
+                self.directory_snapshot.invalidate(self.gv['JOBS_DIR_HOME'])
 
                 InfoQMessageBox(parent=self.parent,
                              text=f'Deleted {len(job_folder_not_in_tracker_global_paths)} job folders from File System.')
 
 
-    def addNewFilestoTrackerFile(self, create_jobs_from_file_system_dialog): # pylint: disable=too-complex
+    def addNewFilestoTrackerFile(self, create_jobs_from_file_system_dialog, job_folder_global_paths=None): # pylint: disable=too-complex
         '''
         Synchronize job files on file system and tracker file by either:
 
             * adding the job files to the tracker file.
             or
             * removing the job files from file system.
+
+        With job_folder_global_paths only those job folders are synchronized.
          '''
         self.readTrackerFile()
 
-        for job_folder_name in os.listdir(self.gv['JOBS_DIR_HOME']):
-            job_folder_global_path = os.path.join(self.gv['JOBS_DIR_HOME'], job_folder_name)
-
-            job_dict = self.getJobDict(self.fileGlobalPathToJobName(job_folder_global_path))
-
-            if job_dict is None:
-                continue
-
-            # check if jobs are incomplete and must be repaired
-            if not self.IsJobDictAndFileSystemInSync(job_dict, job_folder_global_path):
-
-                valid_file_names = [file_name for file_name in os.listdir(
-                    job_folder_global_path) if file_name.lower().endswith(self.gv['ACCEPTED_EXTENSIONS'])]
+        if job_folder_global_paths is None:
+            job_folder_global_paths = [os.path.join(self.gv['JOBS_DIR_HOME'], job_folder_name)
+                                       for job_folder_name in self.directory_snapshot.listDirectory(self.gv['JOBS_DIR_HOME']) or []]
 
-                new_make_files = []
-                for file in valid_file_names:
-
-                    # for make_file_dict in job_dict['make_files'].values():
-                        # print(make_file_dict['file_global_path'])
-
-                    if not any([os.path.basename( # pylint: disable=use-a-generator
-                        make_file_dict['file_global_path'])==file for make_file_dict in job_dict['make_files'].values()]):
-                        new_make_files.append(os.path.join(job_folder_global_path, file))
-
-                        # print(f'appending this file now {file}')
-
-                # add/delete new files
-                if len(new_make_files) > 0:
-
-                    if len(new_make_files)==1:
-                        file_or_files = 'file'
-                        this_or_these = 'this'
-                    else:
-                        file_or_files = 'files'
-                        this_or_these = 'these'
+        new_files = find_new_files(self.tracker_dict, job_folder_global_paths,
+                                   self.directory_snapshot.getEntries, self.gv['ACCEPTED_EXTENSIONS'])
 
-                    yes_or_no_text = f'New {file_or_files} detected for job {job_dict["job_name"]}:\n'
-                    for file in new_make_files:
-                        yes_or_no_text += f'{os.path.basename(file)}\n'
+        for job_name, new_make_files in new_files.items():
+            job_dict = self.getJobDict(job_name)
+            job_folder_global_path = job_dict['job_folder_global_path']
 
-                    yes_or_no_text += f'\nWhat do you want with {this_or_these} {file_or_files}?'
-
-                    yes_or_no = YesOrNoMessageBox(parent=self.parent,
-                                                  text=yes_or_no_text,
-                                                  yes_button_text='Add to Job Tracker',
-                                                  no_button_text='Remove from File System')
-                    if yes_or_no.answer():
-
-
-                        dialog = create_jobs_from_file_system_dialog(self.parent,
-                                                        [job_dict['job_name']],
-                                                        [new_make_files],
-                                                        update_existing_job=True,
-                                                        job_dict_list=[job_dict])
+            if len(new_make_files)==1:
+                file_or_files = 'file'
+                this_or_these = 'this'
+            else:
+                file_or_files = 'files'
+                this_or_these = 'these'
 
-                        if dialog.exec() == 1:
-                            InfoQMessageBox(parent=self.parent,
-                                        text=f'Added {len(new_make_files)} new {file_or_files} to Job:  {job_dict["job_name"]}.')
+            yes_or_no_text = f'New {file_or_files} detected for job {job_dict["job_name"]}:\n'
+            for file in new_make_files:
+                yes_or_no_text += f'{os.path.basename(file)}\n'
 
-                        else:
-                             WarningQMessageBox(parent=self.parent, gv=self.gv, text='System not healthy 😟!')
-                             self.system_healthy = False
+            yes_or_no_text += f'\nWhat do you want with {this_or_these} {file_or_files}?'
 
+            yes_or_no = YesOrNoMessageBox(parent=self.parent,
+                                          text=yes_or_no_text,
+                                          yes_button_text='Add to Job Tracker',
+                                          no_button_text='Remove from File System')
+            if yes_or_no.answer():
 
-                    else:
-                        for file in new_make_files:
-                            delete_item(self.parent, self.gv,
-                                        os.path.join(job_folder_global_path, file))
 
-                        InfoQMessageBox(parent=self.parent, 
-                             text=f'Removed {len(new_make_files)} {file_or_files} from File System')
+                dialog = create_jobs_from_file_system_dialog(self.parent,
+                                                [job_dict['job_name']],
+                                                [new_make_files],
+                                                update_existing_job=True,
+                                                job_dict_list=[job_dict])
 
+                dialog_result = dialog.exec()
+                self.directory_snapshot.invalidate(job_folder_global_path)
 
+                if dialog_result == 1:
+                    InfoQMessageBox(parent=self.parent,
+                                text=f'Added {len(new_make_files)} new {file_or_files} to Job:  {job_dict["job_name"]}.')
 
-    def IsJobDictAndFileSystemInSync(self, job_dict, job_folder_global_path):
-        ''' Check for a job if all files are in both the tracker and the file system. '''
+                else:
+                     WarningQMessageBox(parent=self.parent, gv=self.gv, text='System not healthy 😟!')
+                     self.system_healthy = False
 
-        file_system_file_names = [file_name for file_name in os.listdir(
-            job_folder_global_path) if file_name.lower().endswith(self.gv['ACCEPTED_EXTENSIONS'])]
 
-        tracker_file_names = [os.path.basename(
-            file_dict['file_global_path']) for file_dict in job_dict['make_files'].values()]
+            else:
+                for file in new_make_files:
+                    delete_item(self.parent, self.gv, file)
+                self.directory_snapshot.invalidate(job_folder_global_path)
 
-        if len(file_system_file_names) != len(tracker_file_names):
-            return False
-        if not any(file_system_file_name==tracker_file_name for 
-                   file_system_file_name, tracker_file_name in zip(file_system_file_names, tracker_file_names)):
-            return False
-        return True
+                InfoQMessageBox(parent=self.parent, 
+                     text=f'Removed {len(new_make_files)} {file_or_files} from File System')
@@ -0,0 +1,199 @@
+'''
+A mail that is parsed once.
+
+The import dialog asks the mail manager for the sender, address, receive
+time, subject, body and attachments of the same mail, several times while a
+job request is handled. Every accessor used to parse the mail again.
+
+A MailItem wraps the forms a mail_item takes on linux, parses the mail on
+first use and memoizes each field. MailManager accepts a MailItem wherever
+it accepts a mail_item and hands the import dialog MailItems. A mail file in
+a job folder gets the same MailItem until the file changes.
+'''
+
+import os
+import re
+import shutil
+import email
+from collections import OrderedDict
+from functools import cached_property
+from email.policy import default
+
+from src.mail_spool import SpooledMail
+
+
+class MailItem:
+    ''' A mail whose headers, body text and attachments are computed once.
+
+    source is a SpooledMail, the response to an IMAP FETCH of one mail:
+    [(b'1 (UID 5 RFC822 {size}', mail bytes), b')'], an email.message.Message
+    or the global path of a mail.eml file.
+    '''
+
+    def __init__(self, source):
+        assert isinstance(source, (SpooledMail, list, email.message.Message, str)), \
+            f'cannot make a MailItem from a {type(source)}'
+        self.source = source
+
+    @cached_property
+    def message(self) -> email.message.Message:
+        ''' The parsed mail, for a spooled mail only its headers. '''
+
+        if isinstance(self.source, SpooledMail):
+            return self.source.headers
+
+        if isinstance(self.source, email.message.Message):
+            return self.source
+
+        if isinstance(self.source, list):
+            return email.message_from_bytes(self.source[0][1])
+
+        with open(self.source, 'rb') as mail_file:
+            return email.message_from_binary_file(mail_file, policy=default)
+
+    @cached_property
+    def uid(self) -> int:
+        ''' The IMAP UID, None for a mail that was not fetched by UID. '''
+
+        if isinstance(self.source, SpooledMail):
+            return self.source.uid
+
+        if isinstance(self.source, list):
+            uid_match = re.search(rb'UID (\d+)', self.source[0][0])
+            if uid_match:
+                return int(uid_match.group(1))
+
+        return None
+
+    @cached_property
+    def sequence_number(self) -> int:
+        ''' The IMAP sequence number of a mail fetched without UID, None otherwise. '''
+
+        if isinstance(self.source, list) and self.uid is None:
+            sequence_match = re.search(rb'\b(\d+)\b', self.source[0][0])
+            if sequence_match:
+                return int(sequence_match.group(1))
+
+        return None
+
+    @cached_property
+    def sender(self) -> str:
+        ''' The From header: first_name last_name <mail@adres.com>. '''
+        return self.message.get('From')
+
+    @cached_property
+    def email_address(self) -> str:
+        match = re.search(r'<(.*?)>', self.sender)
+        if match:
+            return str(match.group(1))
+        raise ValueError(f'Could not convert {self.sender} to mail adress')
+
+    @cached_property
+    def sender_name(self) -> str:
+        return mail_to_name(self.sender)
+
+    @cached_property
+    def receive_time(self) -> str:
+        return str(self.message['date'])
+
+    @cached_property
+    def subject(self) -> str:
+        return self.message.get('Subject')
+
+    @cached_property
+    def body(self) -> str:
+        ''' The html or plain text of the mail, the last text part if there are several. '''
+
+        mail_body = None
+        if isinstance(self.source, SpooledMail):
+            # only the text parts are decoded, the attachments are not read
+            for part in self.source.parts:
+                if part.get_content_type() == 'text/html' or \
+                        (part.get_content_type() == 'text/plain' and self.message.get_content_maintype() == 'multipart'):
+                    mail_body = part.getPayload()
+
+        elif self.message.is_multipart():
+            for part in self.message.walk():
+                # Check each part for HTML content
+                if part.get_content_type() == 'text/html':
+                    mail_body = part.get_payload(decode=True)
+
+                if part.get_content_type() == 'text/plain':
+                    mail_body = part.get_payload(decode=True)
+
+        elif self.message.get_content_type() == 'text/html':
+            mail_body = self.message.get_payload(decode=True)
+
+        if isinstance(mail_body, bytes):
+            mail_body = mail_body.decode('utf-8')
+
+        if mail_body is not None:
+            return mail_body
+
+        raise ValueError(f'Could not get mail Body from mail file type {type(self.message)}')
+
+    @cached_property
+    def attachments(self) -> list:
+        ''' The parts with a content disposition and a file name. '''
+
+        if isinstance(self.source, SpooledMail):
+            return self.source.getAttachments()
+
+        return [part for part in self.message.walk()
+                if part.get_content_maintype() != 'multipart'
+                and part.get('Content-Disposition') is not None
+                and part.get_filename() is not None]
+
+    def saveTo(self, file_global_path: str):
+        ''' Write the raw mail to a file. '''
+
+        if isinstance(self.source, SpooledMail):
+            self.source.saveTo(file_global_path)
+
+        elif isinstance(self.source, str):
+            shutil.copyfile(self.source, file_global_path)
+
+        else:
+            with open(file_global_path, 'wb') as mail_file:
+                mail_file.write(self.source[0][1] if isinstance(self.source, list) else self.source.as_bytes())
+
+
+_mail_items = OrderedDict()
+MAX_CACHED_MAIL_ITEMS = 16
+
+def get_mail_item(mail_file_global_path: str) -> MailItem:
+    ''' Return the shared MailItem of a mail file, a new MailItem if the file changed.
+
+    Only the MAX_CACHED_MAIL_ITEMS most recently used mail files are kept, a parsed mail holds its attachments.
+    '''
+
+    mail_file_global_path = os.path.abspath(mail_file_global_path)
+    stat = os.stat(mail_file_global_path)
+    cache_key = (mail_file_global_path, stat.st_mtime_ns, stat.st_size)
+
+    # the most recently used mail file moves to the end
+    cached_mail_item = _mail_items.pop(mail_file_global_path, None)
+    if cached_mail_item is not None and cached_mail_item[0] == cache_key:
+        mail_item = cached_mail_item[1]
+    else:
+        mail_item = MailItem(mail_file_global_path)
+
+    _mail_items[mail_file_global_path] = (cache_key, mail_item)
+    while len(_mail_items) > MAX_CACHED_MAIL_ITEMS:
+        _mail_items.popitem(last=False)
+
+    return mail_item
+
+def mail_to_name(mail_name: str) -> str:
+    ''' Convert mail in form first_name last_name <mail@adres.com> to a more friendly name. '''
+
+    matches = re.match(r"(.*?)\s*<(.*)>", mail_name)
+
+    if matches:
+        if len(matches.group(1)) > 0:
+            return matches.group(1)
+        if len(matches.group(2)):
+            return matches.group(2).split('@')[0]
+    elif '@' in mail_name:
+        return mail_name.split('@')[0]
+    return mail_name
@@ -8,13 +8,18 @@ mail_item: openen .msg file or .eml file, or a string (directory path, dir conta
 
 import os
 import sys
-import re
 import shutil
 import time
 import http.client as httplib
 from unidecode import unidecode
 
 from src.directory_functions import  delete_directory_content
+from src.imap_pool import get_imap_pool, CONNECTION_ERRORS
+from src.imap_fetch import (parse_fetch_response, get_attachments, get_header_fields, decode_header_value,
+                            to_sequence_set, HEADER_FIELDS)
+from src.imap_sync_state import get_imap_sync_state, get_mailbox_key, VALID, INVALID
+from src.mail_spool import SpooledMail, SpooledPart, get_spool_folder, clear_spool_folder, FETCH_CHUNK_SIZE, FETCH_BATCH_SIZE
+from src.mail_item import MailItem, get_mail_item, mail_to_name
 
 if sys.platform == 'linux':
     import imaplib
@@ -25,7 +30,6 @@ if sys.platform == 'linux':
     from email.mime.multipart import MIMEMultipart
     from email.mime.text import MIMEText
     from email.utils import parseaddr, formataddr
-    from email.policy import default
 
 elif sys.platform == 'win32':
     from pywintypes import com_error
@@ -61,24 +65,25 @@ class MailManager():
             self.smtp_server = 'smtp-mail.outlook.com'
             self.smtp_port = 587
             self.imap_server = 'outlook.office365.com'
+            self.imap_pool = get_imap_pool(gv, self.imapConnect)
 
         # TODO: check folder 'Verwerkt" exists, if not create it.
 
-    def imapLogin(self):
-        ''' Login to the IMAP server to download mails. '''
-        self.imap_mail = imaplib.IMAP4_SSL(self.imap_server)
-        self.imap_mail.login(self.gv['MAIL_ADRESS'], self.gv['MAIL_PASSWORD'])
-        self.imap_mail.select(self.gv['MAIL_INBOX_NAME'])
+    def imapConnect(self):
+        ''' Login to the IMAP server, return the session with the inbox selected.
 
-        status, mailboxes = self.imap_mail.list()
+        The sessions are pooled, use self.imap_pool instead of logging in.
+        '''
+        imap_mail = imaplib.IMAP4_SSL(self.imap_server)
+        imap_mail.login(self.gv['MAIL_ADRESS'], self.gv['MAIL_PASSWORD'])
+        imap_mail.select(self.gv['MAIL_INBOX_NAME'])
+
+        status, mailboxes = imap_mail.list()
         if status == 'OK':
             if not any('Verwerkt' in mbox.decode() for mbox in mailboxes):
-                self.imap_mail.create('Verwerkt')
+                imap_mail.create('Verwerkt')
 
-    def imapLogout(self):
-        ''' Logout of the IMAP server. '''
-        self.imap_mail.close()
-        self.imap_mail.logout()
+        return imap_mail
 
 
     def getNewValidMails(self) -> tuple[list, list]:
@@ -133,29 +138,131 @@ class MailManager():
 
     def getNewValidMailsLinux(self, warnings: list) -> tuple[int, list, list]:
 
-        valid_msgs = []
-        n_invalid_mails = 0
+        def fetchMails(imap_mail) -> tuple[dict, list]:
+            if self.gv['ONLY_UNREAD_MAIL']:
+                valid_uids, invalid_mails = self.triageMails(imap_mail, self.searchUids(imap_mail, 'UNSEEN'))
+                return invalid_mails, [MailItem(spooled_mail) for spooled_mail in self.downloadMails(imap_mail, valid_uids).values()]
 
-        self.imapLogin()
+            # only the mails above the last seen UID are new, valid mails that are not imported are offered again
+            imap_sync_state = get_imap_sync_state(self.gv)
+            mailbox_key = get_mailbox_key(self.gv)
+            uid_validity = self.selectInbox(imap_mail)
+            last_seen_uid, known_valid_uids = imap_sync_state.startSync(mailbox_key, uid_validity)
 
-        if self.gv['ONLY_UNREAD_MAIL']:
-            status, response = self.imap_mail.search(None, 'UNSEEN')
-        else:
-            status, response = self.imap_mail.search(None, 'ALL')
+            # n:* also matches the last mail if no UID is above n
+            new_uids = [uid for uid in self.searchUids(imap_mail, 'UID', f'{last_seen_uid + 1}:*') if uid > last_seen_uid]
+            valid_uids, invalid_mails = self.triageMails(imap_mail, new_uids)
+            if len(new_uids) > 0:
+                classifications = {uid: VALID for uid in valid_uids}
+                classifications.update({uid: INVALID for uid in invalid_mails})
+                imap_sync_state.recordClassifications(mailbox_key, uid_validity, classifications, max(new_uids))
+
+            valid_msgs = self.downloadMails(imap_mail, known_valid_uids + valid_uids)
+
+            # valid mails removed from the inbox since the last import
+            gone_uids = [uid for uid in known_valid_uids if uid not in valid_msgs]
+            if len(gone_uids) > 0:
+                imap_sync_state.forgetUids(mailbox_key, gone_uids)
+
+            return invalid_mails, [MailItem(spooled_mail) for spooled_mail in valid_msgs.values()]
+
+        # the mails of the previous import are no longer needed
+        clear_spool_folder(self.gv)
+        invalid_mails, valid_msgs = self.imap_pool.run(fetchMails)
 
+        if len(invalid_mails) > 0:
+            warnings.append('Invalid mails:\n' + '\n'.join(
+                f'{mail_to_name(decode_header_value(headers.get("From", "")))}: {decode_header_value(headers.get("Subject", ""))}'
+                for headers in invalid_mails.values()))
+
+        return len(invalid_mails), valid_msgs, warnings
+
+    def selectInbox(self, imap_mail) -> int:
+        ''' Select the inbox again, return its UIDVALIDITY. '''
+
+        status, _ = imap_mail.select(self.gv['MAIL_INBOX_NAME'])
+        if status != 'OK':
+            raise ValueError(f'Received status: {status} from mail server')
+
+        _, uid_validity = imap_mail.response('UIDVALIDITY')
+        return int(uid_validity[0]) if uid_validity[0] is not None else None
+
+    def searchUids(self, imap_mail, *criteria) -> list:
+        ''' Return the UIDs of the mails in the inbox matching the search criteria. '''
+
+        status, response = imap_mail.uid('SEARCH', None, *criteria)
         if status != 'OK':
-            raise ValueError('Received status: {status} from mail server')
+            raise ValueError(f'Received status: {status} from mail server')
+
+        return [int(uid) for uid in response[0].split()]
 
-        for mail_id in response[0].split():
-            status, msg_data = self.imap_mail.fetch(mail_id, "(RFC822)")
-            if self.isMailAValidJobRequest(msg_data):
-                valid_msgs.append(msg_data)
+    def triageMails(self, imap_mail, uids: list) -> tuple[list, dict]:
+        ''' Return the valid UIDs and UID -> From, Subject and Date headers of the invalid mails,
+        triaged on the attachment names in the BODYSTRUCTURE.
+
+        The mails are not downloaded, invalid mails are marked as read as downloading them did before.
+        '''
+
+        if len(uids) == 0:
+            return [], {}
+
+        status, response = imap_mail.uid('FETCH', to_sequence_set(uids), f'(BODYSTRUCTURE {HEADER_FIELDS})')
+        if status != 'OK':
+            raise ValueError(f'Received status: {status} from mail server')
+
+        valid_uids = []
+        invalid_mails = {}
+        for fetched_mail in parse_fetch_response(response):
+            if self.isAnyAttachmentAccepted(get_attachments(fetched_mail.get('BODYSTRUCTURE'))):
+                valid_uids.append(fetched_mail['UID'])
             else:
-                n_invalid_mails += 1
+                invalid_mails[fetched_mail['UID']] = get_header_fields(fetched_mail)
 
-        self.imapLogout()
+        if len(invalid_mails) > 0:
+            imap_mail.uid('STORE', to_sequence_set(invalid_mails), '+FLAGS', r'(\Seen)')
 
-        return n_invalid_mails, valid_msgs, warnings
+        return valid_uids, invalid_mails
+
+    def downloadMails(self, imap_mail, uids: list) -> dict:
+        ''' Return UID -> SpooledMail of the mails that are still in the inbox, ordered by UID.
+
+        The mails are fetched in chunks and written to the spool folder, a
+        large mail is never held in memory as a whole.
+        '''
+
+        spool_folder_global_path = get_spool_folder(self.gv)
+        spooled_mails = {}
+        uids = sorted(uids)
+
+        for batch_start in range(0, len(uids), FETCH_BATCH_SIZE):
+            pending_uids = uids[batch_start:batch_start + FETCH_BATCH_SIZE]
+            offset = 0
+
+            while len(pending_uids) > 0:
+                # a partial BODY[] fetch marks the mail as read, as fetching the RFC822 did
+                status, response = imap_mail.uid('FETCH', to_sequence_set(pending_uids), f'(BODY[]<{offset}.{FETCH_CHUNK_SIZE}>)')
+                if status != 'OK':
+                    raise ValueError(f'Received status: {status} from mail server')
+
+                chunks = {}
+                for fetched_mail in parse_fetch_response(response):
+                    chunk = next((value for item, value in fetched_mail.items() if item.startswith('BODY[]')), None)
+                    if 'UID' in fetched_mail and fetched_mail['UID'] in pending_uids:
+                        chunks[fetched_mail['UID']] = chunk.encode() if isinstance(chunk, str) else (chunk or b'')
+                del response
+
+                for uid, chunk in chunks.items():
+                    mail_file_global_path = os.path.join(spool_folder_global_path, f'{uid}.eml')
+                    with open(mail_file_global_path, 'wb' if offset == 0 else 'ab') as mail_file:
+                        mail_file.write(chunk)
+                    if offset == 0:
+                        spooled_mails[uid] = SpooledMail(uid, mail_file_global_path)
+
+                # a mail is complete when the server returns less than a full chunk
+                pending_uids = [uid for uid in pending_uids if uid in chunks and len(chunks[uid]) == FETCH_CHUNK_SIZE]
+                offset += FETCH_CHUNK_SIZE
+
+        return dict(sorted(spooled_mails.items()))
 
 
     def saveMsgAndAttachmentsInTempFolder(self, msg) -> str:
@@ -199,25 +306,40 @@ class MailManager():
                             message.Move(self.verwerkt_folder)
 
             elif sys.platform == 'linux':
-                if not self.isThereInternet():
-                    raise ConnectionError('Not connected to the internet')
-
-                self.imapLogin()
-                assert isinstance(mail_item, list), f'mail_item should be of type list and is of type {type(mail_item)}'
-
-                # Extract the mail UID using regular expression
-                match = re.search(rb'\b(\d+)\b', mail_item[0][0])
-
-                if match:
-                    uid_msg_set = (match.group(1))
-                    self.imap_mail.copy(uid_msg_set, 'Verwerkt')
-                    self.imap_mail.store(uid_msg_set, '+FLAGS', r'(\Deleted)')
-
-                self.imapLogout()
+                assert isinstance(mail_item, (MailItem, SpooledMail, list)), f'mail_item should be of type MailItem or list and is of type {type(mail_item)}'
+
+                # mails fetched by sequence number have no UID
+                mail_item = self.toMailItem(mail_item)
+                uid = mail_item.uid
+                sequence_number = mail_item.sequence_number
+
+                if uid is not None or sequence_number is not None:
+
+                    def moveMail(imap_mail):
+                        if uid is not None:
+                            imap_mail.uid('COPY', str(uid), 'Verwerkt')
+                            imap_mail.uid('STORE', str(uid), '+FLAGS', r'(\Deleted)')
+                        else:
+                            imap_mail.copy(str(sequence_number), 'Verwerkt')
+                            imap_mail.store(str(sequence_number), '+FLAGS', r'(\Deleted)')
+                        imap_mail.expunge()
+
+                    # a pooled session is already connected, no need to check for internet first
+                    # a COPY that is sent twice copies the mail twice, moveMail is not retried
+                    try:
+                        self.imap_pool.run(moveMail, idempotent=False)
+                    except CONNECTION_ERRORS as exc:
+                        raise ConnectionError('Not connected to the internet') from exc
 
             else:
                 raise ValueError(f'software not applicable to platform {sys.platform}')
 
+        if sys.platform == 'linux' and not self.gv['ONLY_UNREAD_MAIL']:
+            # an imported mail is not offered again on the next import
+            uid = self.toMailItem(mail_item).uid
+            if uid is not None:
+                get_imap_sync_state(self.gv).markImported(get_mailbox_key(self.gv), uid)
+
     def isMailAValidJobRequest(self, msg) -> bool:
         ''' Check if the requirements are met for a valid job request. '''
 
@@ -232,56 +354,32 @@ class MailManager():
             return False
 
         if sys.platform == 'linux':
-            attachments = self.getAttachments(msg)
-            for attachment in attachments:
-                file_name = self.getAttachmentFileName(attachment)
-                if bool(file_name):
-                    if file_name.lower().endswith(self.gv['ACCEPTED_EXTENSIONS']):
-                        return True
-
-            return False
+            return self.isAnyAttachmentAccepted([self.getAttachmentFileName(attachment)
+                                                 for attachment in self.getAttachments(msg)])
 
         raise ValueError(f'software not applicable to platform {sys.platform}')
 
+    def isAnyAttachmentAccepted(self, file_names: list) -> bool:
+        ''' Return True if an attachment has an accepted extension. '''
+        return any(bool(file_name) and file_name.lower().endswith(self.gv['ACCEPTED_EXTENSIONS']) for file_name in file_names)
+
     def getMailBody(self, mail_item):
         ''' Return mail body. '''
 
-        mail_file = self.mailItemToMailFile(mail_item)
-
         if sys.platform == 'win32':
-            return mail_file.Body
+            return self.mailItemToMailFile(mail_item).Body
 
         if sys.platform == 'linux':
+            return self.toMailItem(mail_item).body
 
-            # Check if the email is multipart
-            mail_body = None
-            if mail_file.is_multipart():
-                for part in mail_file.walk():
-                    # Check each part for HTML content
-                    if part.get_content_type() == 'text/html':
-                        mail_body = part.get_payload(decode=True)
-
-                    if part.get_content_type() == 'text/plain':
-                        mail_body = part.get_payload(decode=True)
-
-            elif mail_file.get_content_type() == 'text/html':
-                mail_body = mail_file.get_payload(decode=True)
-
-            if isinstance(mail_body, bytes):
-                mail_body = mail_body.decode('utf-8')
-
-            if mail_body is not None:
-                return mail_body
-
-            raise ValueError(f'Could not get mail Body from mail file type {type(mail_file)}')
         raise ValueError(f'software not applicable to platform {sys.platform}')
 
 
     def getEmailAddress(self, mail_item) -> str:
         ''' Return the email adress. '''
-        mail_file = self.mailItemToMailFile(mail_item)
 
         if sys.platform == 'win32':
+            mail_file = self.mailItemToMailFile(mail_item)
 
             if mail_file.Class==43:
                 if mail_file.SenderEmailType=='EX':
@@ -293,12 +391,7 @@ class MailManager():
             raise ValueError("Could not get email adress")
 
         if sys.platform == 'linux':
-
-            mail_name_long = mail_file.get('From')
-            match = re.search(r'<(.*?)>', mail_name_long)
-            if match:
-                return str(match.group(1))
-            raise ValueError(f'Could not convert {mail_name_long} to mail adress')
+            return self.toMailItem(mail_item).email_address
 
         raise ValueError(f'software not applicable to platform {sys.platform}')
 
@@ -306,39 +399,33 @@ class MailManager():
     def getSenderMailReceiveTime(self, mail_item) -> str:
         ''' Return the time a mail was received. '''
 
-        mail_file = self.mailItemToMailFile(mail_item)
-
         if sys.platform == 'win32':
-            return str(mail_file.ReceivedTime)
+            return str(self.mailItemToMailFile(mail_item).ReceivedTime)
 
         if sys.platform == 'linux':
-            return str(mail_file['date'])
+            return self.toMailItem(mail_item).receive_time
 
         raise ValueError(f'software not applicable to platform {sys.platform}')
 
     def getSenderName(self, mail_item) -> str:
         ''' Return the senders name. '''
 
-        mail_file = self.mailItemToMailFile(mail_item)
-
         if sys.platform == 'win32':
-            return str(mail_file.Sender)
+            return str(self.mailItemToMailFile(mail_item).Sender)
 
         if sys.platform == 'linux':
-            return self.mailToName(mail_file.get('From'))
+            return self.toMailItem(mail_item).sender_name
 
         raise ValueError(f'software not applicable to platform {sys.platform}')
 
     def getMailSubject(self, mail_item) -> str:
         ''' Return the subject from mail file. '''
 
-        mail_file = self.mailItemToMailFile(mail_item)
-
         if sys.platform == 'win32':
-            return str(mail_file.Subject)
+            return str(self.mailItemToMailFile(mail_item).Subject)
 
         if sys.platform == 'linux':
-            return mail_file.get('Subject')
+            return self.toMailItem(mail_item).subject
 
         raise ValueError(f'software not applicable to platform {sys.platform}')
 
@@ -353,20 +440,23 @@ class MailManager():
                 return self.outlook.OpenSharedItem(self.getMailGlobalPathFromFolder(mail_item))
 
         if sys.platform == 'linux':
-            if isinstance(mail_item, email.message.Message):
-                return mail_item
+            return self.toMailItem(mail_item).message
 
-            if isinstance(mail_item, list):
-                return email.message_from_bytes(mail_item[0][1])
+        raise ValueError(f'software not applicable to platform {sys.platform}')
 
-            if isinstance(mail_item, str):
-                with open(self.getMailGlobalPathFromFolder(mail_item), 'rb') as file:
-                    return email.message_from_binary_file(file, policy=default)
+    def toMailItem(self, mail_item) -> MailItem:
+        ''' Return a mail_item as MailItem, a MailItem is returned as is so its parsed fields are reused. '''
 
-            raise ValueError('Could not parse mail_item of type {type(mail_item)} to a mail_file')
+        if isinstance(mail_item, MailItem):
+            return mail_item
 
-        raise ValueError(f'software not applicable to platform {sys.platform}')
+        if isinstance(mail_item, str):
+            return get_mail_item(self.getMailGlobalPathFromFolder(mail_item))
+
+        if isinstance(mail_item, (SpooledMail, list, email.message.Message)):
+            return MailItem(mail_item)
 
+        raise ValueError(f'Could not parse mail_item of type {type(mail_item)} to a mail_file')
 
     def getMailGlobalPathFromFolder(self, folder_global_path: str) -> str:
         ''' Return the global path toward a mail file in a folder. '''
@@ -397,22 +487,7 @@ class MailManager():
             return [os.path.abspath(os.path.join(msg, file)) for file in os.listdir(msg) if not file.lower().endswith('.msg')]
 
         if sys.platform == 'linux':
-            attachments = []
-            for part in email.message_from_bytes(msg[0][1]).walk():
-
-                if part.get_content_maintype() == 'multipart':
-                    continue
-                if part.get('Content-Disposition') is None:
-                    continue
-
-                encoded_filename = part.get_filename()
-
-                if encoded_filename is None:
-                   continue
-
-                attachments.append(part)
-
-            return attachments
+            return self.toMailItem(msg).attachments
 
         raise ValueError(f'software not applicable to platform {sys.platform}')
 
@@ -439,8 +514,7 @@ class MailManager():
             msg.saveAs(os.path.join(job_folder_global_path, 'mail.msg'))
 
         elif sys.platform == 'linux':
-            with open(os.path.join(job_folder_global_path, 'mail.eml'), 'wb') as mail_file:
-                mail_file.write(msg[0][1])
+            self.toMailItem(msg).saveTo(os.path.join(job_folder_global_path, 'mail.eml'))
 
         else: 
             raise ValueError(f'software not applicable to platform {sys.platform}')
@@ -452,6 +526,11 @@ class MailManager():
             shutil.copy(attachment, file_name_global_path)
 
         elif sys.platform == 'linux':
+            if isinstance(attachment, SpooledPart):
+                # decoded from the spooled mail in chunks
+                attachment.saveTo(file_name_global_path)
+                return
+
             with open(file_name_global_path, 'wb') as file:
                 file.write(attachment.get_payload(decode=True))
 
@@ -526,17 +605,7 @@ class MailManager():
 
     def mailToName(self, mail_name: str) -> str:
         ''' Convert mail in form first_name last_name <mail@adres.com> to a more friendly name. '''
-
-        matches = re.match(r"(.*?)\s*<(.*)>", mail_name)
-
-        if matches:
-            if len(matches.group(1)) > 0:
-                return matches.group(1)
-            if len(matches.group(2)):
-                return matches.group(2).split('@')[0]
-        elif '@' in mail_name:
-            return mail_name.split('@')[0]
-        return mail_name
+        return mail_to_name(mail_name)
 
     def isThereInternet(self) -> bool:
         conn = httplib.HTTPSConnection("8.8.8.8", timeout=5)
@@ -0,0 +1,226 @@
+'''
+Spool fetched mails to disk and decode their attachments in chunks.
+
+Job requests carry STL and 3MF files of hundreds of megabytes. Keeping the
+raw mails in memory for as long as the import dialog is open, and decoding
+an attachment into memory before writing it, made memory spike with every
+large request.
+
+Fetched mails are written to files in the spool folder, the import dialog
+holds SpooledMail handles. The parts of a spooled mail are found with one
+pass over the lines of the file, only the headers are kept in memory. An
+attachment is decoded from its byte range in the file to its target path in
+chunks.
+'''
+
+import os
+import io
+import base64
+import binascii
+import shutil
+from functools import cached_property
+from email.parser import BytesHeaderParser
+from email.policy import compat32
+
+SPOOL_FOLDER_NAME = 'mail_spool'
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# mails are fetched in chunks of FETCH_CHUNK_SIZE bytes, for at most FETCH_BATCH_SIZE mails per FETCH
+FETCH_CHUNK_SIZE = 4 * 1024 * 1024
+FETCH_BATCH_SIZE = 8
+
+# the bytes get_payload(decode=True) skips in a base64 body: line breaks, padding and garbage
+NOT_BASE64_BYTES = bytes(byte for byte in range(256)
+                         if byte not in b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/')
+
+
+class SpooledPart:
+    ''' A leaf part of a spooled mail, its body is a byte range in the spooled mail file. '''
+
+    def __init__(self, headers, mail_file_global_path: str, body_start: int, body_end: int):
+        self.headers = headers
+        self.mail_file_global_path = mail_file_global_path
+        self.body_start = body_start
+        self.body_end = body_end
+
+    def get(self, name: str, failobj=None):
+        return self.headers.get(name, failobj)
+
+    def get_filename(self, failobj=None):
+        return self.headers.get_filename(failobj)
+
+    def get_content_type(self) -> str:
+        return self.headers.get_content_type()
+
+    def get_content_maintype(self) -> str:
+        return self.headers.get_content_maintype()
+
+    def decodeTo(self, target_file):
+        ''' Write the decoded body to a binary file object. '''
+
+        encoding = str(self.headers.get('Content-Transfer-Encoding', '7bit')).strip().lower()
+
+        with open(self.mail_file_global_path, 'rb') as mail_file:
+            mail_file.seek(self.body_start)
+            body_file = BodyReader(mail_file, self.body_end - self.body_start)
+
+            if encoding == 'base64':
+                # four base64 characters decode to three bytes, the rest waits for the next chunk
+                pending = b''
+                for chunk in iter(lambda: body_file.read(COPY_BUFFER_SIZE), b''):
+                    pending += chunk.translate(None, NOT_BASE64_BYTES)
+                    n_complete = len(pending) - len(pending) % 4
+                    target_file.write(base64.b64decode(pending[:n_complete]))
+                    pending = pending[n_complete:]
+                if len(pending) > 1:
+                    target_file.write(base64.b64decode(pending + b'=' * (-len(pending) % 4)))
+            elif encoding == 'quoted-printable':
+                # quoted-printable is decoded per line, a soft line break ends its line
+                for line in body_file:
+                    target_file.write(binascii.a2b_qp(line))
+            else:
+                shutil.copyfileobj(body_file, target_file, COPY_BUFFER_SIZE)
+
+    def saveTo(self, file_global_path: str):
+        ''' Decode the body to a file. '''
+        with open(file_global_path, 'wb') as target_file:
+            self.decodeTo(target_file)
+
+    def getPayload(self) -> bytes:
+        ''' Return the decoded body, only for small parts such as the mail text. '''
+        payload = io.BytesIO()
+        self.decodeTo(payload)
+        return payload.getvalue()
+
+
+class BodyReader(io.RawIOBase):
+    ''' Read at most size bytes from a file. '''
+
+    def __init__(self, mail_file, size: int):
+        super().__init__()
+        self.mail_file = mail_file
+        self.remaining = max(size, 0)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.mail_file.read(min(len(buffer), self.remaining))
+        self.remaining -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readline(self, size=-1) -> bytes:
+        if self.remaining == 0:
+            return b''
+        limit = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        line = self.mail_file.readline(limit)
+        self.remaining -= len(line)
+        return line
+
+
+class SpooledMail:
+    ''' A mail fetched over IMAP and stored in the spool folder. '''
+
+    def __init__(self, uid: int, mail_file_global_path: str):
+        self.uid = uid
+        self.mail_file_global_path = mail_file_global_path
+
+    @cached_property
+    def headers(self):
+        ''' The headers of the mail, as an email.message.Message without body. '''
+        with open(self.mail_file_global_path, 'rb') as mail_file:
+            return BytesHeaderParser(policy=compat32).parse(mail_file, headersonly=True)
+
+    @cached_property
+    def parts(self) -> list:
+        ''' The leaf parts of the mail, in the order email.message.Message.walk visits them. '''
+        with open(self.mail_file_global_path, 'rb') as mail_file:
+            return scan_parts(mail_file, self.mail_file_global_path)
+
+    def getAttachments(self) -> list:
+        ''' Return the parts with a content disposition and a file name. '''
+        return [part for part in self.parts if part.get('Content-Disposition') is not None and part.get_filename() is not None]
+
+    def saveTo(self, file_global_path: str):
+        ''' Copy the raw mail to a file. '''
+        shutil.copyfile(self.mail_file_global_path, file_global_path)
+
+
+def scan_parts(mail_file, mail_file_global_path: str) -> list:
+    ''' Return the leaf and attached mail parts of a mail file, found in one pass over its lines. '''
+
+    parts = []
+    # delimiter lines of the multiparts the current line is in, innermost last
+    delimiters = []
+    # (part, number of enclosing multiparts) of the parts whose body did not end yet
+    open_parts = []
+    header_lines = []
+    in_headers = True
+    position = 0
+    previous_line_ending = 0
+
+    for line in iter(mail_file.readline, b''):
+        line_start = position
+        position += len(line)
+        stripped_line = line.rstrip(b'\r\n')
+        line_ending = len(line) - len(stripped_line)
+
+        if in_headers:
+            if len(stripped_line) > 0:
+                header_lines.append(line)
+                previous_line_ending = line_ending
+                continue
+
+            headers = BytesHeaderParser(policy=compat32).parsebytes(b''.join(header_lines), headersonly=True)
+            header_lines = []
+            in_headers = False
+            boundary = headers.get_boundary() if headers.get_content_maintype() == 'multipart' else None
+            if boundary is not None:
+                # the preamble up to the first delimiter is skipped
+                delimiters.append(b'--' + boundary.encode('utf-8', errors='replace'))
+            else:
+                part = SpooledPart(headers, mail_file_global_path, position, position)
+                parts.append(part)
+                open_parts.append((part, len(delimiters)))
+                # the parts of an attached mail are parts as well, as Message.walk visits them
+                if headers.get_content_type() == 'message/rfc822' and \
+                        str(headers.get('Content-Transfer-Encoding', '7bit')).strip().lower() in ('7bit', '8bit', 'binary'):
+                    in_headers = True
+
+        elif stripped_line.startswith(b'--') and len(delimiters) > 0:
+            stripped_line = stripped_line.rstrip(b' \t')
+            for depth in range(len(delimiters) - 1, -1, -1):
+                if stripped_line in (delimiters[depth], delimiters[depth] + b'--'):
+                    # the line break before a delimiter belongs to the delimiter
+                    while len(open_parts) > 0 and open_parts[-1][1] > depth:
+                        part, _ = open_parts.pop()
+                        part.body_end = max(part.body_start, line_start - previous_line_ending)
+
+                    del delimiters[depth + 1:]
+                    if stripped_line != delimiters[depth]:
+                        # the epilogue up to the next delimiter of the enclosing multipart is skipped
+                        delimiters.pop()
+                    else:
+                        in_headers = True
+                    break
+
+        previous_line_ending = line_ending
+
+    for part, _ in open_parts:
+        part.body_end = position
+
+    return parts
+
+def get_spool_folder(gv: dict) -> str:
+    ''' Return the spool folder in the TEMP folder of DATA_DIR_HOME. '''
+    return os.path.join(gv['DATA_DIR_HOME'], 'TEMP', SPOOL_FOLDER_NAME)
+
+def clear_spool_folder(gv: dict) -> str:
+    ''' Remove the mails spooled by an earlier import, return the empty spool folder. '''
+
+    spool_folder_global_path = get_spool_folder(gv)
+    shutil.rmtree(spool_folder_global_path, ignore_errors=True)
+    os.makedirs(spool_folder_global_path, exist_ok=True)
+
+    return spool_folder_global_path
@@ -2,7 +2,7 @@ import os
 import abc
 import time
 import json
-from operator import itemgetter
+from functools import partial
 
 from PyQt6.QtCore import Qt, QUrl
 from PyQt6.QtGui import QKeySequence, QShortcut, QFont, QDrag, QPixmap, QPainter, QColor
@@ -11,6 +11,22 @@ from PyQt6.QtWidgets import QListWidget, QListWidgetItem, QLabel, QWidget, QAbst
 from src.directory_functions import open_file
 from src.job_tracker import JobTracker
 from src.qdialog import QuestionsQDialog
+from src.tracker_search import tokenize
+from src.tracker_events import (JOB_ADDED, JOB_REMOVED, JOB_RENAMED, STATUS_CHANGED, JOB_CHANGED,
+                                FILE_DONE_TOGGLED, JOB_FILES_CHANGED, TRACKER_RELOADED)
+
+
+def subscribe_to_tracker_changes(list_widget: QListWidget):
+    ''' Call applyTrackerEvents of the list widget after every tracker write, until the list widget is destroyed. '''
+    subscription_id = list_widget.job_tracker.subscribeToChanges(list_widget.applyTrackerEvents)
+    list_widget.destroyed.connect(partial(list_widget.job_tracker.unsubscribeFromChanges, subscription_id))
+
+def get_item_text(item_name) -> str:
+    ''' Return the text to display for an item name or (item data, item name) tuple. '''
+    if isinstance(item_name, tuple):
+        return item_name[1]
+    return item_name
+
 
 class ContentQListWidgetItem(QListWidgetItem):
     ''' Item to add to QListWidget. '''
@@ -21,6 +37,11 @@ class ContentQListWidgetItem(QListWidgetItem):
         assert os.path.exists(item_dict['file_global_path']),\
             f'item global path {item_dict["file_global_path"]} does not exists'
 
+        self.setItemDict(item_dict)
+        self.setFont(QFont('Cantarell', 14))
+
+    def setItemDict(self, item_dict: dict):
+        ''' Set the text and data from the item dict. '''
 
         if 'done' in item_dict:
             if item_dict['done']:
@@ -35,7 +56,6 @@ class ContentQListWidgetItem(QListWidgetItem):
             self.setData(3, json.dumps(item_dict, indent=4))
 
         self.setData(1, item_dict['file_global_path'])
-        self.setFont(QFont('Cantarell', 14))
 
 
 class OverviewQListWidget(QListWidget):
@@ -47,10 +67,13 @@ class OverviewQListWidget(QListWidget):
         self.gv = gv
         self.job_tracker = job_tracker
         self.last_left_click_time = None 
+        self.tracker_load_count = None
 
         # shortcut on the Enter key
         QShortcut(QKeySequence(Qt.Key.Key_Return), self).activated.connect(self.itemEnterPressed)
 
+        subscribe_to_tracker_changes(self)
+
     # Some child classes overwrite this function
     def displayItem(self, item_name: str):
         ''' Display the job content page. '''
@@ -59,30 +82,101 @@ class OverviewQListWidget(QListWidget):
         # find the JobContentQListWidget by searching for QListWidget (search for JobContentQListWidget returns None)
         self.parent().parent().currentWidget().findChild(QListWidget).loadContent(item_name)
 
-    def initialize(self, item_names: list):
-        ''' Initialize with list of items. '''
-        self.addNoItemsLabel()
-
-        if len(item_names) == 0:
-            self.parent().no_items_label.show()
-        else:
-            self.parent().no_items_label.hide()
+    def initialize(self, item_names: list, sort_items=True):
+        ''' Initialize with list of items, sorted on their text unless sort_items is False. '''
+        self.tracker_load_count = self.job_tracker.getTrackerLoadCount()
 
-        
-        item_names = sorted(item_names, key=itemgetter(1))
+        if sort_items:
+            item_names = sorted(item_names, key=get_item_text)
 
         for item_name in item_names:
 
-            item = QListWidgetItem()
             if isinstance(item_name, tuple):
                 (item_data, item_name) = item_name
             else:
                 item_data = item_name
 
-            item.setData(1, item_data)
-            item.setText(item_name)
-            self.addItem(item)
-            item.setFont(QFont('Cantarell', 14))
+            self.addItem(self.createItem(item_data, item_name))
+
+        self.updateNoItemsLabel()
+
+    def createItem(self, item_data: str, item_text: str) -> QListWidgetItem:
+        ''' Return a new item. '''
+        item = QListWidgetItem()
+        item.setData(1, item_data)
+        item.setText(item_text)
+        item.setFont(QFont('Cantarell', 14))
+        return item
+
+    def findRow(self, item_data: str) -> int:
+        ''' Return the row of the item with item data, or -1. '''
+        for row in range(self.count()):
+            if self.item(row).data(1) == item_data:
+                return row
+        return -1
+
+    def insertSortedItem(self, item_data: str, item_text: str):
+        ''' Insert an item at its sorted position. '''
+
+        low, high = 0, self.count()
+        while low < high:
+            middle = (low + high) // 2
+            if self.item(middle).text() < item_text:
+                low = middle + 1
+            else:
+                high = middle
+
+        self.insertItem(low, self.createItem(item_data, item_text))
+
+    def removeItemWithData(self, item_data: str):
+        ''' Remove the item with item data, if present. '''
+        row = self.findRow(item_data)
+        if row >= 0:
+            self.takeItem(row)
+
+    def syncItems(self, item_names: list):
+        ''' Insert and remove only the items that differ from item_names. '''
+
+        wanted_items = {}
+        for item_name in item_names:
+            if isinstance(item_name, tuple):
+                wanted_items[item_name[0]] = item_name[1]
+            else:
+                wanted_items[item_name] = item_name
+
+        for row in reversed(range(self.count())):
+            item = self.item(row)
+            if wanted_items.get(item.data(1)) != item.text():
+                self.takeItem(row)
+            else:
+                wanted_items.pop(item.data(1))
+
+        for item_data, item_text in wanted_items.items():
+            self.insertSortedItem(item_data, item_text)
+
+        self.updateNoItemsLabel()
+
+    def updateNoItemsLabel(self):
+        ''' Show the no_items_label if the list is empty. '''
+        self.addNoItemsLabel()
+
+        if self.count() == 0:
+            self.parent().no_items_label.show()
+        else:
+            self.parent().no_items_label.hide()
+
+    def applyTrackerEvents(self, events: list): # pylint: disable=unused-argument
+        ''' Update the list after the tracker changed, child classes that follow single jobs overwrite this. '''
+        self.refresh()
+
+    def refreshIfStale(self):
+        ''' Refresh if the tracker was read from storage again since the last refresh.
+
+        Changes made by this process are applied with applyTrackerEvents, only
+        changes made by other processes make the list stale.
+        '''
+        if self.job_tracker.getTrackerLoadCount() != self.tracker_load_count:
+            self.refresh()
 
     def addNoItemsLabel(self):
         ''' Add no_items_label if it is not yet present. '''
@@ -143,10 +237,6 @@ class OverviewQListWidget(QListWidget):
             self.job_tracker.updateJobName(self.currentItem().data(1), 
                 self.job_tracker.makeJobNameUnique(str(dlg.answerLineEdit.text())))
 
-        # refresh Jobs
-        self.refresh()
-
-
 
 
     def openItem(self, item):
@@ -158,6 +248,76 @@ class OverviewQListWidget(QListWidget):
     def refresh(self):
         ''' Initialise the list widget with jobs. '''
 
+class JobsOverviewQListWidget(OverviewQListWidget):
+    ''' Overview of the jobs with job_status, or of all jobs if job_status is None. '''
+
+    job_status = None
+
+    def __init__(self, parent, gv: dict, job_tracker: JobTracker, *args, **kwargs):
+        super().__init__(parent, gv, job_tracker, *args, **kwargs)
+        self.match_str = None
+
+    def refresh(self):
+        ''' Initialise the list widget with jobs. '''
+        self.clear()
+        self.match_str = None
+
+        if self.job_status is None:
+            self.initialize(self.job_tracker.getStaticAndDynamicJobNames())
+        else:
+            self.initialize(self.job_tracker.getStaticAndDynamicJobNames(
+                filter_jobs_on='status', filter_str=self.job_status))
+
+    def refreshWithMatch(self, match_str: str):
+        ''' Initialise with all jobs that match match_str, best match first. '''
+        self.clear()
+        self.match_str = match_str
+        self.initialize(self.job_tracker.searchJobs(match_str, include_archived=True),
+                        sort_items=len(tokenize(match_str)) == 0)
+
+    def applyTrackerEvents(self, events: list):
+        ''' Insert, move or remove the rows of the changed jobs. '''
+
+        # search results include archived jobs, match them again
+        if self.match_str is not None:
+            self.refreshWithMatch(self.match_str)
+            return
+
+        if any(event.kind == TRACKER_RELOADED for event in events):
+            self.refresh()
+            return
+
+        for event in events:
+            if event.kind == JOB_REMOVED:
+                self.removeItemWithData(event.job_name)
+
+            elif event.kind == JOB_RENAMED:
+                self.removeItemWithData(event.old_job_name)
+                self.updateJobItem(event.job_name)
+
+            elif event.kind in (JOB_ADDED, STATUS_CHANGED, JOB_CHANGED):
+                self.updateJobItem(event.job_name)
+
+        self.updateNoItemsLabel()
+
+    def updateJobItem(self, job_name: str):
+        ''' Insert, move or remove the row of a job. '''
+
+        job_dict = self.job_tracker.getJobDict(job_name)
+        row = self.findRow(job_name)
+
+        if job_dict is None or (self.job_status is not None and job_dict['status'] != self.job_status):
+            if row >= 0:
+                self.takeItem(row)
+            return
+
+        if row >= 0:
+            if self.item(row).text() == job_dict['dynamic_job_name']:
+                return
+            self.takeItem(row)
+
+        self.insertSortedItem(job_name, job_dict['dynamic_job_name'])
+
 class ContentQListWidget(QListWidget):
     ''' Keep content in a list widget. '''
 
@@ -168,10 +328,13 @@ class ContentQListWidget(QListWidget):
         self.gv = gv
         self.job_tracker = job_tracker
         self.last_left_click_time = None 
+        self.tracker_load_count = None
 
         # shortcut for the Enter button
         QShortcut(QKeySequence(Qt.Key.Key_Return), self).activated.connect(self.itemEnterPressed)
 
+        subscribe_to_tracker_changes(self)
+
     def mousePressEvent(self, event):
 
         if self.itemAt(event.pos()) is None:
@@ -209,11 +372,9 @@ class ContentQListWidget(QListWidget):
 
     def markFileAsDone(self):
         self.job_tracker.markFilesAsDone(self.current_item_name, self.currentItem().data(1), True)
-        self.refresh()
 
     def markFileAsNotDone(self):
         self.job_tracker.markFilesAsDone(self.current_item_name, self.currentItem().data(1), False)
-        self.refresh()
 
     def startDrag(self, event):
         ''' Start dragging an item. '''
@@ -258,6 +419,17 @@ class ContentQListWidget(QListWidget):
             self.clear()
             self.loadContent(self.current_item_name)
 
+    def applyTrackerEvents(self, events: list): # pylint: disable=unused-argument
+        ''' Update the content after the tracker changed, child classes overwrite this to update single rows. '''
+        self.refresh()
+
+    def refreshIfStale(self):
+        ''' Refresh if the tracker was read from storage again since the last refresh. '''
+        tracker_load_count = self.job_tracker.getTrackerLoadCount()
+        if tracker_load_count != self.tracker_load_count:
+            self.refresh()
+            self.tracker_load_count = tracker_load_count
+
     def itemEnterPressed(self):
         if self.currentItem() is not None:
             self.openItem(self.currentItem())
@@ -301,6 +473,51 @@ class JobContentQListWidget(ContentQListWidget):
 
                 self.addItem(item)
 
+    def applyTrackerEvents(self, events: list):
+        ''' Update the rows of the files of the displayed job. '''
+
+        if self.current_item_name is None:
+            return
+
+        if any(event.kind == TRACKER_RELOADED for event in events):
+            self.refresh()
+            return
+
+        for event in events:
+            if event.kind == JOB_RENAMED and event.old_job_name == self.current_item_name:
+                self.current_item_name = event.job_name
+                self.parent().findChild(QLabel).setText(
+                        self.job_tracker.getJobDict(event.job_name)['dynamic_job_name'])
+
+            elif event.job_name != self.current_item_name:
+                continue
+
+            elif event.kind == JOB_REMOVED:
+                self.clear()
+                self.current_item_name = None
+                return
+
+            elif event.kind == FILE_DONE_TOGGLED:
+                self.updateFileItem(event.file_global_path)
+
+            elif event.kind in (JOB_FILES_CHANGED, JOB_CHANGED):
+                self.refresh()
+
+    def updateFileItem(self, file_global_path: str):
+        ''' Update the text of the row of a make file. '''
+
+        job_dict = self.job_tracker.getJobDict(self.current_item_name)
+
+        for row in range(self.count()):
+            item = self.item(row)
+            if item.data(1) != file_global_path:
+                continue
+
+            for file_dict in job_dict['make_files'].values():
+                if file_dict['file_global_path'] == file_global_path:
+                    item.setItemDict(file_dict)
+            return
+
 
 
 class OptionsQListWidget(QListWidget):
@@ -0,0 +1,210 @@
+'''
+Compute how the tracker and the job folders on the file system differ.
+
+The functions here only compare, they do not prompt, write or delete. The
+health check renders the result in dialogs and applies it, tests and the
+command line tool use the functions directly.
+
+The file system is read through get_entries(directory_path), returning the
+set of entry names of a directory or None if it does not exist. The
+directory snapshot and the scanner both provide one. The tracker job folders
+are looked up in a dict, comparing the folders in JOBS_DIR_HOME with the
+jobs takes one pass over each instead of a pass over the jobs per folder.
+'''
+
+import os
+import sys
+import json
+
+from src.fs_scanner import scan_directory
+from src.tracker_storage import JsonTrackerStorage
+
+
+class SyncPlan:
+    ''' The differences between the tracker and the file system. '''
+
+    def __init__(self, missing_job_names: list, orphan_folder_paths: list, new_files: dict, missing_files: dict,
+                 moved_files=None):
+        # jobs in the tracker whose job folder is gone
+        self.missing_job_names = missing_job_names
+        # folders in JOBS_DIR_HOME that are not a tracker job folder
+        self.orphan_folder_paths = orphan_folder_paths
+        # job name -> global paths of make files in the job folder that are not in the tracker
+        self.new_files = new_files
+        # job name -> keys of make files in the tracker that are gone
+        self.missing_files = missing_files
+        # (job name, file key, new job name, new file global path) of make files that were renamed or moved
+        self.moved_files = [] if moved_files is None else moved_files
+
+    def isEmpty(self) -> bool:
+        ''' Return True if the tracker and the file system are in sync. '''
+        return (len(self.missing_job_names) == 0 and len(self.orphan_folder_paths) == 0
+                and len(self.new_files) == 0 and len(self.missing_files) == 0 and len(self.moved_files) == 0)
+
+    def toDict(self) -> dict:
+        ''' Return the plan as a json serializable dict. '''
+        return {'missing_job_names': self.missing_job_names,
+                'orphan_folder_paths': self.orphan_folder_paths,
+                'new_files': self.new_files,
+                'missing_files': self.missing_files,
+                'moved_files': self.moved_files}
+
+
+def entries_exists(get_entries):
+    ''' Return an exists(global_path) function answered from the entries of the parent directory. '''
+
+    def exists(global_path: str) -> bool:
+        entries = get_entries(os.path.dirname(os.path.normpath(global_path)))
+        return entries is not None and os.path.basename(os.path.normpath(global_path)) in entries
+
+    return exists
+
+def map_job_folders(tracker_dict: dict) -> dict:
+    ''' Return normalized job folder path -> job name. '''
+    return {os.path.normpath(job_dict['job_folder_global_path']): job_name
+            for job_name, job_dict in tracker_dict.items() if 'job_folder_global_path' in job_dict}
+
+def find_missing_jobs(tracker_dict: dict, exists, job_names=None) -> list:
+    ''' Return the jobs whose job folder does not exist, with job_names only check those jobs. '''
+    return [job_name for job_name, job_dict in tracker_dict.items()
+            if (job_names is None or job_name in job_names) and not exists(job_dict['job_folder_global_path'])]
+
+def find_missing_files(tracker_dict: dict, exists, job_names=None) -> dict:
+    ''' Return job name -> keys of the make files that do not exist, with job_names only check those jobs. '''
+
+    missing_files = {}
+    for job_name, job_dict in tracker_dict.items():
+        if job_names is not None and job_name not in job_names:
+            continue
+
+        missing_file_keys = [file_key for file_key, file_dict in job_dict['make_files'].items()
+                             if not exists(file_dict['file_global_path'])]
+        if len(missing_file_keys) > 0:
+            missing_files[job_name] = missing_file_keys
+
+    return missing_files
+
+def find_orphan_folders(tracker_dict: dict, jobs_dir_home: str, get_entries) -> list:
+    ''' Return the sorted global paths of the entries in JOBS_DIR_HOME that are not a tracker job folder. '''
+
+    job_folders = map_job_folders(tracker_dict)
+    entries = get_entries(jobs_dir_home) or set()
+
+    return [os.path.join(jobs_dir_home, entry_name) for entry_name in sorted(entries)
+            if os.path.normpath(os.path.join(jobs_dir_home, entry_name)) not in job_folders]
+
+def find_new_files(tracker_dict: dict, job_folder_global_paths: list, get_entries, accepted_extensions: tuple) -> dict:
+    ''' Return job name -> sorted global paths of make files in the job folders that are not in the tracker.
+
+    Folders that are not a tracker job folder are skipped, they are orphan folders.
+    '''
+
+    job_folders = map_job_folders(tracker_dict)
+
+    new_files = {}
+    for job_folder_global_path in job_folder_global_paths:
+        job_name = job_folders.get(os.path.normpath(job_folder_global_path))
+        if job_name is None:
+            continue
+
+        entries = get_entries(job_folder_global_path)
+        if entries is None:
+            continue
+
+        tracker_file_names = {os.path.basename(file_dict['file_global_path'])
+                              for file_dict in tracker_dict[job_name]['make_files'].values()}
+
+        new_file_names = sorted(file_name for file_name in entries
+                                if file_name.lower().endswith(accepted_extensions) and file_name not in tracker_file_names)
+        if len(new_file_names) > 0:
+            new_files[job_name] = [os.path.join(job_folder_global_path, file_name) for file_name in new_file_names]
+
+    return new_files
+
+def match_moved_files(tracker_dict: dict, missing_files: dict, new_files: dict, get_digest) -> list:
+    ''' Return (job name, file key, new job name, new file global path) for missing make files with the content of a new file.
+
+    Only make files with a recorded content_hash are matched, new files are
+    only hashed if there is such a missing make file. get_digest returns None
+    for a file that cannot be read.
+    '''
+
+    missing_by_digest = {}
+    for job_name, file_keys in missing_files.items():
+        for file_key in file_keys:
+            digest = tracker_dict[job_name]['make_files'][file_key].get('content_hash')
+            if digest is not None:
+                missing_by_digest.setdefault(digest, []).append((job_name, file_key))
+
+    moved_files = []
+    for new_job_name, new_file_global_paths in new_files.items():
+        for new_file_global_path in new_file_global_paths:
+            if len(missing_by_digest) == 0:
+                return moved_files
+
+            digest = get_digest(new_file_global_path)
+            if digest in missing_by_digest:
+                job_name, file_key = missing_by_digest[digest].pop(0)
+                if len(missing_by_digest[digest]) == 0:
+                    missing_by_digest.pop(digest)
+                moved_files.append((job_name, file_key, new_job_name, new_file_global_path))
+
+    return moved_files
+
+def remove_moved_files(missing_files: dict, new_files: dict, moved_files: list) -> tuple:
+    ''' Return the missing files and new files without the moved files. '''
+
+    moved_file_keys = {(job_name, file_key) for job_name, file_key, _, _ in moved_files}
+    moved_file_global_paths = {new_file_global_path for _, _, _, new_file_global_path in moved_files}
+
+    missing_files = {job_name: [file_key for file_key in file_keys if (job_name, file_key) not in moved_file_keys]
+                     for job_name, file_keys in missing_files.items()}
+    new_files = {job_name: [file_global_path for file_global_path in file_global_paths
+                            if file_global_path not in moved_file_global_paths]
+                 for job_name, file_global_paths in new_files.items()}
+
+    return ({job_name: file_keys for job_name, file_keys in missing_files.items() if len(file_keys) > 0},
+            {job_name: file_global_paths for job_name, file_global_paths in new_files.items() if len(file_global_paths) > 0})
+
+def compute_sync_plan(tracker_dict: dict, jobs_dir_home: str, get_entries, accepted_extensions: tuple, exists=None,
+                      get_digest=None) -> SyncPlan:
+    ''' Return the plan that brings the tracker and the job folders in JOBS_DIR_HOME in sync.
+
+    exists defaults to looking up paths in the entries of their directory. With
+    get_digest missing make files are matched to new files by content.
+    '''
+
+    if exists is None:
+        exists = entries_exists(get_entries)
+
+    missing_job_names = find_missing_jobs(tracker_dict, exists)
+    missing_files = find_missing_files(tracker_dict, exists)
+
+    job_folder_global_paths = [os.path.join(jobs_dir_home, entry_name) for entry_name in sorted(get_entries(jobs_dir_home) or set())]
+    new_files = find_new_files(tracker_dict, job_folder_global_paths, get_entries, accepted_extensions)
+
+    moved_files = []
+    if get_digest is not None:
+        moved_files = match_moved_files(tracker_dict, missing_files, new_files, get_digest)
+        missing_files, new_files = remove_moved_files(missing_files, new_files, moved_files)
+
+    return SyncPlan(missing_job_names,
+                    find_orphan_folders(tracker_dict, jobs_dir_home, get_entries),
+                    new_files,
+                    missing_files,
+                    moved_files)
+
+def get_file_system_entries(directory_path: str) -> set:
+    ''' Return the entry names of a directory on the file system, None if it does not exist. '''
+    listing = scan_directory(directory_path)
+    return None if listing is None else set(listing.entries)
+
+
+if __name__ == '__main__':
+    # dry run, from creator_administrator: python -m src.sync_engine <tracker file> <jobs folder> <extension> ...
+    if len(sys.argv) < 4:
+        sys.exit(f'usage: {sys.argv[0]} <json tracker file> <jobs folder> <accepted extension> ...')
+
+    cli_sync_plan = compute_sync_plan(JsonTrackerStorage(sys.argv[1]).load(), sys.argv[2], get_file_system_entries,
+                                      tuple(extension.lower() for extension in sys.argv[3:]))
+    print(json.dumps(cli_sync_plan.toDict(), indent=4))
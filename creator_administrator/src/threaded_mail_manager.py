@@ -4,7 +4,7 @@ from src.qmessagebox import InfoQMessageBox, WarningQMessageBox, ErrorQMessageBo
 from src.worker import Worker
 from src.mail_manager import MailManager
 from src.loading_dialog import LoadingQDialog
-from src.job_tracker import JobTracker
+from src.tracker_cache import get_tracker_cache
 
 class ThreadedMailManager():
     ''' 
@@ -76,7 +76,7 @@ class ThreadedMailManager():
         mail_item=MailManager(self.gv).getMailGlobalPathFromFolder(job_dict['job_folder_global_path'])
 
         if mail_type=='RECEIVED':
-            template_content=JobTracker(parent=self.parent, gv=self.gv).getNumberOfJobsWithStatus(['WACHTRIJ'])
+            template_content={'{jobs_in_queue}': get_tracker_cache(self.gv).getStats()['jobs_in_queue']}
 
         else:
             template_content={}
@@ -0,0 +1,239 @@
+'''
+Rotating, incremental backups of the tracker.
+
+A backup is either a full snapshot of the tracker dict or a delta with the
+jobs that were put and popped since the previous backup, both are gzipped
+json files in the backup folder. Every TRACKER_BACKUP_FULL_EVERY backups a
+new full snapshot starts a new chain. A manifest remembers a hash per job of
+the latest backup, so a delta only serializes the jobs that changed.
+
+Backups older than the last TRACKER_BACKUPS_TO_KEEP are removed, a full
+snapshot is kept as long as a retained delta depends on it.
+
+The tracker as it was at any retained backup is restored by replaying the
+chain from its full snapshot, also from the command line:
+
+    python -m src.tracker_backup <tracker file> list
+    python -m src.tracker_backup <tracker file> restore <backup name or YYYY-mm-dd HH:MM> <output tracker file>
+'''
+
+import os
+import sys
+import json
+import gzip
+import hashlib
+from datetime import datetime, timedelta
+
+from src.file_lock import FileLock
+from src.tracker_serializers import SERIALIZERS, write_tracker_file_atomic
+
+FULL_BACKUP_SUFFIX = '_full.json.gz'
+DELTA_BACKUP_SUFFIX = '_delta.json.gz'
+BACKUP_NAME_DATE_FORMAT = '%Y%m%d-%H%M%S-%f'
+BACKUP_NAME_DATE_LENGTH = len('20240101-120000-000000')
+
+
+class TrackerBackup:
+    ''' Full and delta backups of the tracker dict in a backup folder. '''
+
+    def __init__(self, backup_folder_path: str, backups_to_keep: int=30, full_backup_every: int=10):
+        assert backups_to_keep > 0, f'backups_to_keep should be positive, not {backups_to_keep}'
+        assert full_backup_every > 0, f'full_backup_every should be positive, not {full_backup_every}'
+
+        self.backup_folder_path = backup_folder_path
+        self.backups_to_keep = backups_to_keep
+        self.full_backup_every = full_backup_every
+        self.manifest_file_path = os.path.join(backup_folder_path, 'manifest.json')
+        self.lock = FileLock(os.path.join(backup_folder_path, 'backup.lock'))
+
+    def backup(self, tracker_dict: dict) -> str:
+        ''' Back up the tracker dict, return the backup name or None if nothing changed. '''
+
+        if not os.path.exists(self.backup_folder_path):
+            os.makedirs(self.backup_folder_path, exist_ok=True)
+
+        with self.lock:
+            job_hashes = {job_name: hash_job_dict(job_dict) for job_name, job_dict in tracker_dict.items()}
+            manifest = self.readManifest()
+            backup_names = self.listBackupNames()
+
+            if (manifest is None or len(backup_names) == 0 or manifest['latest_backup_name'] != backup_names[-1]
+                    or manifest['deltas_since_full_backup'] + 1 >= self.full_backup_every):
+                backup_name = new_backup_name(backup_names, FULL_BACKUP_SUFFIX)
+                write_gzip_json_atomic(self.getBackupFilePath(backup_name), {'tracker_dict': tracker_dict})
+                deltas_since_full_backup = 0
+
+            else:
+                old_job_hashes = manifest['job_hashes']
+                put_jobs = {job_name: tracker_dict[job_name] for job_name, job_hash in job_hashes.items()
+                            if old_job_hashes.get(job_name) != job_hash}
+                pop_job_names = [job_name for job_name in old_job_hashes if job_name not in job_hashes]
+
+                if len(put_jobs) == 0 and len(pop_job_names) == 0:
+                    return None
+
+                backup_name = new_backup_name(backup_names, DELTA_BACKUP_SUFFIX)
+                write_gzip_json_atomic(self.getBackupFilePath(backup_name),
+                                       {'put': put_jobs, 'pop': pop_job_names})
+                deltas_since_full_backup = manifest['deltas_since_full_backup'] + 1
+
+            self.writeManifest({'latest_backup_name': backup_name,
+                                'deltas_since_full_backup': deltas_since_full_backup,
+                                'job_hashes': job_hashes})
+            self.removeOldBackups()
+
+        return backup_name
+
+    def listBackupNames(self) -> list:
+        ''' Return the names of all backups, oldest first. '''
+
+        if not os.path.exists(self.backup_folder_path):
+            return []
+
+        return sorted(file_name for file_name in os.listdir(self.backup_folder_path)
+                      if file_name.endswith((FULL_BACKUP_SUFFIX, DELTA_BACKUP_SUFFIX)))
+
+    def listBackups(self) -> list:
+        ''' Return (backup name, creation datetime, full or delta) of all backups, oldest first. '''
+        return [(backup_name, get_backup_datetime(backup_name),
+                 'full' if backup_name.endswith(FULL_BACKUP_SUFFIX) else 'delta')
+                for backup_name in self.listBackupNames()]
+
+    def getBackupFilePath(self, backup_name: str) -> str:
+        ''' Return the path toward a backup file. '''
+        return os.path.join(self.backup_folder_path, backup_name)
+
+    def findBackupName(self, point_in_time: datetime) -> str:
+        ''' Return the name of the latest backup made at or before point_in_time, or None. '''
+
+        found_backup_name = None
+        for backup_name in self.listBackupNames():
+            if get_backup_datetime(backup_name) <= point_in_time:
+                found_backup_name = backup_name
+        return found_backup_name
+
+    def restore(self, backup_name=None) -> dict:
+        ''' Return the tracker dict as it was at a backup, the latest backup if backup_name is None. '''
+
+        backup_names = self.listBackupNames()
+        assert len(backup_names) > 0, f'no backups found in {self.backup_folder_path}'
+
+        if backup_name is None:
+            backup_name = backup_names[-1]
+        assert backup_name in backup_names, f'backup {backup_name} not found in {self.backup_folder_path}'
+
+        backup_position = backup_names.index(backup_name)
+        chain_start = find_chain_start(backup_names, backup_position)
+        assert chain_start is not None, f'no full backup found before {backup_name}'
+
+        tracker_dict = read_gzip_json(self.getBackupFilePath(backup_names[chain_start]))['tracker_dict']
+
+        for delta_backup_name in backup_names[chain_start + 1:backup_position + 1]:
+            delta = read_gzip_json(self.getBackupFilePath(delta_backup_name))
+            for job_name in delta['pop']:
+                tracker_dict.pop(job_name, None)
+            tracker_dict.update(delta['put'])
+
+        return tracker_dict
+
+    def removeOldBackups(self):
+        ''' Remove the backups before the chain of the oldest backup to keep. '''
+
+        backup_names = self.listBackupNames()
+        if len(backup_names) <= self.backups_to_keep:
+            return
+
+        chain_start = find_chain_start(backup_names, len(backup_names) - self.backups_to_keep)
+        if chain_start is None:
+            return
+
+        for backup_name in backup_names[:chain_start]:
+            os.remove(self.getBackupFilePath(backup_name))
+
+    def readManifest(self) -> dict:
+        ''' Return the manifest of the latest backup, or None if it is missing or corrupt. '''
+        try:
+            with open(self.manifest_file_path, 'r') as manifest_file:
+                return json.load(manifest_file)
+        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            return None
+
+    def writeManifest(self, manifest: dict):
+        ''' Replace the manifest. '''
+        temp_manifest_file_path = self.manifest_file_path + '.tmp'
+        with open(temp_manifest_file_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(temp_manifest_file_path, self.manifest_file_path)
+
+
+def hash_job_dict(job_dict: dict) -> str:
+    ''' Return a hash of the job dict that changes when the job dict changes. '''
+    return hashlib.sha1(json.dumps(job_dict, sort_keys=True).encode('utf-8')).hexdigest()
+
+def new_backup_name(backup_names: list, suffix: str) -> str:
+    ''' Return a backup name for now, after the existing backup names. '''
+
+    backup_datetime = datetime.now()
+    if len(backup_names) > 0:
+        # backup names sort on creation time, also when the clock went back
+        backup_datetime = max(backup_datetime, get_backup_datetime(backup_names[-1]) + timedelta(microseconds=1))
+
+    return backup_datetime.strftime(BACKUP_NAME_DATE_FORMAT) + suffix
+
+def get_backup_datetime(backup_name: str) -> datetime:
+    ''' Return when a backup was made. '''
+    return datetime.strptime(backup_name[:BACKUP_NAME_DATE_LENGTH], BACKUP_NAME_DATE_FORMAT)
+
+def find_chain_start(backup_names: list, backup_position: int) -> int:
+    ''' Return the position of the full backup a backup depends on, or None. '''
+    for position in range(backup_position, -1, -1):
+        if backup_names[position].endswith(FULL_BACKUP_SUFFIX):
+            return position
+    return None
+
+def write_gzip_json_atomic(file_path: str, data: dict):
+    ''' Write gzipped json to a temporary file, then replace the file with it. '''
+    temp_file_path = file_path + '.tmp'
+    with gzip.open(temp_file_path, 'wt', encoding='utf-8') as gzip_file:
+        json.dump(data, gzip_file)
+    os.replace(temp_file_path, file_path)
+
+def read_gzip_json(file_path: str) -> dict:
+    ''' Return the data from a gzipped json file. '''
+    with gzip.open(file_path, 'rt', encoding='utf-8') as gzip_file:
+        return json.load(gzip_file)
+
+def tracker_backup_folder_path(tracker_file_path: str) -> str:
+    ''' Return the path toward the backup folder of a tracker file. '''
+    return os.path.splitext(os.path.abspath(tracker_file_path))[0] + '_backups'
+
+def get_tracker_backup(gv: dict) -> TrackerBackup:
+    ''' Return the tracker backup for the tracker file in the settings. '''
+    return TrackerBackup(tracker_backup_folder_path(gv['TRACKER_FILE_PATH']),
+                         backups_to_keep=gv.get('TRACKER_BACKUPS_TO_KEEP', 30),
+                         full_backup_every=gv.get('TRACKER_BACKUP_FULL_EVERY', 10))
+
+
+if __name__ == '__main__':
+    # restore tool, from creator_administrator: python -m src.tracker_backup <tracker file> list|restore ...
+    if len(sys.argv) == 3 and sys.argv[2] == 'list':
+        for listed_backup_name, listed_backup_datetime, backup_kind in TrackerBackup(
+                tracker_backup_folder_path(sys.argv[1])).listBackups():
+            print(f'{listed_backup_name}  {listed_backup_datetime:%Y-%m-%d %H:%M:%S}  {backup_kind}')
+
+    elif len(sys.argv) == 5 and sys.argv[2] == 'restore':
+        tracker_backup = TrackerBackup(tracker_backup_folder_path(sys.argv[1]))
+
+        restore_backup_name = sys.argv[3]
+        if restore_backup_name not in tracker_backup.listBackupNames():
+            restore_backup_name = tracker_backup.findBackupName(datetime.strptime(sys.argv[3], '%Y-%m-%d %H:%M'))
+            if restore_backup_name is None:
+                sys.exit(f'no backup found at or before {sys.argv[3]}')
+
+        restored_tracker_dict = tracker_backup.restore(restore_backup_name)
+        write_tracker_file_atomic(sys.argv[4], restored_tracker_dict, SERIALIZERS['json'])
+        print(f'Restored {len(restored_tracker_dict)} jobs from backup {restore_backup_name} to {sys.argv[4]}')
+
+    else:
+        sys.exit(f'usage: {sys.argv[0]} <tracker file> list\n'\
+                 f'       {sys.argv[0]} <tracker file> restore <backup name or "YYYY-mm-dd HH:MM"> <output tracker file>')
@@ -0,0 +1,334 @@
+'''
+In-process cache of the loaded tracker.
+
+Every JobTracker object that points to the same tracker storage shares one
+TrackerCache, the tracker is only loaded again when the signature of the
+storage (mtime, size and inode) changed since it was last read or written.
+
+During a transaction the tracker is not reloaded and dumps are collected,
+the storage is written once when the outermost transaction commits. Work
+outside the tracker that should only happen if the changes are written (e.g.
+moving job folders) is queued with afterCommit and dropped on a rollback.
+
+The cache also owns the TrackerIndex, it is rebuild when the tracker is
+loaded and updated for the jobs that are dumped. The change events from the
+index update are published on the TrackerEventFeed after the storage is
+written, events of a transaction are published when it commits.
+
+Several processes (e.g. the laser and printer app on different PCs) can
+share the tracker storage. Writes hold a lock file and increase the tracker
+version in a version file. If the version changed since the tracker was
+loaded another process wrote in the meantime, the tracker is loaded again
+and the mutations are applied again before writing. A mutation that no longer
+applies (e.g. its job was removed by the other process) is dropped as a whole
+and reported with a TrackerConflictError after the other changes are written.
+'''
+
+import os
+import copy
+
+from src.tracker_storage import create_tracker_storage
+from src.tracker_index import TrackerIndex
+from src.file_lock import FileLock
+from src.tracker_events import TrackerEventFeed, TrackerEvent, TRACKER_RELOADED
+
+
+class TrackerConflictError(Exception):
+    ''' Mutations could not be applied again to the tracker written by another process. '''
+
+    def __init__(self, mutation_names: list):
+        super().__init__('could not apply again after another process changed the tracker: ' + ', '.join(mutation_names))
+        self.mutation_names = mutation_names
+
+
+class TrackerCache:
+    ''' Loaded tracker dict, shared by all job trackers in this process. '''
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.signature = None
+        self.tracker_dict = None
+        self.index = TrackerIndex()
+        self.event_feed = TrackerEventFeed()
+        # increased every time the tracker is read from storage, e.g. after another process wrote it
+        self.load_count = 0
+
+        self.lock = FileLock(storage.storage_path + '.lock')
+        self.version_file_path = storage.storage_path + '.version'
+        self.version = None
+
+        self.transaction_depth = 0
+        self.transaction_failed = False
+        self.pending_changed_job_names = {}
+        self.pending_removed_job_names = {}
+        self.pending_full_dump = False
+        self.pending_mutations = []
+        self.pending_events = []
+        self.pending_callbacks = []
+
+    def load(self) -> dict:
+        ''' Return the tracker dict, only load it from storage if the storage changed. '''
+
+        if self.transaction_depth > 0 and self.tracker_dict is not None:
+            return self.tracker_dict
+
+        signature = self.storage.signature()
+
+        if self.tracker_dict is None or signature != self.signature:
+            # read the version before the tracker, a write in between then shows up as conflict
+            self.version = self.readVersion()
+            self.tracker_dict = self.storage.load()
+            self.signature = signature
+            self.index.rebuild(self.tracker_dict)
+            self.load_count += 1
+
+        return self.tracker_dict
+
+    def dump(self, tracker_dict: dict, changed_job_names=None, removed_job_names=None, mutation=None):
+        ''' Write the tracker dict and keep it as the cached version.
+
+        changed_job_names and removed_job_names let the storage only write what changed,
+        if both are None the entire tracker dict is written.
+
+        mutation is the function that changed tracker_dict, it is applied again if
+        another process wrote the tracker in the meantime. Without mutation the
+        changed jobs are copied over and the removed jobs are removed.
+        '''
+
+        events = self.updateIndex(tracker_dict, changed_job_names, removed_job_names)
+
+        if self.transaction_depth > 0:
+            self.tracker_dict = tracker_dict
+            self.collectPendingJobNames(changed_job_names, removed_job_names)
+            self.pending_mutations.append((mutation, changed_job_names, removed_job_names))
+            self.pending_events += events
+            return
+
+        self.writeStorage(tracker_dict, changed_job_names, removed_job_names,
+                          [(mutation, changed_job_names, removed_job_names)], events)
+
+    def writeStorage(self, tracker_dict: dict, changed_job_names, removed_job_names, mutations: list, events: list):
+        ''' Write to the storage, apply the mutations again on a conflicting write, then publish the events.
+
+        Raise a TrackerConflictError after writing if some mutations could not be applied again.
+        '''
+
+        failed_mutation_names = []
+
+        with self.lock:
+            stored_version = self.readVersion()
+
+            if stored_version != self.version:
+                tracker_dict, changed_job_names, removed_job_names, failed_mutation_names = self.applyMutationsAgain(
+                        tracker_dict, changed_job_names, removed_job_names, mutations)
+                # the changes of the other process are not known as events
+                events = [TrackerEvent(TRACKER_RELOADED)]
+
+            self.storage.dump(tracker_dict,
+                              changed_job_names=changed_job_names,
+                              removed_job_names=removed_job_names)
+
+            self.writeVersion(stored_version + 1)
+            self.version = stored_version + 1
+
+        self.tracker_dict = tracker_dict
+        self.signature = self.storage.signature()
+
+        self.event_feed.publish(events)
+
+        if len(failed_mutation_names) > 0:
+            raise TrackerConflictError(failed_mutation_names)
+
+    def applyMutationsAgain(self, tracker_dict: dict, changed_job_names, removed_job_names, mutations: list) -> tuple:
+        ''' Load the tracker written by another process and apply the mutations to it.
+
+        Return the new tracker dict, the changed and removed job names and the names
+        of the mutations that could not be applied again.
+        A mutation is applied to copies of the jobs it touches and only kept if it
+        completes, so a mutation that fails halfway does not leave half its changes.
+        A dump without mutation copies its changed jobs over and removes its removed
+        jobs, a full dump without mutation copies all jobs of this process over.
+        '''
+
+        stored_tracker_dict = self.storage.load()
+        failed_mutation_names = []
+
+        for mutation, mutation_changed_job_names, mutation_removed_job_names in mutations:
+            if mutation is not None:
+                if mutation_changed_job_names is None and mutation_removed_job_names is None:
+                    candidate_tracker_dict = copy.deepcopy(stored_tracker_dict)
+                else:
+                    candidate_tracker_dict = dict(stored_tracker_dict)
+                    for job_name in list(mutation_changed_job_names or []) + list(mutation_removed_job_names or []):
+                        if job_name in candidate_tracker_dict:
+                            candidate_tracker_dict[job_name] = copy.deepcopy(candidate_tracker_dict[job_name])
+                try:
+                    mutation(candidate_tracker_dict)
+                except (KeyError, AssertionError):
+                    # e.g. the job was removed or renamed by the other process
+                    failed_mutation_names.append(mutation.__name__)
+                else:
+                    stored_tracker_dict = candidate_tracker_dict
+                continue
+
+            if mutation_changed_job_names is None and mutation_removed_job_names is None:
+                # which jobs changed is unknown, the jobs added by the other process are kept
+                mutation_changed_job_names = list(tracker_dict)
+
+            for job_name in mutation_removed_job_names or []:
+                stored_tracker_dict.pop(job_name, None)
+
+            for job_name in mutation_changed_job_names or []:
+                if job_name in tracker_dict:
+                    stored_tracker_dict[job_name] = tracker_dict[job_name]
+                else:
+                    stored_tracker_dict.pop(job_name, None)
+
+        self.index.rebuild(stored_tracker_dict)
+        self.load_count += 1
+
+        return stored_tracker_dict, changed_job_names, removed_job_names, failed_mutation_names
+
+    def readVersion(self) -> int:
+        ''' Return the version of the stored tracker. '''
+        try:
+            with open(self.version_file_path, 'r') as version_file:
+                return int(version_file.read())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def writeVersion(self, version: int):
+        ''' Replace the version of the stored tracker. '''
+        temp_version_file_path = self.version_file_path + '.tmp'
+        with open(temp_version_file_path, 'w') as version_file:
+            version_file.write(str(version))
+        os.replace(temp_version_file_path, self.version_file_path)
+
+    def updateIndex(self, tracker_dict: dict, changed_job_names, removed_job_names) -> list:
+        ''' Update the index for the dumped jobs, rebuild it if all jobs are dumped.
+
+        Return the change events of the dumped jobs.
+        '''
+
+        if tracker_dict is not self.tracker_dict or (changed_job_names is None and removed_job_names is None):
+            self.index.rebuild(tracker_dict)
+            return [TrackerEvent(TRACKER_RELOADED)]
+
+        return self.index.update(tracker_dict, list(changed_job_names or []) + list(removed_job_names or []))
+
+    def getStats(self, queue_statuses=('WACHTRIJ',)) -> dict:
+        ''' Return the job counters of the tracker, see TrackerIndex.getStats. '''
+        self.load()
+        return self.index.getStats(queue_statuses)
+
+    def invalidate(self):
+        ''' Forget the cached tracker dict, the next load reads the storage. '''
+        self.tracker_dict = None
+        self.signature = None
+        self.version = None
+        self.index.clear()
+
+    def collectPendingJobNames(self, changed_job_names, removed_job_names):
+        ''' Remember which jobs a dump in a transaction changed or removed. '''
+
+        if changed_job_names is None and removed_job_names is None:
+            self.pending_full_dump = True
+            return
+
+        for job_name in changed_job_names or []:
+            self.pending_removed_job_names.pop(job_name, None)
+            self.pending_changed_job_names[job_name] = None
+
+        for job_name in removed_job_names or []:
+            self.pending_changed_job_names.pop(job_name, None)
+            self.pending_removed_job_names[job_name] = None
+
+    def begin(self):
+        ''' Start a (nested) transaction. '''
+        self.transaction_depth += 1
+
+    def afterCommit(self, callback):
+        ''' Call callback after the outermost transaction wrote its changes, right away outside a transaction. '''
+
+        if self.transaction_depth == 0:
+            callback()
+            return
+
+        self.pending_callbacks.append(callback)
+
+    def commit(self):
+        ''' End a transaction, the outermost transaction writes all collected changes. '''
+
+        self.transaction_depth -= 1
+        if self.transaction_depth > 0:
+            return
+
+        if self.transaction_failed:
+            self.clearTransaction()
+            self.invalidate()
+            return
+
+        callbacks = self.pending_callbacks
+
+        try:
+            self.writePendingChanges()
+        except TrackerConflictError:
+            # the changes that did apply are written
+            self.runCallbacks(callbacks)
+            raise
+
+        self.runCallbacks(callbacks)
+
+    def writePendingChanges(self):
+        ''' Write the changes collected in the transaction. '''
+
+        if self.tracker_dict is not None and (self.pending_full_dump or
+                len(self.pending_changed_job_names) > 0 or len(self.pending_removed_job_names) > 0):
+            tracker_dict = self.tracker_dict
+            changed_job_names = None if self.pending_full_dump else list(self.pending_changed_job_names)
+            removed_job_names = None if self.pending_full_dump else list(self.pending_removed_job_names)
+            mutations = self.pending_mutations
+            events = self.pending_events
+            self.clearTransaction()
+            self.writeStorage(tracker_dict, changed_job_names, removed_job_names, mutations, events)
+        else:
+            self.clearTransaction()
+
+    def runCallbacks(self, callbacks: list):
+        ''' Call the callbacks queued with afterCommit. '''
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        ''' End a transaction and drop the collected changes, the tracker is read again. '''
+
+        self.transaction_depth -= 1
+        self.transaction_failed = True
+
+        if self.transaction_depth == 0:
+            self.clearTransaction()
+            self.invalidate()
+
+    def clearTransaction(self):
+        ''' Forget the collected changes. '''
+        self.transaction_failed = False
+        self.pending_changed_job_names = {}
+        self.pending_removed_job_names = {}
+        self.pending_full_dump = False
+        self.pending_mutations = []
+        self.pending_events = []
+        self.pending_callbacks = []
+
+
+_tracker_caches = {}
+
+def get_tracker_cache(gv: dict) -> TrackerCache:
+    ''' Return the shared tracker cache for the tracker storage in the settings. '''
+
+    storage = create_tracker_storage(gv)
+    cache_key = (type(storage).__name__, os.path.abspath(storage.storage_path))
+
+    if cache_key not in _tracker_caches:
+        _tracker_caches[cache_key] = TrackerCache(storage)
+
+    return _tracker_caches[cache_key]
@@ -0,0 +1,155 @@
+'''
+Change events of the tracker.
+
+Every write to the tracker is turned into change events by the TrackerIndex,
+the events are published by the TrackerCache once the write is done. Widgets
+subscribe to the TrackerEventFeed and update only the affected rows instead of
+reading the entire tracker again.
+
+Events are published on the thread that writes the tracker, which is the
+main (GUI) thread.
+'''
+
+import weakref
+import inspect
+
+JOB_ADDED = 'JOB_ADDED'
+JOB_REMOVED = 'JOB_REMOVED'
+JOB_RENAMED = 'JOB_RENAMED'
+STATUS_CHANGED = 'STATUS_CHANGED'
+FILE_DONE_TOGGLED = 'FILE_DONE_TOGGLED'
+# make files were added to or removed from a job
+JOB_FILES_CHANGED = 'JOB_FILES_CHANGED'
+# the dynamic job name, the sender or the material, thickness or amount of a make file changed
+JOB_CHANGED = 'JOB_CHANGED'
+# the tracker was read again or written entirely, there are no events for single jobs
+TRACKER_RELOADED = 'TRACKER_RELOADED'
+
+
+class TrackerEvent:
+    ''' Change of a job in the tracker. '''
+
+    def __init__(self, kind: str, job_name=None, status=None, old_job_name=None,
+                 old_status=None, file_global_path=None, done=None):
+        self.kind = kind
+        self.job_name = job_name
+        self.status = status
+        self.old_job_name = old_job_name
+        self.old_status = old_status
+        self.file_global_path = file_global_path
+        self.done = done
+
+    def __eq__(self, other):
+        return isinstance(other, TrackerEvent) and vars(self) == vars(other)
+
+    def __repr__(self):
+        attributes = ', '.join(f'{key}={value!r}' for key, value in vars(self).items() if value is not None)
+        return f'TrackerEvent({attributes})'
+
+
+class TrackerEventFeed:
+    ''' Publish tracker events to the subscribed callbacks.
+
+    Bound methods are referenced weakly, a widget that is garbage collected
+    is dropped from the feed.
+    '''
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.next_subscription_id = 0
+
+    def subscribe(self, callback) -> int:
+        ''' Call callback with the list of events of every write, return the subscription id. '''
+
+        if inspect.ismethod(callback):
+            callback_ref = weakref.WeakMethod(callback)
+        else:
+            callback_ref = lambda: callback
+
+        subscription_id = self.next_subscription_id
+        self.next_subscription_id += 1
+        self.subscriptions[subscription_id] = callback_ref
+
+        return subscription_id
+
+    def unsubscribe(self, subscription_id: int):
+        ''' Stop calling the callback of the subscription. '''
+        self.subscriptions.pop(subscription_id, None)
+
+    def publish(self, events: list):
+        ''' Call all subscribed callbacks with the events. '''
+
+        if len(events) == 0:
+            return
+
+        for subscription_id, callback_ref in list(self.subscriptions.items()):
+            callback = callback_ref()
+            if callback is None:
+                self.unsubscribe(subscription_id)
+            else:
+                callback(events)
+
+
+def diff_indexed_job(job_name: str, old_entry: tuple, new_entry: tuple) -> list:
+    ''' Return the events between two index entries of a job, None entries are absent jobs. '''
+
+    if old_entry is None and new_entry is None:
+        return []
+
+    if old_entry is None:
+        return [TrackerEvent(JOB_ADDED, job_name=job_name, status=new_entry[0])]
+
+    if new_entry is None:
+        return [TrackerEvent(JOB_REMOVED, job_name=job_name, status=old_entry[0])]
+
+    old_status, _, old_file_entries, _, old_details = old_entry
+    new_status, _, new_file_entries, _, new_details = new_entry
+
+    events = []
+    if old_status != new_status:
+        events.append(TrackerEvent(STATUS_CHANGED, job_name=job_name,
+                                   status=new_status, old_status=old_status))
+
+    old_done = {file_key: done for file_key, _, _, done in old_file_entries}
+    for file_key, file_global_path, _, done in new_file_entries:
+        if file_key in old_done and old_done[file_key] != done:
+            events.append(TrackerEvent(FILE_DONE_TOGGLED, job_name=job_name, status=new_status,
+                                       file_global_path=file_global_path, done=done))
+
+    if set(old_done) != {file_key for file_key, _, _, _ in new_file_entries}:
+        events.append(TrackerEvent(JOB_FILES_CHANGED, job_name=job_name, status=new_status))
+
+    old_job_details, old_file_details = old_details
+    new_job_details, new_file_details = new_details
+    if old_job_details != new_job_details or any(old_file_details[file_key] != new_file_details[file_key]
+                                                 for file_key in old_file_details.keys() & new_file_details.keys()):
+        events.append(TrackerEvent(JOB_CHANGED, job_name=job_name, status=new_status))
+
+    return events
+
+def pair_renamed_jobs(events: list, job_folder_paths: dict) -> list:
+    ''' Replace a removed and an added job with the same job folder by a renamed event.
+
+    job_folder_paths maps the job names of the events to their job folder.
+    '''
+
+    removed_events = {}
+    for event in events:
+        folder_path = job_folder_paths.get(event.job_name)
+        if event.kind == JOB_REMOVED and folder_path is not None:
+            removed_events[folder_path] = event
+
+    paired_events = []
+    renamed_old_job_names = set()
+    for event in events:
+        folder_path = job_folder_paths.get(event.job_name)
+        if event.kind == JOB_ADDED and folder_path in removed_events:
+            removed_event = removed_events.pop(folder_path)
+            renamed_old_job_names.add(removed_event.job_name)
+            paired_events.append(TrackerEvent(JOB_RENAMED, job_name=event.job_name, status=event.status,
+                                              old_job_name=removed_event.job_name, old_status=removed_event.status))
+        else:
+            paired_events.append(event)
+
+    return [event for event in paired_events
+            if not (event.kind == JOB_REMOVED and event.job_name in renamed_old_job_names)]
@@ -0,0 +1,282 @@
+'''
+In-memory indexes on the tracker dict.
+
+The indexes are owned by the TrackerCache, they are rebuild when the tracker
+is loaded from storage and updated for every job that is written. Updating
+the index returns the change events of the written jobs.
+'''
+
+import os
+import re
+import bisect
+from datetime import datetime
+
+from src.tracker_events import diff_indexed_job, pair_renamed_jobs
+
+# job names made unique by makeJobNameUnique end with _(NUMBER)
+JOB_NAME_SUFFIX_PATTERN = re.compile(r'^(.*)_\((\d+)\)$')
+
+
+class TrackerIndex:
+    ''' Indexes from status, job folder, file path and material to jobs and make files,
+    with counters per status and material. '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        ''' Remove all indexed jobs. '''
+
+        # status -> {job_name: None}
+        self.status_index = {}
+        # job_folder_global_path -> job_name
+        self.job_folder_index = {}
+        # file_global_path -> (job_name, file_key)
+        self.file_path_index = {}
+        # (status, material, thickness) -> {(job_name, file_key): None}
+        self.material_index = {}
+        # (status, material, thickness) -> number of make files that are not done
+        self.not_done_counts = {}
+        # (status, material) -> number of jobs with make files of that material
+        self.material_job_counts = {}
+        # base job name -> {suffix number: None}, 0 stands for the base name itself
+        self.job_name_index = {}
+        # creation timestamps (sorted) and names of the jobs that can expire
+        self.expiry_timestamps = []
+        self.expiry_job_names = []
+
+        # job_name -> what is indexed for that job, used to remove a job from the indexes
+        self.indexed_jobs = {}
+
+    def rebuild(self, tracker_dict: dict):
+        ''' Index all jobs in the tracker dict. '''
+        self.clear()
+        for job_name, job_dict in tracker_dict.items():
+            self.addJob(job_name, job_dict)
+
+    def update(self, tracker_dict: dict, job_names) -> list:
+        ''' Index the jobs again, jobs no longer in the tracker dict are removed.
+
+        Return the change events of the jobs.
+        '''
+
+        events = []
+        job_folder_paths = {}
+        for job_name in job_names:
+            old_entry = self.indexed_jobs.get(job_name)
+
+            self.removeJob(job_name)
+            if job_name in tracker_dict:
+                self.addJob(job_name, tracker_dict[job_name])
+
+            new_entry = self.indexed_jobs.get(job_name)
+            events += diff_indexed_job(job_name, old_entry, new_entry)
+
+            if (new_entry or old_entry) is not None:
+                job_folder_paths[job_name] = (new_entry or old_entry)[1]
+
+        return pair_renamed_jobs(events, job_folder_paths)
+
+    def addJob(self, job_name: str, job_dict: dict):
+        ''' Add a job and its make files to the indexes. '''
+
+        status = job_dict.get('status')
+        job_folder_global_path = job_dict.get('job_folder_global_path')
+        make_files = job_dict.get('make_files')
+        if not isinstance(make_files, dict):
+            make_files = {}
+
+        self.status_index.setdefault(status, {})[job_name] = None
+
+        for base_name, suffix in job_name_suffixes(job_name):
+            self.job_name_index.setdefault(base_name, {})[suffix] = None
+
+        # jobs in the wachtrij never expire
+        expiry_timestamp = None
+        if status != 'WACHTRIJ':
+            expiry_timestamp = get_created_on_timestamp(job_dict)
+        if expiry_timestamp is not None:
+            expiry_position = bisect.bisect_right(self.expiry_timestamps, expiry_timestamp)
+            self.expiry_timestamps.insert(expiry_position, expiry_timestamp)
+            self.expiry_job_names.insert(expiry_position, job_name)
+
+        if job_folder_global_path is not None:
+            self.job_folder_index[os.path.normpath(job_folder_global_path)] = job_name
+
+        file_entries = []
+        file_details = {}
+        for file_key, file_dict in make_files.items():
+            file_global_path = file_dict.get('file_global_path')
+            material_key = (status, file_dict.get('material'), file_dict.get('thickness'))
+
+            if file_global_path is not None:
+                self.file_path_index[file_global_path] = (job_name, file_key)
+            self.material_index.setdefault(material_key, {})[(job_name, file_key)] = None
+            if not file_dict.get('done'):
+                add_to_counter(self.not_done_counts, material_key, 1)
+
+            file_entries.append((file_key, file_global_path, material_key, file_dict.get('done')))
+            file_details[file_key] = (file_dict.get('material'), file_dict.get('thickness'), file_dict.get('amount'))
+
+        for material in {material_key[1] for _, _, material_key, _ in file_entries}:
+            add_to_counter(self.material_job_counts, (status, material), 1)
+
+        # what the widgets show of a job besides its status and files, a change is a JOB_CHANGED event
+        details = ((job_dict.get('dynamic_job_name'), job_dict.get('sender_name')), file_details)
+
+        self.indexed_jobs[job_name] = (status, job_folder_global_path, file_entries, expiry_timestamp, details)
+
+    def removeJob(self, job_name: str):
+        ''' Remove a job and its make files from the indexes. '''
+
+        if job_name not in self.indexed_jobs:
+            return
+
+        status, job_folder_global_path, file_entries, expiry_timestamp, _ = self.indexed_jobs.pop(job_name)
+
+        if expiry_timestamp is not None:
+            expiry_position = bisect.bisect_left(self.expiry_timestamps, expiry_timestamp)
+            while self.expiry_job_names[expiry_position] != job_name:
+                expiry_position += 1
+            del self.expiry_timestamps[expiry_position]
+            del self.expiry_job_names[expiry_position]
+
+        remove_from_bucket(self.status_index, status, job_name)
+
+        for base_name, suffix in job_name_suffixes(job_name):
+            remove_from_bucket(self.job_name_index, base_name, suffix)
+
+        if job_folder_global_path is not None:
+            job_folder_global_path = os.path.normpath(job_folder_global_path)
+            if self.job_folder_index.get(job_folder_global_path) == job_name:
+                self.job_folder_index.pop(job_folder_global_path)
+
+        for file_key, file_global_path, material_key, done in file_entries:
+            if self.file_path_index.get(file_global_path) == (job_name, file_key):
+                self.file_path_index.pop(file_global_path)
+            remove_from_bucket(self.material_index, material_key, (job_name, file_key))
+            if not done:
+                add_to_counter(self.not_done_counts, material_key, -1)
+
+        for material in {material_key[1] for _, _, material_key, _ in file_entries}:
+            add_to_counter(self.material_job_counts, (status, material), -1)
+
+    def getJobNamesWithStatus(self, status: str) -> list:
+        ''' Return the names of the jobs with a status. '''
+        return list(self.status_index.get(status, {}))
+
+    def getNumberOfJobsWithStatus(self, status: str) -> int:
+        ''' Return the number of jobs with a status. '''
+        return len(self.status_index.get(status, {}))
+
+    def getJobNameFromPath(self, global_path: str) -> str:
+        ''' Return the name of the job whose folder contains the path, or None. '''
+
+        global_path = os.path.normpath(global_path)
+        while True:
+            if global_path in self.job_folder_index:
+                return self.job_folder_index[global_path]
+
+            parent_path = os.path.dirname(global_path)
+            if parent_path == global_path:
+                return None
+            global_path = parent_path
+
+    def getExpiredJobNames(self, cutoff_timestamp: float) -> list:
+        ''' Return the names of the jobs, not in the wachtrij, created on or before the cutoff timestamp. '''
+        return self.expiry_job_names[:bisect.bisect_right(self.expiry_timestamps, cutoff_timestamp)]
+
+    def getHighestJobNameSuffix(self, job_name: str) -> int:
+        ''' Return the highest NUMBER of the jobs named job_name_(NUMBER).
+
+        Return 0 if only job_name itself exists and None if neither exists.
+        '''
+
+        suffixes = self.job_name_index.get(job_name)
+        if suffixes is None:
+            return None
+        return max(suffixes)
+
+    def getMakeFileFromPath(self, file_global_path: str) -> tuple:
+        ''' Return the (job name, file key) of a make file, or None. '''
+        return self.file_path_index.get(file_global_path)
+
+    def getMaterialKeys(self, status: str) -> list:
+        ''' Return all (material, thickness) pairs of make files in jobs with a status. '''
+        return [(material, thickness) for (material_status, material, thickness)
+                in self.material_index if material_status == status]
+
+    def getMaterialKeysNotDone(self, status: str) -> list:
+        ''' Return the (material, thickness) pairs with make files that are not done in jobs with a status. '''
+        return [(material, thickness) for (material_status, material, thickness)
+                in self.not_done_counts if material_status == status]
+
+    def getMakeFiles(self, status: str, material: str, thickness: str) -> list:
+        ''' Return the (job name, file key) of make files with material and thickness in jobs with a status. '''
+        return list(self.material_index.get((status, material, thickness), {}))
+
+    def getStats(self, queue_statuses=('WACHTRIJ',)) -> dict:
+        ''' Return the number of jobs per status, the number of jobs in the queue and
+        per material the jobs and make files in the queue.
+
+        Only the counters are read, no job is looked at.
+        '''
+
+        material_stats = {}
+        for (status, material), n_jobs in self.material_job_counts.items():
+            if status in queue_statuses:
+                material_stats.setdefault(material, {'jobs': 0, 'make_files': 0, 'make_files_not_done': 0})
+                material_stats[material]['jobs'] += n_jobs
+
+        for (status, material, thickness), make_files in self.material_index.items():
+            if status in queue_statuses:
+                material_stats[material]['make_files'] += len(make_files)
+                material_stats[material]['make_files_not_done'] += self.not_done_counts.get(
+                        (status, material, thickness), 0)
+
+        return {'jobs_per_status': {status: len(job_names) for status, job_names in self.status_index.items()},
+                'jobs_in_queue': sum(self.getNumberOfJobsWithStatus(status) for status in queue_statuses),
+                'materials_in_queue': material_stats}
+
+
+def get_created_on_timestamp(job_dict: dict) -> float:
+    ''' Return the creation timestamp of a job, jobs without one fall back to created_on_date. '''
+
+    if 'created_on_timestamp' in job_dict:
+        return float(job_dict['created_on_timestamp'])
+
+    if 'created_on_date' in job_dict:
+        return datetime.strptime(job_dict['created_on_date'], "%d-%m-%Y").timestamp()
+
+    return None
+
+def job_name_suffixes(job_name: str) -> list:
+    ''' Return the (base name, suffix number) pairs a job name is indexed under. '''
+
+    suffixes = [(job_name, 0)]
+
+    match = JOB_NAME_SUFFIX_PATTERN.match(job_name)
+    if match and int(match.group(2)) > 0:
+        suffixes.append((match.group(1), int(match.group(2))))
+
+    return suffixes
+
+def add_to_counter(counter: dict, key, amount: int):
+    ''' Add an amount to a counter, drop the counter when it reaches zero. '''
+
+    count = counter.get(key, 0) + amount
+    if count == 0:
+        counter.pop(key, None)
+    else:
+        counter[key] = count
+
+def remove_from_bucket(index: dict, key, value):
+    ''' Remove a value from the bucket of an index, drop the bucket when it is empty. '''
+
+    bucket = index.get(key)
+    if bucket is None:
+        return
+
+    bucket.pop(value, None)
+    if len(bucket) == 0:
+        index.pop(key)
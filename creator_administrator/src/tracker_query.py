@@ -0,0 +1,199 @@
+'''
+Queries over the jobs and make files in the tracker dict.
+
+A query filters, sorts, projects and limits the jobs or make files:
+
+    query_jobs(tracker_dict, index, where={'status': 'WACHTRIJ'},
+               order_by='created_on_timestamp', fields=('job_name', 'dynamic_job_name'), limit=10)
+
+where maps a field to a value, a tuple or set of values, or a predicate that
+takes the field value and returns a bool. Every condition should hold.
+
+A make file row holds the fields of the file dict, plus job_name, file_key and
+the status of its job.
+
+The conditions that an index of the TrackerIndex answers (status, job folder,
+file path, material and thickness) select the candidates from that index,
+the other conditions are checked on the candidates. Without such a condition
+all jobs or make files are scanned.
+'''
+
+import os
+import heapq
+import itertools
+
+# fields that are not in the job or file dict
+JOB_NAME_FIELD = 'job_name'
+FILE_KEY_FIELD = 'file_key'
+STATUS_FIELD = 'status'
+
+
+def condition_values(condition) -> tuple:
+    ''' Return the values an equality or membership condition accepts, or None for a predicate. '''
+
+    if callable(condition):
+        return None
+    if isinstance(condition, (tuple, set, frozenset)):
+        return tuple(condition)
+    return (condition,)
+
+def matches_condition(value, condition) -> bool:
+    ''' Return True if the value meets the condition. '''
+
+    if callable(condition):
+        return bool(condition(value))
+    if isinstance(condition, (tuple, set, frozenset)):
+        return value in condition
+    return value == condition
+
+def get_job_field(job_name: str, job_dict: dict, field: str):
+    ''' Return a field of a job, the job name is the key in the tracker dict. '''
+    if field == JOB_NAME_FIELD:
+        return job_name
+    return job_dict.get(field)
+
+def get_make_file_field(job_name: str, file_key: str, job_dict: dict, field: str):
+    ''' Return a field of a make file row. '''
+    if field == JOB_NAME_FIELD:
+        return job_name
+    if field == FILE_KEY_FIELD:
+        return file_key
+    if field == STATUS_FIELD:
+        return job_dict.get(STATUS_FIELD)
+    return job_dict['make_files'][file_key].get(field)
+
+def plan_job_query(index, where: dict) -> tuple:
+    ''' Return the name of the index that selects the candidate jobs and the candidate job names.
+
+    Without an index that applies, return ('scan', None).
+    '''
+
+    if JOB_NAME_FIELD in where and condition_values(where[JOB_NAME_FIELD]) is not None:
+        return JOB_NAME_FIELD, list(dict.fromkeys(condition_values(where[JOB_NAME_FIELD])))
+
+    if 'job_folder_global_path' in where and condition_values(where['job_folder_global_path']) is not None:
+        job_names = [index.job_folder_index.get(os.path.normpath(job_folder_global_path))
+                     for job_folder_global_path in condition_values(where['job_folder_global_path'])]
+        return 'job_folder_index', list(dict.fromkeys(job_name for job_name in job_names if job_name is not None))
+
+    if STATUS_FIELD in where and condition_values(where[STATUS_FIELD]) is not None:
+        return 'status_index', list(itertools.chain.from_iterable(
+                index.getJobNamesWithStatus(status) for status in condition_values(where[STATUS_FIELD])))
+
+    return 'scan', None
+
+def plan_make_file_query(index, where: dict) -> tuple:
+    ''' Return the name of the index that selects the candidate make files and the candidate (job name, file key).
+
+    Without an index that applies, return ('scan', None).
+    '''
+
+    if 'file_global_path' in where and condition_values(where['file_global_path']) is not None:
+        make_files = [index.getMakeFileFromPath(file_global_path)
+                      for file_global_path in condition_values(where['file_global_path'])]
+        return 'file_path_index', list(dict.fromkeys(make_file for make_file in make_files if make_file is not None))
+
+    # material index keys are (status, material, thickness), every part with a condition narrows the keys
+    material_key_values = [condition_values(where[field]) if field in where else None
+                           for field in (STATUS_FIELD, 'material', 'thickness')]
+    if any(values is not None for values in material_key_values):
+        return 'material_index', [make_file for material_key, make_files in index.material_index.items()
+                                  if all(values is None or key_part in values
+                                         for key_part, values in zip(material_key, material_key_values))
+                                  for make_file in make_files]
+
+    return 'scan', None
+
+def sort_and_limit(rows, order_by, descending: bool, limit):
+    ''' Return the rows sorted on the order_by fields, at most limit rows.
+
+    rows holds (sort key, row) pairs, a missing field (None) sorts last.
+    '''
+
+    if order_by is None:
+        rows = (row for _, row in rows)
+        return list(itertools.islice(rows, limit)) if limit is not None else list(rows)
+
+    def sort_key(sort_key_and_row):
+        return tuple((value is None, value) if not descending else (value is not None, value)
+                     for value in sort_key_and_row[0])
+
+    if limit is not None:
+        select = heapq.nlargest if descending else heapq.nsmallest
+        sorted_rows = select(limit, rows, key=sort_key)
+    else:
+        sorted_rows = sorted(rows, key=sort_key, reverse=descending)
+
+    return [row for _, row in sorted_rows]
+
+def as_field_tuple(fields) -> tuple:
+    ''' Return fields as a tuple, a single field name is a tuple with one field. '''
+    if fields is None:
+        return ()
+    if isinstance(fields, str):
+        return (fields,)
+    return tuple(fields)
+
+def project(get_field, fields):
+    ''' Return a row: one value for a single field name, a tuple for a list of fields. '''
+    if isinstance(fields, str):
+        return get_field(fields)
+    return tuple(get_field(field) for field in fields)
+
+def query_jobs(tracker_dict: dict, index, where=None, order_by=None, descending=False, fields=None, limit=None) -> list:
+    ''' Return the jobs in the tracker dict that meet all where conditions.
+
+    Rows are job names without fields, the value of the field for a single
+    field name, and tuples of values for a list of field names.
+    '''
+
+    where = where or {}
+    order_by = as_field_tuple(order_by) or None
+    _, job_names = plan_job_query(index, where)
+    if job_names is None:
+        job_names = tracker_dict
+
+    def rows():
+        for job_name in job_names:
+            job_dict = tracker_dict.get(job_name)
+            if job_dict is None:
+                continue
+            if all(matches_condition(get_job_field(job_name, job_dict, field), condition)
+                   for field, condition in where.items()):
+
+                def get_field(field, job_name=job_name, job_dict=job_dict):
+                    return get_job_field(job_name, job_dict, field)
+
+                row = job_name if fields is None else project(get_field, fields)
+                yield (tuple(get_field(field) for field in order_by) if order_by else None), row
+
+    return sort_and_limit(rows(), order_by, descending, limit)
+
+def query_make_files(tracker_dict: dict, index, where=None, order_by=None, descending=False, fields=None, limit=None) -> list:
+    ''' Return the make files in the tracker dict that meet all where conditions.
+
+    Rows are (job name, file key) without fields, the value of the field for a
+    single field name, and tuples of values for a list of field names.
+    '''
+
+    where = where or {}
+    order_by = as_field_tuple(order_by) or None
+    _, make_files = plan_make_file_query(index, where)
+    if make_files is None:
+        make_files = ((job_name, file_key) for job_name, job_dict in tracker_dict.items()
+                      for file_key in job_dict.get('make_files', {}))
+
+    def rows():
+        for job_name, file_key in make_files:
+            job_dict = tracker_dict.get(job_name)
+            if job_dict is None or file_key not in job_dict.get('make_files', {}):
+                continue
+
+            def get_field(field, job_name=job_name, file_key=file_key, job_dict=job_dict):
+                return get_make_file_field(job_name, file_key, job_dict, field)
+
+            if all(matches_condition(get_field(field), condition) for field, condition in where.items()):
+                row = (job_name, file_key) if fields is None else project(get_field, fields)
+                yield (tuple(get_field(field) for field in order_by) if order_by else None), row
+
+    return sort_and_limit(rows(), order_by, descending, limit)
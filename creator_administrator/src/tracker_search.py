@@ -0,0 +1,254 @@
+'''
+Full-text search over the jobs in the tracker and the job archive.
+
+The SearchIndex maps every token (word) of the searchable fields of a job to
+the jobs containing it, and keeps the tokens sorted to find all tokens that
+start with a query term. All query terms should match, jobs are ranked on
+the fields the terms matched in and on exact or prefix matches.
+
+The TrackerSearch keeps a SearchIndex of the live jobs up to date with the
+tracker change events, it is rebuild if the tracker was read again (e.g. it
+was written by another process). The archived jobs have their own index,
+rebuild when the archive changed.
+'''
+
+import re
+import bisect
+from unidecode import unidecode
+
+from src.tracker_events import TRACKER_RELOADED, JOB_RENAMED
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# how much a term matching a token of a field adds to the score of a job
+FIELD_WEIGHTS = {'job_name': 8,
+                 'sender_name': 4,
+                 'sender_mail_adress': 4,
+                 'file_name': 2,
+                 'material': 1,
+                 'status': 1}
+# an exact token match counts more than a prefix match
+EXACT_MATCH_FACTOR = 2
+
+
+def tokenize(text: str) -> list:
+    ''' Return the lowercase ascii words in a text. '''
+    return TOKEN_PATTERN.findall(unidecode(str(text)).lower())
+
+def get_searchable_fields(job_dict: dict) -> list:
+    ''' Return (field name, text) of the searchable fields of a job. '''
+
+    fields = [(field_name, job_dict[field_name])
+              for field_name in ('job_name', 'sender_name', 'sender_mail_adress', 'status')
+              if job_dict.get(field_name) is not None]
+
+    make_files = job_dict.get('make_files')
+    if isinstance(make_files, dict):
+        for file_dict in make_files.values():
+            if file_dict.get('file_name') is not None:
+                fields.append(('file_name', file_dict['file_name']))
+            if file_dict.get('material') is not None:
+                fields.append(('material', file_dict['material']))
+
+    return fields
+
+
+class SearchIndex:
+    ''' Inverted index from tokens to job names. '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        ''' Remove all jobs. '''
+        # token -> {job_name: field weight}
+        self.postings = {}
+        # all tokens, sorted
+        self.vocabulary = []
+        # job_name -> (dynamic job name, tokens of the job)
+        self.documents = {}
+
+    def rebuild(self, job_dicts: dict, dynamic_job_name_suffix=''):
+        ''' Replace all jobs, sort the words once instead of for every new word. '''
+
+        self.clear()
+        for job_name, job_dict in job_dicts.items():
+            self.addJob(job_name, job_dict,
+                        dynamic_job_name=job_dict.get('dynamic_job_name', job_name) + dynamic_job_name_suffix,
+                        sort_vocabulary=False)
+        self.vocabulary = sorted(self.postings)
+
+    def addJob(self, job_name: str, job_dict: dict, dynamic_job_name=None, sort_vocabulary=True):
+        ''' Add (or replace) a job. '''
+
+        self.removeJob(job_name)
+
+        token_weights = {}
+        for field_name, text in get_searchable_fields(job_dict):
+            for token in tokenize(text):
+                token_weights[token] = max(token_weights.get(token, 0), FIELD_WEIGHTS[field_name])
+
+        for token, weight in token_weights.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                if sort_vocabulary:
+                    bisect.insort(self.vocabulary, token)
+            self.postings[token][job_name] = weight
+
+        if dynamic_job_name is None:
+            dynamic_job_name = job_dict.get('dynamic_job_name', job_name)
+        self.documents[job_name] = (dynamic_job_name, list(token_weights))
+
+    def removeJob(self, job_name: str):
+        ''' Remove a job, if present. '''
+
+        if job_name not in self.documents:
+            return
+
+        _, tokens = self.documents.pop(job_name)
+        for token in tokens:
+            postings = self.postings[token]
+            postings.pop(job_name, None)
+            if len(postings) == 0:
+                self.postings.pop(token)
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def getTokensWithPrefix(self, prefix: str) -> list:
+        ''' Return the tokens that start with prefix. '''
+
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + '\uffff', lo=start)
+        return self.vocabulary[start:end]
+
+    def search(self, query: str) -> dict:
+        ''' Return {job_name: score} of the jobs that match all terms of the query. '''
+
+        terms = tokenize(query)
+        if len(terms) == 0:
+            return {}
+
+        # start with the rarest term, the other terms only filter the jobs it matched
+        term_tokens = sorted(((term, self.getTokensWithPrefix(term)) for term in set(terms)),
+                             key=lambda term_and_tokens: sum(len(self.postings[token]) for token in term_and_tokens[1]))
+
+        scores = None
+        for term, tokens in term_tokens:
+            term_scores = {}
+
+            if scores is None:
+                for token in tokens:
+                    factor = EXACT_MATCH_FACTOR if token == term else 1
+                    for job_name, weight in self.postings[token].items():
+                        term_scores[job_name] = max(term_scores.get(job_name, 0), weight * factor)
+                scores = term_scores
+
+            else:
+                for job_name in scores:
+                    for token in self.documents[job_name][1]:
+                        if token.startswith(term):
+                            factor = EXACT_MATCH_FACTOR if token == term else 1
+                            term_scores[job_name] = max(term_scores.get(job_name, 0),
+                                                        self.postings[token][job_name] * factor)
+
+                scores = {job_name: score + term_scores[job_name] for job_name, score in scores.items()
+                          if job_name in term_scores}
+
+            if len(scores) == 0:
+                break
+
+        return scores
+
+    def getDynamicJobName(self, job_name: str) -> str:
+        ''' Return the dynamic job name of an indexed job. '''
+        return self.documents[job_name][0]
+
+
+class TrackerSearch:
+    ''' Search the live jobs of a tracker cache and the archived jobs of a job archive. '''
+
+    def __init__(self, tracker_cache, job_archive):
+        self.tracker_cache = tracker_cache
+        self.job_archive = job_archive
+
+        self.live_index = SearchIndex()
+        self.live_index_load_count = None
+        self.live_index_stale = True
+        self.changed_job_names = {}
+
+        self.archive_index = SearchIndex()
+        self.archive_signature = None
+
+        tracker_cache.event_feed.subscribe(self.collectTrackerEvents)
+
+    def collectTrackerEvents(self, events: list):
+        ''' Remember which jobs to index again before the next search. '''
+
+        for event in events:
+            if event.kind == TRACKER_RELOADED:
+                self.live_index_stale = True
+            elif event.kind == JOB_RENAMED:
+                self.changed_job_names[event.old_job_name] = None
+                self.changed_job_names[event.job_name] = None
+            else:
+                self.changed_job_names[event.job_name] = None
+
+    def updateLiveIndex(self):
+        ''' Bring the index of the live jobs up to date with the tracker. '''
+
+        tracker_dict = self.tracker_cache.load()
+
+        if self.live_index_stale or self.live_index_load_count != self.tracker_cache.load_count:
+            self.live_index.rebuild(tracker_dict)
+
+            self.live_index_stale = False
+            self.live_index_load_count = self.tracker_cache.load_count
+
+        else:
+            for job_name in self.changed_job_names:
+                if job_name in tracker_dict:
+                    self.live_index.addJob(job_name, tracker_dict[job_name])
+                else:
+                    self.live_index.removeJob(job_name)
+
+        self.changed_job_names = {}
+
+    def updateArchiveIndex(self):
+        ''' Index the archived jobs again if the archive changed. '''
+
+        archived_jobs = self.job_archive.loadJobs()
+
+        if self.job_archive.signature != self.archive_signature:
+            self.archive_index.rebuild(archived_jobs, dynamic_job_name_suffix=' (archived)')
+            self.archive_signature = self.job_archive.signature
+
+    def search(self, query: str, include_archived=True) -> list:
+        ''' Return (job name, dynamic job name) of the matching jobs, best match first.
+
+        Archived jobs that are also in the tracker (e.g. restored jobs) are only returned once.
+        '''
+
+        self.updateLiveIndex()
+        ranked_jobs = [(score, job_name, self.live_index) for job_name, score
+                       in self.live_index.search(query).items()]
+
+        if include_archived:
+            self.updateArchiveIndex()
+            ranked_jobs += [(score, job_name, self.archive_index) for job_name, score
+                            in self.archive_index.search(query).items()
+                            if job_name not in self.live_index.documents]
+
+        ranked_jobs.sort(key=lambda ranked_job: (-ranked_job[0], ranked_job[2] is self.archive_index, ranked_job[1]))
+
+        return [(job_name, index.getDynamicJobName(job_name)) for _, job_name, index in ranked_jobs]
+
+
+_tracker_searches = {}
+
+def get_tracker_search(tracker_cache, job_archive) -> TrackerSearch:
+    ''' Return the shared search for a tracker cache and job archive. '''
+
+    search_key = (id(tracker_cache), id(job_archive))
+    if search_key not in _tracker_searches:
+        _tracker_searches[search_key] = TrackerSearch(tracker_cache, job_archive)
+
+    return _tracker_searches[search_key]
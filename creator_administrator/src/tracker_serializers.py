@@ -0,0 +1,206 @@
+'''
+Serializers for the tracker file (and the snapshot of the journal backend).
+
+Available formats (setting TRACKER_FORMAT):
+
+* json, pretty-printed json with indent=4, readable and the default.
+* compact_json, json without whitespace.
+* marshal, binary: a header with a magic number and the payload length,
+  followed by the tracker dict serialized with marshal.
+
+The format of a tracker file is detected when it is loaded, so changing
+TRACKER_FORMAT only changes how the tracker is written next time.
+
+marshal is only safe to load from trusted files, such as the tracker file
+written by this application.
+'''
+
+import os
+import sys
+import json
+import time
+import marshal
+import struct
+import tempfile
+
+# binary tracker files start with a NUL byte, which never starts a json file
+BINARY_MAGIC = b'\x00TRK'
+# magic, format id and payload length
+BINARY_HEADER = struct.Struct('>4scQ')
+MARSHAL_FORMAT_ID = b'M'
+# fixed marshal version, so a tracker file stays readable after a python upgrade
+MARSHAL_VERSION = 4
+
+
+class TrackerFormatError(ValueError):
+    ''' The tracker file is corrupt or in an unknown format. '''
+
+
+class JsonSerializer:
+    ''' Pretty-printed json. '''
+
+    name = 'json'
+
+    def dumps(self, tracker_dict: dict) -> bytes:
+        ''' Return the serialized tracker dict. '''
+        return json.dumps(tracker_dict, indent=4).encode('utf-8')
+
+    def loads(self, data: bytes) -> dict:
+        ''' Return the tracker dict from serialized data. '''
+        return json.loads(data)
+
+
+class CompactJsonSerializer(JsonSerializer):
+    ''' Json without whitespace. '''
+
+    name = 'compact_json'
+
+    def dumps(self, tracker_dict: dict) -> bytes:
+        ''' Return the serialized tracker dict. '''
+        return json.dumps(tracker_dict, separators=(',', ':')).encode('utf-8')
+
+
+class MarshalSerializer:
+    ''' Length-prefixed marshal of the (plain python) tracker dict. '''
+
+    name = 'marshal'
+
+    def dumps(self, tracker_dict: dict) -> bytes:
+        ''' Return the serialized tracker dict. '''
+        payload = marshal.dumps(tracker_dict, MARSHAL_VERSION)
+        return BINARY_HEADER.pack(BINARY_MAGIC, MARSHAL_FORMAT_ID, len(payload)) + payload
+
+    def loads(self, data: bytes) -> dict:
+        ''' Return the tracker dict from serialized data. '''
+
+        if len(data) < BINARY_HEADER.size:
+            raise TrackerFormatError('tracker file is too short for its header')
+
+        magic, format_id, payload_length = BINARY_HEADER.unpack_from(data)
+        if magic != BINARY_MAGIC or format_id != MARSHAL_FORMAT_ID:
+            raise TrackerFormatError('tracker file is not in the marshal format')
+        if len(data) - BINARY_HEADER.size != payload_length:
+            raise TrackerFormatError(f'tracker file should hold {payload_length} bytes after its header, '\
+                                     f'not {len(data) - BINARY_HEADER.size}')
+
+        try:
+            tracker_dict = marshal.loads(data[BINARY_HEADER.size:])
+        except (EOFError, ValueError, TypeError) as exc:
+            raise TrackerFormatError(f'could not unmarshal tracker file: {exc}') from exc
+
+        if not isinstance(tracker_dict, dict):
+            raise TrackerFormatError(f'tracker file should hold a dict, not {type(tracker_dict).__name__}')
+        return tracker_dict
+
+
+SERIALIZERS = {serializer.name: serializer for serializer in
+               (JsonSerializer(), CompactJsonSerializer(), MarshalSerializer())}
+
+def get_tracker_serializer(gv: dict):
+    ''' Return the serializer selected with the TRACKER_FORMAT setting. '''
+
+    tracker_format = gv.get('TRACKER_FORMAT', 'json')
+    if tracker_format not in SERIALIZERS:
+        raise ValueError(f'unknown tracker format: {tracker_format}')
+
+    return SERIALIZERS[tracker_format]
+
+def detect_tracker_serializer(data: bytes):
+    ''' Return the serializer that wrote the data. '''
+
+    if data.startswith(BINARY_MAGIC):
+        if data[len(BINARY_MAGIC):len(BINARY_MAGIC) + 1] == MARSHAL_FORMAT_ID:
+            return SERIALIZERS['marshal']
+        raise TrackerFormatError('tracker file is in an unknown binary format')
+
+    # pretty and compact json are read by the same json parser
+    return SERIALIZERS['json']
+
+def load_tracker_bytes(data: bytes) -> dict:
+    ''' Return the tracker dict from data in any of the formats. '''
+    return detect_tracker_serializer(data).loads(data)
+
+def read_tracker_file(file_path: str) -> dict:
+    ''' Return the tracker dict from a tracker file in any of the formats. '''
+    with open(file_path, 'rb') as tracker_file:
+        return load_tracker_bytes(tracker_file.read())
+
+def write_tracker_file(file_path: str, tracker_dict: dict, serializer):
+    ''' Write the serialized tracker dict to a file and flush it to disk. '''
+    with open(file_path, 'wb') as tracker_file:
+        tracker_file.write(serializer.dumps(tracker_dict))
+        tracker_file.flush()
+        os.fsync(tracker_file.fileno())
+
+def write_tracker_file_atomic(file_path: str, tracker_dict: dict, serializer):
+    ''' Write the tracker file to a temporary file, then replace the tracker file with it. '''
+    temp_file_path = file_path + '.tmp'
+    write_tracker_file(temp_file_path, tracker_dict, serializer)
+    os.replace(temp_file_path, file_path)
+
+
+def create_benchmark_tracker_dict(n_jobs: int) -> dict:
+    ''' Return a tracker dict with n_jobs jobs that look like laser jobs. '''
+
+    tracker_dict = {}
+    for job_number in range(n_jobs):
+        job_name = f'job_{job_number}'
+        job_folder_global_path = os.path.join('/data/jobs', job_name)
+
+        make_files = {}
+        for file_number in range(3):
+            file_key = f'{job_name}_part_{file_number}.dxf'
+            make_files[file_key] = {'file_name': f'part_{file_number}.dxf',
+                                    'file_global_path': os.path.join(job_folder_global_path, f'part_{file_number}.dxf'),
+                                    'material': 'MDF',
+                                    'thickness': '3',
+                                    'amount': 1,
+                                    'done': file_number == 0}
+
+        tracker_dict[job_name] = {'job_name': job_name,
+                                  'job_folder_global_path': job_folder_global_path,
+                                  'dynamic_job_name': job_name,
+                                  'status': 'WACHTRIJ',
+                                  'created_on_date': '01-01-2024',
+                                  'created_on_timestamp': 1704063600.0 + job_number,
+                                  'make_files': make_files,
+                                  'sender_name': 'Sender Name',
+                                  'sender_mail_adress': 'sender@example.com',
+                                  'sender_mail_receive_time': '2024-01-01T12:00:00'}
+    return tracker_dict
+
+def benchmark_serializers(job_counts: tuple, serializer_names=None) -> list:
+    ''' Return (format, number of jobs, file size, dump seconds, load seconds) per format and job count. '''
+
+    if serializer_names is None:
+        serializer_names = list(SERIALIZERS)
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for n_jobs in job_counts:
+            tracker_dict = create_benchmark_tracker_dict(n_jobs)
+
+            for serializer_name in serializer_names:
+                file_path = os.path.join(temp_dir, f'job_log_{serializer_name}')
+
+                start_time = time.perf_counter()
+                write_tracker_file_atomic(file_path, tracker_dict, SERIALIZERS[serializer_name])
+                dump_seconds = time.perf_counter() - start_time
+
+                start_time = time.perf_counter()
+                loaded_tracker_dict = read_tracker_file(file_path)
+                load_seconds = time.perf_counter() - start_time
+
+                assert loaded_tracker_dict == tracker_dict, f'{serializer_name} did not load what it dumped'
+                results.append((serializer_name, n_jobs, os.path.getsize(file_path), dump_seconds, load_seconds))
+
+    return results
+
+
+if __name__ == '__main__':
+    # benchmark, from creator_administrator: python -m src.tracker_serializers [number of jobs ...]
+    benchmark_job_counts = tuple(int(arg) for arg in sys.argv[1:]) or (1000, 10000, 100000)
+
+    print(f'{"format":<14}{"jobs":>8}{"size (MB)":>12}{"dump (s)":>10}{"load (s)":>10}')
+    for result in benchmark_serializers(benchmark_job_counts):
+        print(f'{result[0]:<14}{result[1]:>8}{result[2] / 1e6:>12.2f}{result[3]:>10.3f}{result[4]:>10.3f}')
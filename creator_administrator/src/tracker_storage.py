@@ -0,0 +1,398 @@
+'''
+Storage backends for the job tracker.
+
+The job tracker works on a tracker dict {job_name: job_dict}, a storage backend
+loads and dumps that dict. Available backends (setting TRACKER_BACKEND):
+
+* json, the whole tracker is written to one json file.
+* sqlite, jobs and make files are rows in an SQLite database, a dump only
+  rewrites the rows of the jobs that changed.
+* journal, the json file is a snapshot and every dump appends the changed and
+  removed jobs to a journal file, the journal is compacted into the snapshot
+  once it grows past a threshold.
+
+The json file and the journal snapshot are written in the format of the
+TRACKER_FORMAT setting, see src/tracker_serializers.py.
+'''
+
+import os
+import sys
+import json
+import sqlite3
+import threading
+from contextlib import closing
+
+from src.file_lock import FileLock
+from src.tracker_serializers import (SERIALIZERS, get_tracker_serializer, read_tracker_file,
+                                     write_tracker_file, write_tracker_file_atomic)
+
+# compact the journal into the snapshot once the journal is larger than this
+JOURNAL_COMPACTION_THRESHOLD = 1024 * 1024
+
+
+class JsonTrackerStorage:
+    ''' Store the tracker dict in a single json file. '''
+
+    def __init__(self, storage_path: str, serializer=None):
+        self.storage_path = storage_path
+        self.serializer = SERIALIZERS['json'] if serializer is None else serializer
+
+    def exists(self) -> bool:
+        ''' Return True if the tracker file exists. '''
+        return os.path.exists(self.storage_path)
+
+    def create(self):
+        ''' Create an empty tracker file. '''
+        self.dump({})
+
+    def signature(self) -> tuple:
+        ''' Return a signature that changes whenever the tracker file changes. '''
+        stat = os.stat(self.storage_path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def load(self) -> dict:
+        ''' Return the tracker dict, the format of the file is detected. '''
+        return read_tracker_file(self.storage_path)
+
+    def dump(self, tracker_dict: dict, changed_job_names=None, removed_job_names=None): # pylint: disable=unused-argument
+        ''' Write the tracker dict, a json file is always rewritten entirely. '''
+        write_tracker_file_atomic(self.storage_path, tracker_dict, self.serializer)
+
+
+class SQLiteTrackerStorage:
+    ''' Store jobs and make files in the tables of an SQLite database. '''
+
+    def __init__(self, storage_path: str):
+        self.storage_path = storage_path
+
+    def connect(self) -> sqlite3.Connection:
+        ''' Return a connection to the database, create the tables if needed. '''
+        connection = sqlite3.connect(self.storage_path)
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_name TEXT PRIMARY KEY,
+                status TEXT,
+                job_folder_global_path TEXT,
+                job_dict TEXT NOT NULL);
+
+            CREATE TABLE IF NOT EXISTS make_files (
+                job_name TEXT NOT NULL,
+                file_key TEXT NOT NULL,
+                file_global_path TEXT,
+                material TEXT,
+                thickness TEXT,
+                done INTEGER,
+                file_dict TEXT NOT NULL,
+                PRIMARY KEY (job_name, file_key));
+
+            CREATE INDEX IF NOT EXISTS jobs_status_index ON jobs (status);
+            CREATE INDEX IF NOT EXISTS make_files_material_thickness_index ON make_files (material, thickness);
+            CREATE INDEX IF NOT EXISTS make_files_file_global_path_index ON make_files (file_global_path);
+            ''')
+        return connection
+
+    def exists(self) -> bool:
+        ''' Return True if the database file exists. '''
+        return os.path.exists(self.storage_path)
+
+    def create(self):
+        ''' Create an empty database. '''
+        with closing(self.connect()) as connection:
+            connection.commit()
+
+    def signature(self) -> tuple:
+        ''' Return a signature that changes whenever the database changes. '''
+        stat = os.stat(self.storage_path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def load(self) -> dict:
+        ''' Return the tracker dict build from the jobs and make_files tables. '''
+
+        tracker_dict = {}
+
+        with closing(self.connect()) as connection:
+            for job_name, job_dict_json in connection.execute(
+                    'SELECT job_name, job_dict FROM jobs ORDER BY rowid'):
+                job_dict = json.loads(job_dict_json)
+                if 'make_files' not in job_dict:
+                    job_dict['make_files'] = {}
+                tracker_dict[job_name] = job_dict
+
+            for job_name, file_key, file_dict_json in connection.execute(
+                    'SELECT job_name, file_key, file_dict FROM make_files ORDER BY rowid'):
+                if job_name in tracker_dict:
+                    tracker_dict[job_name]['make_files'][file_key] = json.loads(file_dict_json)
+
+        return tracker_dict
+
+    def dump(self, tracker_dict: dict, changed_job_names=None, removed_job_names=None):
+        ''' Write the changed and removed jobs, write all jobs if no job names are given. '''
+
+        with closing(self.connect()) as connection:
+            with connection:
+                if changed_job_names is None and removed_job_names is None:
+                    connection.execute('DELETE FROM make_files')
+                    connection.execute('DELETE FROM jobs')
+                    changed_job_names = tracker_dict.keys()
+
+                for job_name in removed_job_names or []:
+                    self.deleteJobRows(connection, job_name)
+
+                for job_name in changed_job_names or []:
+                    if job_name in tracker_dict:
+                        self.writeJobRows(connection, job_name, tracker_dict[job_name])
+                    else:
+                        self.deleteJobRows(connection, job_name)
+
+    def writeJobRows(self, connection: sqlite3.Connection, job_name: str, job_dict: dict):
+        ''' Insert or update the job row and replace the make file rows of a job. '''
+
+        job_row_dict = dict(job_dict)
+        make_files = job_row_dict.pop('make_files', None)
+        if not isinstance(make_files, dict):
+            # keep make_files that are not a dict (e.g. None) as they are
+            job_row_dict['make_files'] = make_files
+            make_files = {}
+
+        connection.execute('''
+            INSERT INTO jobs (job_name, status, job_folder_global_path, job_dict)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (job_name) DO UPDATE SET
+                status=excluded.status,
+                job_folder_global_path=excluded.job_folder_global_path,
+                job_dict=excluded.job_dict''',
+            (job_name,
+             job_row_dict.get('status'),
+             job_row_dict.get('job_folder_global_path'),
+             json.dumps(job_row_dict)))
+
+        connection.execute('DELETE FROM make_files WHERE job_name=?', (job_name,))
+        connection.executemany('''
+            INSERT INTO make_files (job_name, file_key, file_global_path, material, thickness, done, file_dict)
+            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            [(job_name,
+              file_key,
+              file_dict.get('file_global_path'),
+              file_dict.get('material'),
+              file_dict.get('thickness'),
+              file_dict.get('done'),
+              json.dumps(file_dict)) for file_key, file_dict in make_files.items()])
+
+    def deleteJobRows(self, connection: sqlite3.Connection, job_name: str):
+        ''' Delete the job row and make file rows of a job. '''
+        connection.execute('DELETE FROM make_files WHERE job_name=?', (job_name,))
+        connection.execute('DELETE FROM jobs WHERE job_name=?', (job_name,))
+
+
+class JournalTrackerStorage:
+    ''' Store the tracker dict as a json snapshot plus an append-only journal.
+
+    The journal holds one json record per line, a record either puts an entire
+    job dict or pops a job. Replaying a record twice gives the same result, so
+    the snapshot plus the journal is always a valid tracker dict, also when the
+    application crashed halfway through a compaction. An incomplete last line,
+    from a crash during an append, is ignored and cut off by the next append.
+    '''
+
+    def __init__(self, storage_path: str, serializer=None):
+        self.storage_path = storage_path
+        self.serializer = SERIALIZERS['json'] if serializer is None else serializer
+        self.journal_path = os.path.splitext(storage_path)[0] + '.journal'
+        self.lock = threading.Lock()
+        self.compacting = False
+
+    def exists(self) -> bool:
+        ''' Return True if the snapshot exists. '''
+        return os.path.exists(self.storage_path)
+
+    def create(self):
+        ''' Create an empty snapshot and remove the journal. '''
+        with self.lock:
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            write_tracker_file_atomic(self.storage_path, {}, self.serializer)
+
+    def signature(self) -> tuple:
+        ''' Return a signature that changes whenever the snapshot or journal changes. '''
+        stat = os.stat(self.storage_path)
+        snapshot_signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        if not os.path.exists(self.journal_path):
+            return (snapshot_signature, None)
+
+        stat = os.stat(self.journal_path)
+        return (snapshot_signature, (stat.st_mtime_ns, stat.st_size, stat.st_ino))
+
+    def load(self) -> dict:
+        ''' Return the snapshot with the journal replayed over it. '''
+        with self.lock:
+            tracker_dict = read_tracker_file(self.storage_path)
+            records, _ = self.readJournal()
+
+        replay_journal_records(tracker_dict, records)
+        return tracker_dict
+
+    def dump(self, tracker_dict: dict, changed_job_names=None, removed_job_names=None):
+        ''' Append the changed and removed jobs to the journal.
+
+        Without job names the stored tracker is compared with tracker_dict
+        and the jobs that differ are appended.
+        '''
+
+        if changed_job_names is None and removed_job_names is None:
+            stored_tracker_dict = self.load()
+            changed_job_names = [job_name for job_name, job_dict in tracker_dict.items()
+                                 if stored_tracker_dict.get(job_name) != job_dict]
+            removed_job_names = [job_name for job_name in stored_tracker_dict
+                                 if job_name not in tracker_dict]
+
+        records = []
+        for job_name in removed_job_names or []:
+            records.append({'op': 'pop', 'job_name': job_name})
+
+        for job_name in changed_job_names or []:
+            if job_name in tracker_dict:
+                records.append({'op': 'put', 'job_name': job_name, 'job_dict': tracker_dict[job_name]})
+            else:
+                records.append({'op': 'pop', 'job_name': job_name})
+
+        if len(records) > 0:
+            self.appendJournalRecords(records)
+
+    def readJournal(self, start: int=0) -> tuple:
+        ''' Return the complete journal records from start and the offset after the last one. '''
+
+        if not os.path.exists(self.journal_path):
+            return [], 0
+
+        with open(self.journal_path, 'rb') as journal_file:
+            journal_file.seek(start)
+            journal_bytes = journal_file.read()
+
+        records = []
+        end = start
+        for line in journal_bytes.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            try:
+                records.append(json.loads(line))
+            except json.decoder.JSONDecodeError:
+                break
+            end += len(line)
+
+        return records, end
+
+    def appendJournalRecords(self, records: list):
+        ''' Append records to the journal and flush them to disk. '''
+
+        journal_bytes = b''.join(json.dumps(record).encode('utf-8') + b'\n' for record in records)
+
+        with self.lock:
+            with open(self.journal_path, 'ab+') as journal_file:
+                if journal_file.tell() > 0:
+                    journal_file.seek(-1, os.SEEK_END)
+                    if journal_file.read(1) != b'\n':
+                        # cut off what is left of an interrupted append
+                        _, end = self.readJournal()
+                        journal_file.truncate(end)
+                journal_file.write(journal_bytes)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+
+    def needsCompaction(self) -> bool:
+        ''' Return True if the journal passed the compaction threshold. '''
+        return (not self.compacting and os.path.exists(self.journal_path)
+                and os.path.getsize(self.journal_path) > JOURNAL_COMPACTION_THRESHOLD)
+
+    def compact(self):
+        ''' Replay the journal into a new snapshot and empty the journal.
+
+        Writing the new snapshot happens without holding the lock, so appends
+        continue in the meantime. These appends are moved to the new journal.
+        '''
+
+        with self.lock:
+            if self.compacting:
+                return
+            self.compacting = True
+
+        try:
+            with self.lock:
+                tracker_dict = read_tracker_file(self.storage_path)
+                records, end = self.readJournal()
+
+            replay_journal_records(tracker_dict, records)
+            temp_snapshot_path = self.storage_path + '.tmp'
+            write_tracker_file(temp_snapshot_path, tracker_dict, self.serializer)
+
+            # other processes append to the journal while holding the lock file
+            with FileLock(self.storage_path + '.lock'), self.lock:
+                tail_records, _ = self.readJournal(end)
+                temp_journal_path = self.journal_path + '.tmp'
+                with open(temp_journal_path, 'wb') as journal_file:
+                    for record in tail_records:
+                        journal_file.write(json.dumps(record).encode('utf-8') + b'\n')
+                    journal_file.flush()
+                    os.fsync(journal_file.fileno())
+
+                # a crash between these replaces leaves the new snapshot with the old
+                # journal, replaying the already compacted records again is harmless
+                os.replace(temp_snapshot_path, self.storage_path)
+                os.replace(temp_journal_path, self.journal_path)
+        finally:
+            self.compacting = False
+
+
+def replay_journal_records(tracker_dict: dict, records: list):
+    ''' Apply journal records to a tracker dict. '''
+
+    for record in records:
+        if record['op'] == 'put':
+            tracker_dict[record['job_name']] = record['job_dict']
+        elif record['op'] == 'pop':
+            tracker_dict.pop(record['job_name'], None)
+        else:
+            raise ValueError(f"unknown journal record: {record['op']}")
+
+def json_tracker_file_path(gv: dict) -> str:
+    ''' Return the path toward the json tracker file. '''
+    return gv['TRACKER_FILE_PATH']
+
+def sqlite_tracker_file_path(gv: dict) -> str:
+    ''' Return the path toward the SQLite tracker database. '''
+    return os.path.splitext(gv['TRACKER_FILE_PATH'])[0] + '.sqlite'
+
+def create_tracker_storage(gv: dict):
+    ''' Return the storage backend selected with the TRACKER_BACKEND setting. '''
+
+    tracker_backend = gv.get('TRACKER_BACKEND', 'json')
+
+    if tracker_backend == 'json':
+        return JsonTrackerStorage(json_tracker_file_path(gv), get_tracker_serializer(gv))
+
+    if tracker_backend == 'sqlite':
+        return SQLiteTrackerStorage(sqlite_tracker_file_path(gv))
+
+    if tracker_backend == 'journal':
+        return JournalTrackerStorage(json_tracker_file_path(gv), get_tracker_serializer(gv))
+
+    raise ValueError(f'unknown tracker backend: {tracker_backend}')
+
+def migrate_json_to_sqlite(json_file_path: str, sqlite_file_path: str) -> int:
+    ''' Copy all jobs from a json tracker file into an SQLite database, return the number of jobs. '''
+
+    assert os.path.exists(json_file_path), f'could not find tracker file {json_file_path}'
+
+    tracker_dict = JsonTrackerStorage(json_file_path).load()
+    SQLiteTrackerStorage(sqlite_file_path).dump(tracker_dict)
+
+    return len(tracker_dict)
+
+
+if __name__ == '__main__':
+    # one-shot migration, from creator_administrator: python -m src.tracker_storage <job_log.json> <job_log.sqlite>
+    if len(sys.argv) != 3:
+        sys.exit(f'usage: {sys.argv[0]} <json tracker file> <sqlite tracker file>')
+
+    n_jobs = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(f'Migrated {n_jobs} jobs from {sys.argv[1]} to {sys.argv[2]}')
@@ -0,0 +1,9 @@
+import pytest
+from PyQt6.QtWidgets import QApplication
+
+
+@pytest.fixture
+def qapp(monkeypatch):
+    """Fixture for the QApplication the widgets and tracker messages need."""
+    monkeypatch.setenv('QT_QPA_PLATFORM', 'offscreen')
+    yield QApplication.instance() or QApplication([])
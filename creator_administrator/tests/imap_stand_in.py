@@ -0,0 +1,367 @@
+'''
+Local IMAP stand-in server for tests.
+
+Speaks the part of IMAP4rev1 that the mail manager uses, over plain TCP on
+localhost. Mailboxes live in memory and are shared by all connections, the
+server counts logins and commands so tests can check how often the mail
+manager connects.
+'''
+
+import re
+import email
+import urllib.parse
+import socketserver
+import threading
+
+TOKEN_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|\((?:[^()]|\([^()]*\))*\)|\[[^\]]*\]|[^\s()\[\]]+(?:\[[^\]]*\](?:<[^>]*>)?)?')
+
+
+class StandInMessage:
+    ''' A message in a mailbox. '''
+
+    def __init__(self, uid: int, data: bytes, flags=()):
+        self.uid = uid
+        self.data = data
+        self.flags = set(flags)
+
+
+class ImapStandInServer(socketserver.ThreadingTCPServer):
+    ''' In memory IMAP server, start() serves on a background thread. '''
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, user='user@example.com', password='password'):
+        super().__init__(('127.0.0.1', 0), ImapStandInHandler)
+        self.user = user
+        self.password = password
+        self.lock = threading.Lock()
+        self.mailboxes = {'INBOX': []}
+        self.uid_validity = {'INBOX': 1}
+        self.next_uid = {'INBOX': 1}
+        self.n_logins = 0
+        self.commands = []
+        # uids of the messages whose body was sent
+        self.downloaded_uids = []
+        # uids of the messages whose BODYSTRUCTURE was sent
+        self.triaged_uids = []
+        self.handlers = []
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.dropConnections()
+        self.shutdown()
+        self.server_close()
+
+    def addMessage(self, data: bytes, mailbox='INBOX', flags=()) -> int:
+        ''' Add a message to a mailbox, return its uid. '''
+        with self.lock:
+            return self.appendMessage(mailbox, data, flags)
+
+    def appendMessage(self, mailbox: str, data: bytes, flags=()) -> int:
+        uid = self.next_uid[mailbox]
+        self.next_uid[mailbox] += 1
+        self.mailboxes[mailbox].append(StandInMessage(uid, data, flags))
+        return uid
+
+    def dropConnections(self):
+        ''' Close all open connections without a goodbye, as a server or network that went away. '''
+        for handler in list(self.handlers):
+            handler.drop()
+
+    def countCommands(self, command: str) -> int:
+        return sum(1 for logged_command in self.commands if logged_command == command)
+
+
+class ImapStandInHandler(socketserver.StreamRequestHandler):
+    ''' One IMAP connection. '''
+
+    def setup(self):
+        super().setup()
+        self.selected = None
+        self.dropped = False
+        self.server.handlers.append(self)
+
+    def finish(self):
+        if self in self.server.handlers:
+            self.server.handlers.remove(self)
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def drop(self):
+        self.dropped = True
+        try:
+            self.request.shutdown(2)
+        except OSError:
+            pass
+
+    def send(self, line):
+        if isinstance(line, str):
+            line = line.encode()
+        self.wfile.write(line + b'\r\n')
+
+    def handle(self):
+        self.send('* OK IMAP4rev1 stand-in ready')
+
+        while not self.dropped:
+            try:
+                line = self.rfile.readline()
+            except OSError:
+                return
+            if not line:
+                return
+
+            tag, _, rest = line.decode().rstrip('\r\n').partition(' ')
+            command, _, arguments = rest.partition(' ')
+            command = command.upper()
+
+            if command == 'UID':
+                command, _, arguments = arguments.partition(' ')
+                command = 'UID ' + command.upper()
+
+            with self.server.lock:
+                self.server.commands.append(command)
+
+            method = getattr(self, 'do_' + command.replace(' ', '_'), None)
+            if method is None:
+                self.send(f'{tag} BAD unknown command {command}')
+                continue
+
+            try:
+                with self.server.lock:
+                    result = method(tokenize(arguments))
+            except (ValueError, KeyError, IndexError) as exc:
+                self.send(f'{tag} BAD {exc}')
+                continue
+
+            if self.dropped:
+                return
+            self.send(f'{tag} {result or "OK completed"}')
+            if command == 'LOGOUT':
+                return
+
+    def do_CAPABILITY(self, arguments):
+        self.send('* CAPABILITY IMAP4rev1 UIDPLUS')
+
+    def do_NOOP(self, arguments):
+        pass
+
+    def do_LOGIN(self, arguments):
+        if unquote(arguments[0]) != self.server.user or unquote(arguments[1]) != self.server.password:
+            return 'NO [AUTHENTICATIONFAILED] invalid credentials'
+        self.server.n_logins += 1
+        return None
+
+    def do_LOGOUT(self, arguments):
+        self.send('* BYE logging out')
+
+    def do_SELECT(self, arguments):
+        mailbox = unquote(arguments[0])
+        if mailbox not in self.server.mailboxes:
+            return 'NO no such mailbox'
+        self.selected = mailbox
+        self.send(f'* {len(self.server.mailboxes[mailbox])} EXISTS')
+        self.send('* 0 RECENT')
+        self.send(f'* OK [UIDVALIDITY {self.server.uid_validity[mailbox]}] UIDs valid')
+        self.send(f'* OK [UIDNEXT {self.server.next_uid[mailbox]}] predicted next UID')
+        return 'OK [READ-WRITE] SELECT completed'
+
+    def do_LIST(self, arguments):
+        for mailbox in self.server.mailboxes:
+            self.send(f'* LIST (\\HasNoChildren) "/" "{mailbox}"')
+
+    def do_CREATE(self, arguments):
+        mailbox = unquote(arguments[0])
+        if mailbox in self.server.mailboxes:
+            return 'NO mailbox exists'
+        self.server.mailboxes[mailbox] = []
+        self.server.uid_validity[mailbox] = 1
+        self.server.next_uid[mailbox] = 1
+        return None
+
+    def do_CLOSE(self, arguments):
+        self.expunge(send=False)
+        self.selected = None
+
+    def do_EXPUNGE(self, arguments):
+        self.expunge(send=True)
+
+    def expunge(self, send: bool):
+        messages = self.server.mailboxes[self.selected]
+        for sequence_number in range(len(messages), 0, -1):
+            if '\\Deleted' in messages[sequence_number - 1].flags:
+                messages.pop(sequence_number - 1)
+                if send:
+                    self.send(f'* {sequence_number} EXPUNGE')
+
+    def do_SEARCH(self, arguments):
+        self.send('* SEARCH ' + ' '.join(str(sequence_number) for sequence_number, _ in self.search(arguments)))
+
+    def do_UID_SEARCH(self, arguments):
+        self.send('* SEARCH ' + ' '.join(str(message.uid) for _, message in self.search(arguments)))
+
+    def search(self, arguments):
+        criteria = [argument.upper() for argument in arguments if argument.upper() != 'CHARSET']
+        messages = list(enumerate(self.server.mailboxes[self.selected], start=1))
+        if 'UNSEEN' in criteria:
+            messages = [(number, message) for number, message in messages if '\\Seen' not in message.flags]
+        for position, criterium in enumerate(criteria):
+            if criterium == 'UID':
+                uids = parse_sequence_set(criteria[position + 1], max((message.uid for _, message in messages), default=0))
+                messages = [(number, message) for number, message in messages if message.uid in uids]
+        return messages
+
+    def selectBySequence(self, sequence_set: str):
+        messages = self.server.mailboxes[self.selected]
+        numbers = parse_sequence_set(sequence_set, len(messages))
+        return [(number, messages[number - 1]) for number in sorted(numbers) if 1 <= number <= len(messages)]
+
+    def selectByUid(self, sequence_set: str):
+        messages = self.server.mailboxes[self.selected]
+        uids = parse_sequence_set(sequence_set, max((message.uid for message in messages), default=0))
+        return [(number, message) for number, message in enumerate(messages, start=1) if message.uid in uids]
+
+    def do_FETCH(self, arguments):
+        self.fetch(self.selectBySequence(arguments[0]), arguments[1], with_uid=False)
+
+    def do_UID_FETCH(self, arguments):
+        self.fetch(self.selectByUid(arguments[0]), arguments[1], with_uid=True)
+
+    def fetch(self, messages, items: str, with_uid: bool):
+        items = items.strip('()').upper()
+        for number, message in messages:
+            parts = []
+            literal = None
+            if with_uid or 'UID' in items.split():
+                parts.append(f'UID {message.uid}')
+            if 'FLAGS' in items.split():
+                parts.append('FLAGS (' + ' '.join(sorted(message.flags)) + ')')
+            if 'RFC822.SIZE' in items:
+                parts.append(f'RFC822.SIZE {len(message.data)}')
+            if 'BODYSTRUCTURE' in items.split():
+                parts.append('BODYSTRUCTURE ' + bodystructure(email.message_from_bytes(message.data)))
+                self.server.triaged_uids.append(message.uid)
+            for item, data in (('BODY.PEEK[]', message.data), ('BODY[]', message.data), ('RFC822', message.data)):
+                # BODY[]<offset.length> fetches a part of the body
+                item_match = re.search(r'(^|\s)' + re.escape(item) + r'(<(\d+)\.(\d+)>)?(\s|$)', items)
+                if item_match:
+                    if not item.startswith('BODY.PEEK'):
+                        message.flags.add('\\Seen')
+                    item = item.replace('.PEEK', '')
+                    if item_match.group(2):
+                        offset, length = int(item_match.group(3)), int(item_match.group(4))
+                        item, data = f'{item}<{offset}>', data[offset:offset + length]
+                    literal = (item, data)
+                    self.server.downloaded_uids.append(message.uid)
+                    break
+            # BODY.PEEK[HEADER.FIELDS (FROM DATE)] fetches some headers
+            header_match = re.search(r'BODY(\.PEEK)?\[HEADER\.FIELDS \(([^)]*)\)\]', items)
+            if header_match and literal is None:
+                headers = email.message_from_bytes(message.data)
+                field_names = header_match.group(2).split()
+                data = ''.join(f'{name}: {headers[name]}\r\n' for name in field_names if headers[name] is not None) + '\r\n'
+                literal = (f'BODY[HEADER.FIELDS ({header_match.group(2)})]', data.encode())
+            if literal is None:
+                self.send(f'* {number} FETCH (' + ' '.join(parts) + ')')
+            else:
+                prefix = ' '.join(parts + [f'{literal[0]} {{{len(literal[1])}}}'])
+                self.wfile.write(f'* {number} FETCH ({prefix}\r\n'.encode() + literal[1] + b')\r\n')
+
+    def do_COPY(self, arguments):
+        return self.copy(self.selectBySequence(arguments[0]), unquote(arguments[1]))
+
+    def do_UID_COPY(self, arguments):
+        return self.copy(self.selectByUid(arguments[0]), unquote(arguments[1]))
+
+    def copy(self, messages, mailbox: str):
+        if mailbox not in self.server.mailboxes:
+            return 'NO [TRYCREATE] no such mailbox'
+        for _, message in messages:
+            self.server.appendMessage(mailbox, message.data, message.flags - {'\\Deleted'})
+        return None
+
+    def do_STORE(self, arguments):
+        self.store(self.selectBySequence(arguments[0]), arguments[1], arguments[2], with_uid=False)
+
+    def do_UID_STORE(self, arguments):
+        self.store(self.selectByUid(arguments[0]), arguments[1], arguments[2], with_uid=True)
+
+    def store(self, messages, operation: str, flags: str, with_uid: bool):
+        flags = set(flags.strip('()').split())
+        for number, message in messages:
+            if operation.upper().startswith('+'):
+                message.flags |= flags
+            elif operation.upper().startswith('-'):
+                message.flags -= flags
+            else:
+                message.flags = set(flags)
+            uid = f'UID {message.uid} ' if with_uid else ''
+            self.send(f'* {number} FETCH ({uid}FLAGS (' + ' '.join(sorted(message.flags)) + '))')
+
+
+def quote(value) -> str:
+    if value is None:
+        return 'NIL'
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def parameter_list(parameters: list) -> str:
+    if len(parameters) == 0:
+        return 'NIL'
+
+    quoted_parameters = []
+    for key, value in parameters:
+        # an RFC 2231 encoded parameter, as (charset, language, value)
+        if isinstance(value, tuple):
+            charset, language, text = value
+            key = key + '*'
+            value = f"{charset}'{language or ''}'{urllib.parse.quote(text.encode('latin-1'))}"
+        quoted_parameters.append(f'{quote(key.upper())} {quote(value)}')
+    return '(' + ' '.join(quoted_parameters) + ')'
+
+def bodystructure(part) -> str:
+    ''' Return the BODYSTRUCTURE of a message, with extension data. '''
+
+    if part.get_content_maintype() == 'multipart':
+        return '(' + ''.join(bodystructure(sub_part) for sub_part in part.get_payload()) + \
+            f' {quote(part.get_content_subtype().upper())} {parameter_list(part.get_params()[1:])} NIL NIL NIL)'
+
+    disposition = 'NIL'
+    if part.get_content_disposition() is not None:
+        disposition_parameters = part.get_params(header='content-disposition')[1:]
+        disposition = f'({quote(part.get_content_disposition().upper())} {parameter_list(disposition_parameters)})'
+
+    payload = part.get_payload(decode=False)
+    fields = (f'{quote(part.get_content_maintype().upper())} {quote(part.get_content_subtype().upper())} '
+              f'{parameter_list(part.get_params()[1:])} NIL NIL '
+              f'{quote(part.get("Content-Transfer-Encoding", "7BIT").upper())} {len(payload)}')
+
+    if part.get_content_maintype() == 'text':
+        return f'({fields} {payload.count(chr(10))} NIL {disposition} NIL NIL)'
+    return f'({fields} NIL {disposition} NIL NIL)'
+
+def tokenize(arguments: str) -> list:
+    return TOKEN_PATTERN.findall(arguments)
+
+def unquote(argument: str) -> str:
+    if argument.startswith('"') and argument.endswith('"'):
+        return argument[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return argument
+
+def parse_sequence_set(sequence_set: str, largest: int) -> set:
+    ''' Return the numbers in an IMAP sequence set such as 1:3,5,7:*. '''
+    numbers = set()
+    for part in sequence_set.split(','):
+        start, _, end = part.partition(':')
+        start = largest if start == '*' else int(start)
+        end = start if end == '' else (largest if end == '*' else int(end))
+        numbers.update(range(min(start, end), max(start, end) + 1))
+    return numbers
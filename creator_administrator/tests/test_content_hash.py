@@ -0,0 +1,67 @@
+import os
+
+from src.content_hash import ContentHashCache, hash_file
+from src.job_tracker import JobTracker
+from src.tracker_cache import get_tracker_cache
+
+
+def test_digest_is_cached_on_size_and_mtime(tmp_path):
+    """Test case to ensure a file is only hashed again after its size or mtime changed."""
+    (tmp_path / 'part.dxf').write_text('outline')
+    file_global_path = str(tmp_path / 'part.dxf')
+    cache_file_path = str(tmp_path / 'job_log_content_hashes.json')
+
+    cache = ContentHashCache(cache_file_path)
+    assert cache.getDigest(file_global_path) == hash_file(file_global_path)
+    cache.save()
+
+    # a new cache object reads the persisted digests
+    cache = ContentHashCache(cache_file_path)
+    assert cache.getDigests([file_global_path, str(tmp_path / 'missing.dxf')]) == {file_global_path: hash_file(file_global_path)}
+    assert cache.n_hashed == 0
+
+    (tmp_path / 'part.dxf').write_text('another outline')
+    assert cache.getDigest(file_global_path) == hash_file(file_global_path)
+    assert cache.n_hashed == 1
+
+def test_renamed_and_moved_files_keep_their_record(tmp_path):
+    """Test case to ensure renamed and moved make files are updated instead of removed."""
+    jobs_folder = tmp_path / 'jobs'
+    for job_name in ('a', 'b'):
+        (jobs_folder / job_name).mkdir(parents=True)
+    (jobs_folder / 'a' / 'part.dxf').write_text('part outline')
+    (jobs_folder / 'a' / 'plate.dxf').write_text('plate outline')
+
+    def file_dict(job_name, file_name, material):
+        return {'file_name': file_name, 'file_global_path': str(jobs_folder / job_name / file_name),
+                'material': material, 'thickness': '3', 'amount': '1', 'done': False}
+
+    tracker_dict = {'a': {'job_name': 'a', 'dynamic_job_name': 'a', 'status': 'WACHTRIJ',
+                          'job_folder_global_path': str(jobs_folder / 'a'),
+                          'make_files': {'a_part.dxf': file_dict('a', 'part.dxf', 'MDF'),
+                                         'a_plate.dxf': file_dict('a', 'plate.dxf', 'Plexiglas')}},
+                    'b': {'job_name': 'b', 'dynamic_job_name': 'b', 'status': 'WACHTRIJ',
+                          'job_folder_global_path': str(jobs_folder / 'b'), 'make_files': {}}}
+
+    gv = {'TRACKER_FILE_PATH': str(tmp_path / 'job_log.json'), 'TRACKER_BACKEND': 'json',
+          'JOBS_DIR_HOME': str(jobs_folder), 'ACCEPTED_EXTENSIONS': ('.dxf',)}
+    cache = get_tracker_cache(gv)
+    cache.storage.create()
+    cache.storage.dump(tracker_dict)
+    job_tracker = JobTracker(None, gv)
+
+    job_tracker.hashMakeFiles()
+    assert job_tracker.getJobDict('a')['make_files']['a_part.dxf']['content_hash'] == \
+        hash_file(str(jobs_folder / 'a' / 'part.dxf'))
+
+    os.rename(jobs_folder / 'a' / 'part.dxf', jobs_folder / 'a' / 'MDF_part.dxf')
+    os.rename(jobs_folder / 'a' / 'plate.dxf', jobs_folder / 'b' / 'plate.dxf')
+
+    with job_tracker.directory_snapshot.check():
+        job_tracker.moveRenamedFilesInTrackerFile()
+        job_tracker.deleteNonExitentFilesFromTrackerFile()
+
+    assert list(job_tracker.getJobDict('a')['make_files']) == ['a_MDF_part.dxf']
+    assert job_tracker.getJobDict('a')['make_files']['a_MDF_part.dxf']['material'] == 'MDF'
+    assert job_tracker.getJobDict('b')['make_files']['b_plate.dxf']['file_global_path'] == str(jobs_folder / 'b' / 'plate.dxf')
+    assert job_tracker.getJobDict('b')['make_files']['b_plate.dxf']['material'] == 'Plexiglas'
@@ -0,0 +1,22 @@
+from src.fs_scanner import scan_directories, map_in_threads
+
+
+def test_scan_directories(tmp_path):
+    """Test case to ensure folders are scanned up to the depth and files and folders are told apart."""
+    (tmp_path / 'project' / 'a' / 'nested').mkdir(parents=True)
+    (tmp_path / 'project' / 'a' / 'part.dxf').write_text('')
+    (tmp_path / 'project' / 'b').mkdir()
+    (tmp_path / 'project' / 'readme.txt').write_text('')
+
+    model = scan_directories([str(tmp_path / 'project'), str(tmp_path / 'missing')], depth=1, max_workers=2)
+
+    assert model.listFolders(str(tmp_path / 'project')) == ['a', 'b']
+    assert model.listFiles(str(tmp_path / 'project')) == ['readme.txt']
+    assert model.listEntries(str(tmp_path / 'project' / 'a')) == [('nested', True), ('part.dxf', False)]
+    assert model.listDirectory(str(tmp_path / 'project' / 'b')) == []
+    assert model.listDirectory(str(tmp_path / 'missing')) is None
+    assert str(tmp_path / 'project' / 'a' / 'nested') not in model.listings
+
+def test_map_in_threads_keeps_order():
+    """Test case to ensure results are returned in the order of the items."""
+    assert map_in_threads(lambda number: number * 2, range(50), max_workers=4) == [number * 2 for number in range(50)]
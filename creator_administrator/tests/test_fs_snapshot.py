@@ -0,0 +1,142 @@
+import os
+import time
+
+from src.fs_snapshot import DirectorySnapshot
+from src.job_tracker import JobTracker
+from src.tracker_cache import get_tracker_cache
+
+
+def make_old(directory_path):
+    """Move the mtime of a directory to the past, beyond the mtime resolution."""
+    old_time = time.time() - 60
+    os.utime(directory_path, (old_time, old_time))
+
+def test_unchanged_directory_is_not_listed_again(tmp_path):
+    """Test case to ensure only directories with a changed mtime are listed in the next check."""
+    jobs_folder = tmp_path / 'jobs'
+    for job_name in ('a', 'b'):
+        (jobs_folder / job_name).mkdir(parents=True)
+        (jobs_folder / job_name / 'part.dxf').write_text('')
+        make_old(jobs_folder / job_name)
+    make_old(jobs_folder)
+
+    snapshot_file_path = str(tmp_path / 'job_log_fs_snapshot.json')
+    with DirectorySnapshot(snapshot_file_path).check() as snapshot:
+        assert snapshot.listDirectory(str(jobs_folder)) == ['a', 'b']
+        assert snapshot.exists(str(jobs_folder / 'a' / 'part.dxf'))
+        assert snapshot.exists(str(jobs_folder / 'b' / 'part.dxf'))
+        assert snapshot.n_listed == 3
+
+    (jobs_folder / 'b' / 'plate.dxf').write_text('')
+
+    # a new snapshot object reads the persisted snapshot
+    with DirectorySnapshot(snapshot_file_path).check() as snapshot:
+        assert snapshot.exists(str(jobs_folder / 'a' / 'part.dxf'))
+        assert snapshot.exists(str(jobs_folder / 'b' / 'plate.dxf'))
+        assert not snapshot.exists(str(jobs_folder / 'a' / 'plate.dxf'))
+        assert (snapshot.n_listed, snapshot.n_reused) == (1, 1)
+
+    with DirectorySnapshot(snapshot_file_path).check(full_rescan=True) as snapshot:
+        snapshot.listDirectory(str(jobs_folder))
+        assert (snapshot.n_listed, snapshot.n_reused) == (1, 0)
+
+def test_recent_change_is_listed_again(tmp_path):
+    """Test case to ensure a listing made right after a change is not trusted."""
+    (tmp_path / 'job').mkdir()
+
+    snapshot = DirectorySnapshot(str(tmp_path / 'job_log_fs_snapshot.json'))
+    for _ in range(2):
+        with snapshot.check():
+            assert snapshot.listDirectory(str(tmp_path / 'job')) == []
+            assert snapshot.n_listed == 1
+
+def test_missing_directory(tmp_path):
+    """Test case to ensure paths in a missing directory do not exist."""
+    with DirectorySnapshot(str(tmp_path / 'job_log_fs_snapshot.json')).check() as snapshot:
+        assert snapshot.listDirectory(str(tmp_path / 'missing')) is None
+        assert not snapshot.exists(str(tmp_path / 'missing' / 'part.dxf'))
+
+def test_health_check_removes_missing_jobs_and_files(tmp_path):
+    """Test case to ensure jobs and make files missing on the file system are removed from the tracker."""
+    jobs_folder = tmp_path / 'jobs'
+    (jobs_folder / 'a').mkdir(parents=True)
+    (jobs_folder / 'a' / 'part.dxf').write_text('')
+
+    def job_dict(job_name):
+        return {'job_name': job_name, 'dynamic_job_name': job_name, 'status': 'WACHTRIJ',
+                'job_folder_global_path': str(jobs_folder / job_name),
+                'make_files': {file_name: {'file_global_path': str(jobs_folder / job_name / file_name), 'done': False}
+                               for file_name in ('part.dxf', 'plate.dxf')}}
+
+    gv = {'TRACKER_FILE_PATH': str(tmp_path / 'job_log.json'), 'TRACKER_BACKEND': 'json', 'JOBS_DIR_HOME': str(jobs_folder)}
+    cache = get_tracker_cache(gv)
+    cache.storage.create()
+    cache.storage.dump({'a': job_dict('a'), 'b': job_dict('b')})
+    job_tracker = JobTracker(None, gv)
+
+    with job_tracker.directory_snapshot.check() as snapshot:
+        job_tracker.scanJobFolders()
+        job_tracker.deleteNonExitentJobsFromTrackerFile()
+        job_tracker.deleteNonExitentFilesFromTrackerFile()
+        assert snapshot.n_listed == 2
+
+    assert list(job_tracker.getJobDict('a')['make_files']) == ['part.dxf']
+    assert job_tracker.getJobDict('b') is None
+
+def test_prefetch_in_parallel(tmp_path):
+    """Test case to ensure prefetched folders are answered in the check without inspecting them again."""
+    for job_number in range(20):
+        (tmp_path / f'job_{job_number}').mkdir()
+        (tmp_path / f'job_{job_number}' / 'part.dxf').write_text('')
+
+    with DirectorySnapshot(str(tmp_path / 'job_log_fs_snapshot.json')).check() as snapshot:
+        snapshot.prefetch([str(tmp_path / f'job_{job_number}') for job_number in range(20)] + [str(tmp_path / 'missing')],
+                          max_workers=4)
+        assert snapshot.n_listed == 20
+
+        (tmp_path / 'job_3' / 'part.dxf').unlink()
+        assert snapshot.exists(str(tmp_path / 'job_3' / 'part.dxf'))
+        assert not snapshot.exists(str(tmp_path / 'missing' / 'part.dxf'))
+        assert snapshot.n_listed == 20
+
+def test_check_without_prune_keeps_other_directories(tmp_path):
+    """Test case to ensure a check of some directories keeps the snapshot of the others."""
+    for job_name in ('a', 'b'):
+        (tmp_path / job_name).mkdir()
+        make_old(tmp_path / job_name)
+
+    snapshot_file_path = str(tmp_path / 'job_log_fs_snapshot.json')
+    with DirectorySnapshot(snapshot_file_path).check() as snapshot:
+        snapshot.prefetch([str(tmp_path / 'a'), str(tmp_path / 'b')])
+
+    with DirectorySnapshot(snapshot_file_path).check(prune=False) as snapshot:
+        snapshot.listDirectory(str(tmp_path / 'a'))
+
+    with DirectorySnapshot(snapshot_file_path).check() as snapshot:
+        snapshot.listDirectory(str(tmp_path / 'b'))
+        assert (snapshot.n_listed, snapshot.n_reused) == (0, 1)
+
+def test_reconcile_only_checks_changed_folders(tmp_path):
+    """Test case to ensure only the jobs in the changed folders are synchronized."""
+    jobs_folder = tmp_path / 'jobs'
+    for job_name in ('a', 'b'):
+        (jobs_folder / job_name).mkdir(parents=True)
+        (jobs_folder / job_name / 'part.dxf').write_text('')
+
+    def job_dict(job_name):
+        return {'job_name': job_name, 'dynamic_job_name': job_name, 'status': 'WACHTRIJ',
+                'job_folder_global_path': str(jobs_folder / job_name),
+                'make_files': {file_name: {'file_global_path': str(jobs_folder / job_name / file_name), 'done': False}
+                               for file_name in ('part.dxf', 'plate.dxf')}}
+
+    gv = {'TRACKER_FILE_PATH': str(tmp_path / 'job_log.json'), 'TRACKER_BACKEND': 'json',
+          'JOBS_DIR_HOME': str(jobs_folder), 'ACCEPTED_EXTENSIONS': ('.dxf',)}
+    cache = get_tracker_cache(gv)
+    cache.storage.create()
+    cache.storage.dump({'a': job_dict('a'), 'b': job_dict('b')})
+    job_tracker = JobTracker(None, gv)
+
+    job_tracker.reconcileChangedFolders([str(jobs_folder / 'a')], create_jobs_from_file_system_dialog=None)
+
+    assert list(job_tracker.getJobDict('a')['make_files']) == ['part.dxf']
+    assert list(job_tracker.getJobDict('b')['make_files']) == ['part.dxf', 'plate.dxf']
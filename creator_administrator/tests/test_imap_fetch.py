@@ -0,0 +1,47 @@
+from src.imap_fetch import parse_fetch_response, get_attachments, get_header_fields, to_sequence_set
+
+
+def test_parse_fetch_response():
+    """Test case to ensure fetched items are parsed per mail, literals included."""
+    response = [b'1 (UID 7 FLAGS (\\Seen) BODYSTRUCTURE ("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 5 1 NIL NIL NIL NIL))',
+                (b'2 (UID 9 RFC822 {5}', b'hello'),
+                b')']
+
+    fetched_mails = parse_fetch_response(response)
+
+    assert [fetched_mail['SEQ'] for fetched_mail in fetched_mails] == [1, 2]
+    assert fetched_mails[0]['UID'] == 7 and fetched_mails[0]['FLAGS'] == ['\\Seen']
+    assert fetched_mails[0]['BODYSTRUCTURE'][:2] == ['TEXT', 'PLAIN']
+    assert fetched_mails[1] == {'SEQ': 2, 'UID': 9, 'RFC822': b'hello'}
+
+def test_parse_header_fields():
+    """Test case to ensure a section with parentheses is one fetched item."""
+    response = [(b'4 (UID 12 BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {49}',
+                 b'From: Maker <maker@example.com>\r\nSubject: job\r\n\r\n'),
+                b' FLAGS (\\Seen))']
+
+    fetched_mail = parse_fetch_response(response)[0]
+
+    assert fetched_mail['UID'] == 12 and fetched_mail['FLAGS'] == ['\\Seen']
+    assert (get_header_fields(fetched_mail)['From'], get_header_fields(fetched_mail)['Subject']) == \
+        ('Maker <maker@example.com>', 'job')
+
+def test_attachments_from_bodystructure():
+    """Test case to ensure attachment names are found in nested parts and decoded."""
+    response = [(b'1 (UID 3 BODYSTRUCTURE (("TEXT" "PLAIN" NIL NIL NIL "7BIT" 5 1 NIL NIL NIL NIL)'
+                 b'("APPLICATION" "DXF" ("NAME" "plate.dxf") NIL NIL "BASE64" 120 NIL ("ATTACHMENT" ("FILENAME" {12}',
+                 b'plaat"1".dxf'),
+                b')) NIL NIL)'
+                b'("IMAGE" "JPEG" ("NAME" "=?utf-8?q?f=C3=B6to.jpg?=") NIL NIL "BASE64" 900 NIL ("INLINE" NIL) NIL NIL)'
+                b'("IMAGE" "PNG" NIL NIL NIL "BASE64" 50 NIL NIL NIL NIL)'
+                b'("MESSAGE" "RFC822" NIL NIL NIL "7BIT" 300 NIL ("APPLICATION" "OCTET-STREAM" NIL NIL NIL "BASE64" 40 NIL'
+                b' ("ATTACHMENT" ("FILENAME*0*" "utf-8\'\'p%C3%A4" "FILENAME*1" "rt.svg")) NIL NIL) 12 NIL ("ATTACHMENT" NIL) NIL NIL)'
+                b' "MIXED" ("BOUNDARY" "b") NIL NIL NIL))']
+
+    bodystructure = parse_fetch_response(response)[0]['BODYSTRUCTURE']
+
+    assert get_attachments(bodystructure) == ['plaat"1".dxf', 'föto.jpg', 'pärt.svg']
+
+def test_sequence_set():
+    """Test case to ensure consecutive uids are joined into ranges."""
+    assert to_sequence_set([b'7', b'1', b'2', b'3', b'9', b'10']) == '1:3,7,9:10'
@@ -0,0 +1,113 @@
+import sys
+import imaplib
+from email.message import EmailMessage
+
+import pytest
+
+from src.imap_pool import ImapSessionPool
+from src.mail_manager import MailManager
+from tests.imap_stand_in import ImapStandInServer
+
+
+def create_mail(file_name: str, content=b'outline') -> bytes:
+    mail = EmailMessage()
+    mail['From'] = 'Maker <maker@example.com>'
+    mail['To'] = 'user@example.com'
+    mail['Subject'] = 'job'
+    mail.set_content('please make this')
+    mail.add_attachment(content, maintype='application', subtype='octet-stream', filename=file_name)
+    return mail.as_bytes()
+
+@pytest.fixture
+def server():
+    stand_in_server = ImapStandInServer().start()
+    yield stand_in_server
+    stand_in_server.stop()
+
+def connect_to(server):
+    def connect():
+        imap_mail = imaplib.IMAP4('127.0.0.1', server.port)
+        imap_mail.login(server.user, server.password)
+        imap_mail.select('INBOX')
+        if not any('Verwerkt' in mailbox.decode() for mailbox in imap_mail.list()[1]):
+            imap_mail.create('Verwerkt')
+        return imap_mail
+    return connect
+
+def test_session_is_reused(server):
+    """Test case to ensure many operations share one logged in session."""
+    imap_pool = ImapSessionPool(connect_to(server))
+
+    for _ in range(30):
+        assert imap_pool.run(lambda imap_mail: imap_mail.search(None, 'ALL')[0]) == 'OK'
+
+    assert server.n_logins == 1
+    imap_pool.closeAll()
+
+def test_reconnect_after_dropped_connection(server):
+    """Test case to ensure a dropped session is replaced, with and without the NOOP health check."""
+    imap_pool = ImapSessionPool(connect_to(server), noop_after_seconds=0)
+    imap_pool.run(lambda imap_mail: imap_mail.noop())
+
+    server.dropConnections()
+    assert imap_pool.run(lambda imap_mail: imap_mail.search(None, 'ALL')[0]) == 'OK'
+    assert server.n_logins == 2
+
+    # without the health check the operation fails on the dropped session and is run again
+    imap_pool.noop_after_seconds = 3600
+    server.dropConnections()
+    assert imap_pool.run(lambda imap_mail: imap_mail.search(None, 'ALL')[0]) == 'OK'
+    assert server.n_logins == 3
+    imap_pool.closeAll()
+
+def test_operation_that_changes_the_mailbox_is_not_run_again(server):
+    """Test case to ensure an operation that is not idempotent runs on a checked session and is not retried."""
+    imap_pool = ImapSessionPool(connect_to(server))
+    imap_pool.run(lambda imap_mail: imap_mail.noop())
+
+    # the dropped session is found by the NOOP before the operation runs
+    server.dropConnections()
+    assert imap_pool.run(lambda imap_mail: imap_mail.search(None, 'ALL')[0], idempotent=False) == 'OK'
+    assert server.n_logins == 2
+
+    runs = []
+    def dropAfterCommand(imap_mail):
+        runs.append(imap_mail)
+        raise imaplib.IMAP4.abort('connection dropped after the command was sent')
+
+    with pytest.raises(imaplib.IMAP4.abort):
+        imap_pool.run(dropAfterCommand, idempotent=False)
+    assert len(runs) == 1
+    imap_pool.closeAll()
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='the mail manager uses IMAP on linux')
+def test_mail_manager_fetches_and_moves_on_one_session(server, tmp_path):
+    """Test case to ensure importing mails logs in once for fetching and moving all mails."""
+    for mail_number in range(5):
+        server.addMessage(create_mail(f'part_{mail_number}.dxf'))
+    photo_uid = server.addMessage(create_mail('photo.jpg', content=bytes(1_000_000)))
+
+    gv = {'MAIL_ADRESS': server.user, 'MAIL_PASSWORD': server.password, 'MAIL_INBOX_NAME': 'INBOX',
+          'ONLY_UNREAD_MAIL': True, 'MOVE_MAILS_TO_VERWERKT_FOLDER': True, 'ACCEPTED_EXTENSIONS': ('.dxf',),
+          'DATA_DIR_HOME': str(tmp_path)}
+    mail_manager = MailManager(gv)
+    mail_manager.imap_pool = ImapSessionPool(connect_to(server))
+
+    n_invalid_mails, valid_msgs, warnings = mail_manager.getNewValidMailsLinux([])
+    assert (n_invalid_mails, len(valid_msgs)) == (1, 5)
+    assert [mail_manager.getAttachmentFileName(mail_manager.getAttachments(msg)[0]) for msg in valid_msgs] == \
+        [f'part_{mail_number}.dxf' for mail_number in range(5)]
+
+    # the invalid mail is triaged on its BODYSTRUCTURE and never downloaded, its headers name it
+    assert photo_uid not in server.downloaded_uids
+    assert warnings == ['Invalid mails:\nMaker: job']
+    assert server.countCommands('UID FETCH') == 2
+
+    # moved by uid, expunging a moved mail does not shift the next mail
+    for msg in valid_msgs:
+        mail_manager.moveEmailToVerwerktFolder(mail_item=msg)
+
+    assert len(server.mailboxes['Verwerkt']) == 5
+    assert len(server.mailboxes['INBOX']) == 1
+    assert server.n_logins == 1
+    mail_manager.imap_pool.closeAll()
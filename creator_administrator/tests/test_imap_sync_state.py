@@ -0,0 +1,82 @@
+import sys
+import json
+
+import pytest
+
+from src.imap_pool import ImapSessionPool
+from src.imap_sync_state import ImapSyncState, VALID, INVALID
+from src.mail_manager import MailManager
+from tests.imap_stand_in import ImapStandInServer
+from tests.test_imap_pool import connect_to, create_mail
+
+
+@pytest.fixture
+def server():
+    stand_in_server = ImapStandInServer().start()
+    yield stand_in_server
+    stand_in_server.stop()
+
+def test_sync_state_is_persisted_per_uid_validity(tmp_path):
+    """Test case to ensure the sync state survives a restart and starts over on another UIDVALIDITY."""
+    state_file_path = str(tmp_path / 'imap_sync_state.json')
+    imap_sync_state = ImapSyncState(state_file_path)
+    assert imap_sync_state.startSync('user/INBOX', 7) == (0, [])
+
+    imap_sync_state.recordClassifications('user/INBOX', 7, {3: VALID, 4: INVALID, 5: VALID, 6: VALID}, 6)
+    imap_sync_state.markImported('user/INBOX', 3)
+    imap_sync_state.markImported('user/INBOX', 5)
+
+    # only the valid mail that is not imported yet is kept
+    reloaded_sync_state = ImapSyncState(state_file_path)
+    assert reloaded_sync_state.startSync('user/INBOX', 7) == (6, [6])
+    assert reloaded_sync_state.mailboxes['user/INBOX']['ledger'] == {'6': 'valid'}
+    assert reloaded_sync_state.startSync('user/INBOX', 8) == (0, [])
+
+def test_ledger_is_pruned_on_load(tmp_path):
+    """Test case to ensure invalid and imported UIDs in an older state file are pruned."""
+    state_file_path = tmp_path / 'imap_sync_state.json'
+    state_file_path.write_text(json.dumps({'user/INBOX': {'uid_validity': 7, 'last_seen_uid': 5,
+                                                          'ledger': {'3': 'imported', '4': 'invalid', '5': 'valid'}}}))
+
+    imap_sync_state = ImapSyncState(str(state_file_path))
+    assert imap_sync_state.startSync('user/INBOX', 7) == (5, [5])
+    assert imap_sync_state.mailboxes['user/INBOX']['ledger'] == {'5': 'valid'}
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='the mail manager uses IMAP on linux')
+def test_import_only_triages_new_mails(server, tmp_path):
+    """Test case to ensure a second import of all mails only triages the mails that arrived since."""
+    valid_uids = [server.addMessage(create_mail(f'part_{mail_number}.dxf')) for mail_number in range(3)]
+    server.addMessage(create_mail('photo.jpg'))
+
+    gv = {'MAIL_ADRESS': server.user, 'MAIL_PASSWORD': server.password, 'MAIL_INBOX_NAME': 'INBOX',
+          'ONLY_UNREAD_MAIL': False, 'MOVE_MAILS_TO_VERWERKT_FOLDER': True, 'ACCEPTED_EXTENSIONS': ('.dxf',),
+          'DATA_DIR_HOME': str(tmp_path)}
+    mail_manager = MailManager(gv)
+    mail_manager.imap_pool = ImapSessionPool(connect_to(server))
+
+    n_invalid_mails, valid_msgs, _ = mail_manager.getNewValidMailsLinux([])
+    assert (n_invalid_mails, len(valid_msgs)) == (1, 3)
+    assert len(server.triaged_uids) == 4
+
+    # one mail is imported, the others are skipped and offered again
+    mail_manager.moveEmailToVerwerktFolder(mail_item=valid_msgs[0])
+    new_uid = server.addMessage(create_mail('part_3.dxf'))
+    n_downloaded = len(server.downloaded_uids)
+
+    n_invalid_mails, valid_msgs, _ = mail_manager.getNewValidMailsLinux([])
+    assert (n_invalid_mails, len(valid_msgs)) == (0, 3)
+    assert [mail_manager.getAttachmentFileName(mail_manager.getAttachments(msg)[0]) for msg in valid_msgs] == \
+        ['part_1.dxf', 'part_2.dxf', 'part_3.dxf']
+    assert server.triaged_uids[4:] == [new_uid]
+    assert server.downloaded_uids[n_downloaded:] == valid_uids[1:] + [new_uid]
+
+    # nothing new, no mail is triaged
+    mail_manager.getNewValidMailsLinux([])
+    assert server.triaged_uids[4:] == [new_uid]
+
+    # uids of another UIDVALIDITY are meaningless, all mails are triaged again
+    server.uid_validity['INBOX'] += 1
+    n_invalid_mails, valid_msgs, _ = mail_manager.getNewValidMailsLinux([])
+    assert (n_invalid_mails, len(valid_msgs)) == (1, 3)
+    assert len(server.triaged_uids) == 9
+    mail_manager.imap_pool.closeAll()
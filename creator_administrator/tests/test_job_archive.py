@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from src.job_archive import JobArchive
+from src.job_tracker import JobTracker
+from src.tracker_cache import get_tracker_cache
+
+
+def test_archive_and_search(tmp_path):
+    """Test case to ensure archived jobs can be searched and the latest record wins."""
+    archive = JobArchive(str(tmp_path / 'job_log_archive.jsonl.gz'), str(tmp_path / 'job_log_archive'))
+    assert archive.loadJobs() == {}
+
+    archive.archiveJobs([{'job_name': 'plate', 'status': 'VERWERKT'},
+                         {'job_name': 'bracket', 'status': 'AFGEKEURD'}])
+    archive.archiveJobs([{'job_name': 'plate', 'status': 'AFGEKEURD'}])
+
+    assert [job_dict['job_name'] for job_dict in archive.searchJobs('PLA')] == ['plate']
+    assert archive.getJobDict('plate')['status'] == 'AFGEKEURD'
+    assert archive.getJobDict('missing') is None
+
+def test_interrupted_append(tmp_path):
+    """Test case to ensure a half written gzip member does not hide earlier jobs."""
+    archive_file_path = str(tmp_path / 'job_log_archive.jsonl.gz')
+    archive = JobArchive(archive_file_path, str(tmp_path / 'job_log_archive'))
+    archive.archiveJobs([{'job_name': 'plate'}])
+    archive.archiveJobs([{'job_name': 'bracket'}])
+
+    with open(archive_file_path, 'rb+') as archive_file:
+        archive_file.truncate(os.path.getsize(archive_file_path) - 20)
+
+    assert list(JobArchive(archive_file_path, str(tmp_path / 'job_log_archive')).loadJobs()) == ['plate']
+
+def test_zip_and_restore_job_folder(tmp_path):
+    """Test case to ensure a zipped job folder is restored with its files."""
+    job_folder = tmp_path / 'jobs' / 'plate'
+    job_folder.mkdir(parents=True)
+    (job_folder / 'plate.dxf').write_text('dxf')
+
+    archive = JobArchive(str(tmp_path / 'job_log_archive.jsonl.gz'), str(tmp_path / 'job_log_archive'))
+    archive.stageJobFolder('plate', str(job_folder))
+    assert not job_folder.exists()
+
+    assert archive.zipStagedJobFolders(['plate']) == []
+    assert os.path.exists(archive.getZipGlobalPath('plate'))
+    assert not os.path.exists(archive.getStagedFolderGlobalPath('plate'))
+
+    archive.restoreJobFolder('plate', str(job_folder))
+    assert (job_folder / 'plate.dxf').read_text() == 'dxf'
+
+def test_archived_job_names_are_not_reused(tmp_path, qapp):
+    """Test case to ensure two archived jobs that started with the same name are both restored."""
+    jobs_folder = tmp_path / 'jobs'
+    gv = {'TRACKER_FILE_PATH': str(tmp_path / 'job_log.json'), 'TRACKER_BACKEND': 'json', 'JOBS_DIR_HOME': str(jobs_folder),
+          'ARCHIVE_FINISHED_JOBS_AFTER_DAYS': 0, 'DISPLAY_TEMP_MESSAGES': False}
+    get_tracker_cache(gv).storage.create()
+    job_tracker = JobTracker(None, gv)
+
+    def add_finished_job(job_name, text):
+        (jobs_folder / job_name).mkdir(parents=True)
+        (jobs_folder / job_name / 'plate.dxf').write_text(text)
+
+        def addJob(tracker_dict):
+            tracker_dict[job_name] = {'job_name': job_name, 'dynamic_job_name': job_name, 'status': 'VERWERKT',
+                                      'created_on_timestamp': 0, 'job_folder_global_path': str(jobs_folder / job_name),
+                                      'make_files': {}}
+        job_tracker.applyMutation(addJob, changed_job_names=[job_name])
+        job_tracker.archiveFinishedJobs()
+
+    add_finished_job(job_tracker.makeJobNameUnique('plate'), 'first')
+    second_job_name = job_tracker.makeJobNameUnique('plate')
+    assert second_job_name == 'plate_(1)'
+    add_finished_job(second_job_name, 'second')
+
+    assert job_tracker.isJobArchived('plate') and job_tracker.isJobArchived('plate_(1)')
+    job_tracker.restoreArchivedJob('plate')
+    job_tracker.restoreArchivedJob('plate_(1)')
+
+    assert (jobs_folder / 'plate' / 'plate.dxf').read_text() == 'first'
+    assert (jobs_folder / 'plate_(1)' / 'plate.dxf').read_text() == 'second'
+    assert job_tracker.getJobDict('plate')['job_folder_global_path'] == str(jobs_folder / 'plate')
+    assert job_tracker.makeJobNameUnique('plate') == 'plate_(2)'
+
+def test_rollback_keeps_job_folder(tmp_path, qapp):
+    """Test case to ensure the folder of an archived job is only moved once the transaction commits."""
+    jobs_folder = tmp_path / 'jobs'
+    (jobs_folder / 'plate').mkdir(parents=True)
+    gv = {'TRACKER_FILE_PATH': str(tmp_path / 'job_log.json'), 'TRACKER_BACKEND': 'json', 'JOBS_DIR_HOME': str(jobs_folder),
+          'ARCHIVE_FINISHED_JOBS_AFTER_DAYS': 0, 'DISPLAY_TEMP_MESSAGES': False}
+    get_tracker_cache(gv).storage.dump({'plate': {'job_name': 'plate', 'dynamic_job_name': 'plate', 'status': 'VERWERKT',
+                                                  'created_on_timestamp': 0, 'job_folder_global_path': str(jobs_folder / 'plate'),
+                                                  'make_files': {}}})
+    job_tracker = JobTracker(None, gv)
+
+    with pytest.raises(RuntimeError):
+        with job_tracker.transaction():
+            job_tracker.archiveFinishedJobs()
+            assert (jobs_folder / 'plate').exists()
+            raise RuntimeError('check failed')
+
+    assert (jobs_folder / 'plate').exists()
+    assert job_tracker.getJobDict('plate')['status'] == 'VERWERKT'
+
+    with job_tracker.transaction():
+        job_tracker.archiveFinishedJobs()
+
+    assert not (jobs_folder / 'plate').exists()
+    assert job_tracker.isJobArchived('plate')
@@ -0,0 +1,73 @@
+import os
+import sys
+import email
+from email.message import EmailMessage
+
+import pytest
+
+from src.mail_item import MailItem
+from src.mail_manager import MailManager
+from src.mail_spool import SpooledMail
+
+
+def create_job_request() -> bytes:
+    mail = EmailMessage()
+    mail['From'] = 'Maker Name <maker@example.com>'
+    mail['Subject'] = 'job'
+    mail['Date'] = 'Mon, 12 Oct 2026 10:00:00 +0200'
+    mail.set_content('please make this')
+    mail.add_attachment(b'outline', maintype='application', subtype='octet-stream', filename='plate.dxf')
+    mail.add_attachment(b'photo', maintype='image', subtype='jpeg', filename='photo.jpg')
+    return mail.as_bytes()
+
+def test_mail_item_forms_agree(tmp_path):
+    """Test case to ensure the IMAP bytes, parsed, mail.eml and spooled forms of a mail give the same fields."""
+    mail_bytes = create_job_request()
+    (tmp_path / 'mail.eml').write_bytes(mail_bytes)
+
+    mail_items = [MailItem([(b'3 (UID 12 RFC822 {0}', mail_bytes), b')']),
+                  MailItem(email.message_from_bytes(mail_bytes)),
+                  MailItem(str(tmp_path / 'mail.eml')),
+                  MailItem(SpooledMail(12, str(tmp_path / 'mail.eml')))]
+
+    for mail_item in mail_items:
+        assert (mail_item.email_address, mail_item.sender_name, mail_item.subject) == ('maker@example.com', 'Maker Name', 'job')
+        assert mail_item.receive_time == 'Mon, 12 Oct 2026 10:00:00 +0200'
+        assert mail_item.body == 'please make this\n'
+        assert [attachment.get_filename() for attachment in mail_item.attachments] == ['plate.dxf', 'photo.jpg']
+
+    assert [mail_item.uid for mail_item in mail_items] == [12, None, None, 12]
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='the mail manager parses .eml mails on linux')
+def test_mail_is_parsed_once(monkeypatch):
+    """Test case to ensure the mail manager accessors parse a MailItem once."""
+    n_parses = []
+    message_from_bytes = email.message_from_bytes
+    monkeypatch.setattr(email, 'message_from_bytes', lambda data: n_parses.append(1) or message_from_bytes(data))
+
+    mail_manager = MailManager({'MAIL_ADRESS': 'user@example.com', 'MAIL_INBOX_NAME': 'INBOX', 'ACCEPTED_EXTENSIONS': ('.dxf',)})
+    mail_item = MailItem([(b'1 (UID 1 RFC822 {0}', create_job_request()), b')'])
+
+    assert mail_manager.isMailAValidJobRequest(mail_item)
+    assert mail_manager.getSenderName(mail_item) == 'Maker Name'
+    assert mail_manager.getEmailAddress(mail_item) == 'maker@example.com'
+    assert mail_manager.getMailSubject(mail_item) == 'job'
+    assert mail_manager.getMailBody(mail_item) == 'please make this\n'
+    assert mail_manager.getAttachments(mail_item) is mail_manager.getAttachments(mail_item)
+    assert len(n_parses) == 1
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='the mail manager parses .eml mails on linux')
+def test_job_folder_mail_is_parsed_once(tmp_path):
+    """Test case to ensure the mail of a job folder is parsed once, and again after the mail file changed."""
+    (tmp_path / 'mail.eml').write_bytes(create_job_request())
+    mail_manager = MailManager({'MAIL_ADRESS': 'user@example.com', 'MAIL_INBOX_NAME': 'INBOX', 'ACCEPTED_EXTENSIONS': ('.dxf',)})
+
+    mail_item = mail_manager.toMailItem(str(tmp_path))
+    assert mail_manager.getSenderName(str(tmp_path)) == 'Maker Name'
+    assert mail_manager.toMailItem(str(tmp_path)) is mail_item
+    assert MailManager(mail_manager.gv).toMailItem(str(tmp_path / 'mail.eml')) is mail_item
+
+    (tmp_path / 'mail.eml').write_bytes(create_job_request().replace(b'Maker Name', b'Other Name'))
+    os.utime(tmp_path / 'mail.eml', ns=(0, 0))
+    assert mail_manager.toMailItem(str(tmp_path)) is not mail_item
+    assert mail_manager.getSenderName(str(tmp_path)) == 'Other Name'
@@ -0,0 +1,93 @@
+import os
+import sys
+import email
+from email.message import EmailMessage
+
+import pytest
+
+from src.imap_pool import ImapSessionPool
+from src.mail_manager import MailManager
+from src.mail_item import MailItem
+from src.mail_spool import SpooledMail
+from tests.imap_stand_in import ImapStandInServer
+from tests.test_imap_pool import connect_to
+
+
+def create_job_request() -> EmailMessage:
+    mail = EmailMessage()
+    mail['From'] = 'Maker <maker@example.com>'
+    mail['Subject'] = 'job'
+    mail.set_content('please make this')
+    mail.add_alternative('<p>please make this</p>', subtype='html')
+    mail.add_attachment(os.urandom(300_000), maintype='application', subtype='octet-stream', filename='frame.stl')
+    mail.add_attachment('maße =\n' * 50, subtype='plain', filename='notes.txt', cte='quoted-printable')
+
+    forwarded_mail = EmailMessage()
+    forwarded_mail['Subject'] = 'forwarded'
+    forwarded_mail.set_content('see attachment')
+    forwarded_mail.add_attachment(b'outline' * 100, maintype='application', subtype='dxf', filename='plaat.dxf')
+    mail.add_attachment(forwarded_mail)
+    return mail
+
+@pytest.fixture
+def server():
+    stand_in_server = ImapStandInServer().start()
+    yield stand_in_server
+    stand_in_server.stop()
+
+@pytest.mark.parametrize('line_break', [b'\n', b'\r\n'])
+def test_spooled_parts_match_the_email_parser(tmp_path, line_break):
+    """Test case to ensure the parts found in a spooled mail and their decoded bodies match the email package."""
+    mail_bytes = create_job_request().as_bytes().replace(b'\n', line_break)
+    (tmp_path / 'mail.eml').write_bytes(mail_bytes)
+    spooled_mail = SpooledMail(1, str(tmp_path / 'mail.eml'))
+
+    parsed_parts = [part for part in email.message_from_bytes(mail_bytes).walk() if part.get_content_maintype() != 'multipart']
+    assert [part.get_content_type() for part in spooled_mail.parts] == [part.get_content_type() for part in parsed_parts]
+    assert [part.get_filename() for part in spooled_mail.getAttachments()] == ['frame.stl', 'notes.txt', 'plaat.dxf']
+
+    for spooled_part, parsed_part in zip(spooled_mail.parts, parsed_parts):
+        if parsed_part.get_content_type() != 'message/rfc822':
+            assert spooled_part.getPayload() == parsed_part.get_payload(decode=True)
+
+@pytest.mark.skipif(sys.platform != 'linux', reason='the mail manager uses IMAP on linux')
+def test_mails_are_fetched_to_the_spool_folder_in_chunks(server, tmp_path, monkeypatch):
+    """Test case to ensure large mails are fetched in chunks and their attachments are decoded from the spool folder."""
+    monkeypatch.setattr('src.mail_manager.FETCH_CHUNK_SIZE', 64 * 1024)
+    job_request = create_job_request()
+    server.addMessage(job_request.as_bytes())
+    server.addMessage(create_job_request().as_bytes())
+
+    gv = {'MAIL_ADRESS': server.user, 'MAIL_PASSWORD': server.password, 'MAIL_INBOX_NAME': 'INBOX',
+          'ONLY_UNREAD_MAIL': True, 'MOVE_MAILS_TO_VERWERKT_FOLDER': True, 'ACCEPTED_EXTENSIONS': ('.stl',),
+          'DATA_DIR_HOME': str(tmp_path)}
+    mail_manager = MailManager(gv)
+    mail_manager.imap_pool = ImapSessionPool(connect_to(server))
+
+    _, valid_msgs, _ = mail_manager.getNewValidMailsLinux([])
+    assert all(isinstance(msg, MailItem) and isinstance(msg.source, SpooledMail) for msg in valid_msgs) and len(valid_msgs) == 2
+
+    # both mails are fetched together, one chunk of 64 KiB per FETCH
+    mail_size = len(server.mailboxes['INBOX'][0].data)
+    assert server.countCommands('UID FETCH') == 1 + mail_size // (64 * 1024) + 1
+    assert all('\\Seen' in message.flags for message in server.mailboxes['INBOX'])
+
+    job_folder_global_path = tmp_path / 'job'
+    job_folder_global_path.mkdir()
+    mail_manager.saveMail(valid_msgs[0], str(job_folder_global_path))
+    assert (job_folder_global_path / 'mail.eml').read_bytes() == server.mailboxes['INBOX'][0].data
+
+    attachment = mail_manager.getAttachments(valid_msgs[0])[0]
+    mail_manager.saveAttachment(attachment, str(job_folder_global_path / mail_manager.getAttachmentFileName(attachment)))
+    assert (job_folder_global_path / 'frame.stl').read_bytes() == \
+        next(job_request.iter_attachments()).get_payload(decode=True)
+
+    assert mail_manager.getSenderName(valid_msgs[0]) == 'Maker'
+    # the same body as for the mail held in memory
+    mail_item = [(b'1 (UID 1 RFC822 {0}', server.mailboxes['INBOX'][0].data), b')']
+    assert mail_manager.getMailBody(valid_msgs[0]) == mail_manager.getMailBody(mail_item)
+
+    # moved by the uid of the spooled mail
+    mail_manager.moveEmailToVerwerktFolder(mail_item=valid_msgs[0])
+    assert len(server.mailboxes['Verwerkt']) == 1
+    mail_manager.imap_pool.closeAll()
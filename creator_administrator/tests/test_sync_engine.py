@@ -0,0 +1,77 @@
+import os
+
+from src.sync_engine import compute_sync_plan, find_new_files, find_missing_files
+
+
+def job_dict(job_name, file_names):
+    return {'job_name': job_name,
+            'job_folder_global_path': f'/jobs/{job_name}',
+            'make_files': {file_name: {'file_global_path': f'/jobs/{job_name}/{file_name}', 'done': False}
+                           for file_name in file_names}}
+
+def create_file_system(directories):
+    """Return get_entries over a dict of directory path -> entry names."""
+    directories = {directory_path: set(entries) for directory_path, entries in directories.items()}
+    def get_entries(directory_path):
+        return directories.get(os.path.normpath(directory_path))
+    return get_entries
+
+def test_sync_plan():
+    """Test case to ensure missing jobs, orphan folders, new files and missing files are found."""
+    tracker_dict = {'a': job_dict('a', ['part.dxf', 'plate.dxf']),
+                    'b': job_dict('b', ['part.dxf']),
+                    'gone': job_dict('gone', ['part.dxf'])}
+    get_entries = create_file_system({'/jobs': ['a', 'b', 'new_job'],
+                                      '/jobs/a': ['part.dxf', 'notes.txt'],
+                                      '/jobs/b': ['part.dxf', 'extra.DXF', 'mail.eml'],
+                                      '/jobs/new_job': ['part.dxf']})
+
+    sync_plan = compute_sync_plan(tracker_dict, '/jobs', get_entries, ('.dxf',))
+
+    assert sync_plan.missing_job_names == ['gone']
+    assert sync_plan.orphan_folder_paths == ['/jobs/new_job']
+    assert sync_plan.new_files == {'b': ['/jobs/b/extra.DXF']}
+    assert sync_plan.missing_files == {'a': ['plate.dxf'], 'gone': ['part.dxf']}
+    assert not sync_plan.isEmpty()
+
+def test_in_sync():
+    """Test case to ensure a tracker that matches the file system gives an empty plan."""
+    tracker_dict = {'a': job_dict('a', ['part.dxf'])}
+    get_entries = create_file_system({'/jobs': ['a'], '/jobs/a': ['part.dxf']})
+
+    assert compute_sync_plan(tracker_dict, '/jobs', get_entries, ('.dxf',)).isEmpty()
+
+def test_scoped_to_jobs():
+    """Test case to ensure only the requested jobs and folders are compared."""
+    tracker_dict = {'a': job_dict('a', ['part.dxf']), 'b': job_dict('b', ['part.dxf'])}
+    get_entries = create_file_system({'/jobs': ['a', 'b'], '/jobs/a': ['new.dxf'], '/jobs/b': ['new.dxf']})
+    exists = lambda global_path: False
+
+    assert find_missing_files(tracker_dict, exists, job_names=['b']) == {'b': ['part.dxf']}
+    assert find_new_files(tracker_dict, ['/jobs/a', '/jobs/unknown'], get_entries, ('.dxf',)) == \
+        {'a': ['/jobs/a/new.dxf']}
+
+def test_many_folders_and_jobs():
+    """Test case to ensure comparing many folders with many jobs is not quadratic."""
+    n_jobs = 20000
+    tracker_dict = {f'job_{job_number}': job_dict(f'job_{job_number}', ['part.dxf']) for job_number in range(n_jobs)}
+    directories = {os.path.normpath(f'/jobs/job_{job_number}'): ['part.dxf'] for job_number in range(n_jobs)}
+    directories['/jobs'] = [f'job_{job_number}' for job_number in range(n_jobs + 10)]
+
+    sync_plan = compute_sync_plan(tracker_dict, '/jobs', create_file_system(directories), ('.dxf',))
+
+    assert len(sync_plan.orphan_folder_paths) == 10
+    assert sync_plan.new_files == {} and sync_plan.missing_files == {}
+
+def test_moved_files_are_matched_by_content():
+    """Test case to ensure a missing make file with the content of a new file is a moved file."""
+    tracker_dict = {'a': job_dict('a', ['part.dxf', 'plate.dxf']), 'b': job_dict('b', [])}
+    tracker_dict['a']['make_files']['part.dxf']['content_hash'] = 'part digest'
+    get_entries = create_file_system({'/jobs': ['a', 'b'], '/jobs/a': ['renamed.dxf'], '/jobs/b': ['other.dxf']})
+    digests = {'/jobs/a/renamed.dxf': 'part digest', '/jobs/b/other.dxf': 'other digest'}
+
+    sync_plan = compute_sync_plan(tracker_dict, '/jobs', get_entries, ('.dxf',), get_digest=digests.get)
+
+    assert sync_plan.moved_files == [('a', 'part.dxf', 'a', '/jobs/a/renamed.dxf')]
+    assert sync_plan.missing_files == {'a': ['plate.dxf']}
+    assert sync_plan.new_files == {'b': ['/jobs/b/other.dxf']}
@@ -0,0 +1,81 @@
+import os
+import copy
+import subprocess
+import sys
+from datetime import datetime
+
+from src.tracker_backup import TrackerBackup, read_gzip_json, tracker_backup_folder_path
+from src.tracker_serializers import read_tracker_file
+
+
+def job_dict(job_name, status='WACHTRIJ'):
+    return {'job_name': job_name, 'status': status, 'make_files': {}}
+
+def make_backups(tracker_backup, n_backups):
+    """Back up a tracker that changes one job per backup, return the tracker dict at every backup."""
+    tracker_dict = {'a': job_dict('a'), 'b': job_dict('b')}
+    states = []
+    for backup_number in range(n_backups):
+        tracker_dict[f'job_{backup_number}'] = job_dict(f'job_{backup_number}')
+        if backup_number > 0:
+            tracker_dict.pop(f'job_{backup_number - 1}')
+        tracker_dict['a']['status'] = f'STATUS_{backup_number}'
+
+        states.append((tracker_backup.backup(tracker_dict), copy.deepcopy(tracker_dict)))
+    return states
+
+def test_restore_any_point(tmp_path):
+    """Test case to ensure every retained backup restores the tracker as it was."""
+    tracker_backup = TrackerBackup(str(tmp_path / 'backups'), backups_to_keep=100, full_backup_every=3)
+
+    for backup_name, tracker_dict in make_backups(tracker_backup, 7):
+        assert tracker_backup.restore(backup_name) == tracker_dict
+
+    assert [kind for _, _, kind in tracker_backup.listBackups()] == ['full', 'delta', 'delta'] * 2 + ['full']
+
+def test_delta_holds_only_changes(tmp_path):
+    """Test case to ensure a delta backup only holds the changed and removed jobs."""
+    tracker_backup = TrackerBackup(str(tmp_path / 'backups'))
+    backup_name = make_backups(tracker_backup, 2)[-1][0]
+
+    delta = read_gzip_json(tracker_backup.getBackupFilePath(backup_name))
+    assert sorted(delta['put']) == ['a', 'job_1']
+    assert delta['pop'] == ['job_0']
+
+def test_unchanged_tracker_is_not_backed_up(tmp_path):
+    """Test case to ensure no backup is made if nothing changed."""
+    tracker_backup = TrackerBackup(str(tmp_path / 'backups'))
+    tracker_backup.backup({'a': job_dict('a')})
+
+    assert tracker_backup.backup({'a': job_dict('a')}) is None
+    assert len(tracker_backup.listBackupNames()) == 1
+
+def test_retention(tmp_path):
+    """Test case to ensure old backups are removed, but not a full backup a retained delta depends on."""
+    tracker_backup = TrackerBackup(str(tmp_path / 'backups'), backups_to_keep=4, full_backup_every=3)
+    states = make_backups(tracker_backup, 8)
+
+    backup_names = tracker_backup.listBackupNames()
+    assert backup_names == [backup_name for backup_name, _ in states[3:]]
+    for backup_name, tracker_dict in states[3:]:
+        assert tracker_backup.restore(backup_name) == tracker_dict
+
+def test_find_backup_at_point_in_time(tmp_path):
+    """Test case to ensure a point in time finds the latest backup made before it."""
+    tracker_backup = TrackerBackup(str(tmp_path / 'backups'))
+    states = make_backups(tracker_backup, 3)
+
+    assert tracker_backup.findBackupName(datetime(2000, 1, 1)) is None
+    assert tracker_backup.findBackupName(datetime.now()) == states[-1][0]
+
+def test_restore_tool(tmp_path):
+    """Test case to ensure the restore tool writes the tracker as it was at a backup."""
+    tracker_file_path = str(tmp_path / 'job_log.json')
+    tracker_backup = TrackerBackup(tracker_backup_folder_path(tracker_file_path))
+    backup_name, tracker_dict = make_backups(tracker_backup, 3)[1]
+
+    output_file_path = str(tmp_path / 'restored.json')
+    subprocess.run([sys.executable, '-m', 'src.tracker_backup', tracker_file_path, 'restore', backup_name, output_file_path],
+                   check=True, capture_output=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    assert read_tracker_file(output_file_path) == tracker_dict
@@ -0,0 +1,136 @@
+import os
+import time
+
+import pytest
+
+from src.job_tracker import JobTracker
+from src.file_lock import FileLock
+from src.tracker_cache import TrackerCache, TrackerConflictError, get_tracker_cache
+from src.tracker_storage import JsonTrackerStorage
+
+
+@pytest.fixture
+def tracker_cache(tmp_path):
+    """Fixture for creating a tracker cache on an empty json tracker file."""
+    gv = {'TRACKER_FILE_PATH': str(tmp_path / 'job_log.json'), 'TRACKER_BACKEND': 'json'}
+    cache = get_tracker_cache(gv)
+    cache.storage.create()
+    yield cache
+
+def test_cache_is_shared(tracker_cache):
+    """Test case to ensure trackers on the same file share one cache."""
+    gv = {'TRACKER_FILE_PATH': tracker_cache.storage.storage_path, 'TRACKER_BACKEND': 'json'}
+    assert get_tracker_cache(gv) is tracker_cache
+
+def test_reload_on_change(tracker_cache):
+    """Test case to ensure the tracker is read again when the file changes."""
+    assert tracker_cache.load() == {}
+    JsonTrackerStorage(tracker_cache.storage.storage_path).dump({'a': {'status': 'WACHTRIJ'}})
+    assert tracker_cache.load() == {'a': {'status': 'WACHTRIJ'}}
+
+def test_transaction_writes_once(tracker_cache):
+    """Test case to ensure a transaction only writes when it commits."""
+    storage_path = tracker_cache.storage.storage_path
+
+    tracker_cache.begin()
+    tracker_dict = tracker_cache.load()
+    tracker_dict['a'] = {'status': 'WACHTRIJ'}
+    tracker_cache.dump(tracker_dict, changed_job_names=['a'])
+    tracker_dict['b'] = {'status': 'VERWERKT'}
+    tracker_cache.dump(tracker_dict, changed_job_names=['b'])
+    assert JsonTrackerStorage(storage_path).load() == {}
+
+    tracker_cache.commit()
+    assert JsonTrackerStorage(storage_path).load() == {'a': {'status': 'WACHTRIJ'}, 'b': {'status': 'VERWERKT'}}
+
+def test_transaction_rollback(tracker_cache):
+    """Test case to ensure a rolled back transaction writes nothing."""
+    tracker_cache.begin()
+    tracker_dict = tracker_cache.load()
+    tracker_dict['a'] = {'status': 'WACHTRIJ'}
+    tracker_cache.dump(tracker_dict, changed_job_names=['a'])
+    tracker_cache.rollback()
+
+    assert tracker_cache.load() == {}
+    assert JsonTrackerStorage(tracker_cache.storage.storage_path).load() == {}
+
+def test_job_dict_is_a_copy(tracker_cache):
+    """Test case to ensure changing a returned job dict does not change the tracker."""
+    gv = {'TRACKER_FILE_PATH': tracker_cache.storage.storage_path, 'TRACKER_BACKEND': 'json'}
+    tracker_cache.storage.dump({'a': {'job_name': 'a', 'status': 'WACHTRIJ', 'make_files': {}}})
+    job_tracker = JobTracker(None, gv)
+
+    job_dict = job_tracker.getJobDict('a')
+    job_dict['status'] = 'VERWERKT'
+    job_dict['make_files']['part.dxf'] = {'done': False}
+    assert job_tracker.getJobDict('a') == {'job_name': 'a', 'status': 'WACHTRIJ', 'make_files': {}}
+
+    job_tracker.updateJobKey('status', 'a', 'VERWERKT')
+    assert job_tracker.getJobDict('a')['status'] == 'VERWERKT'
+    assert JsonTrackerStorage(tracker_cache.storage.storage_path).load()['a']['status'] == 'VERWERKT'
+
+def test_full_dump_keeps_concurrent_write(tracker_cache):
+    """Test case to ensure a full dump after a write by another process keeps that write."""
+    other_process_cache = TrackerCache(JsonTrackerStorage(tracker_cache.storage.storage_path))
+
+    tracker_dict = tracker_cache.load()
+    other_tracker_dict = other_process_cache.load()
+    other_tracker_dict['b'] = {'status': 'WACHTRIJ'}
+    other_process_cache.dump(other_tracker_dict, changed_job_names=['b'])
+
+    def addJob(tracker_dict):
+        tracker_dict['a'] = {'status': 'VERWERKT'}
+
+    addJob(tracker_dict)
+    tracker_cache.dump(tracker_dict, mutation=addJob)
+    assert JsonTrackerStorage(tracker_cache.storage.storage_path).load() == \
+        {'a': {'status': 'VERWERKT'}, 'b': {'status': 'WACHTRIJ'}}
+
+def test_failed_mutation_is_not_half_applied(tracker_cache):
+    """Test case to ensure a mutation that fails after a write by another process is dropped as a whole."""
+    storage_path = tracker_cache.storage.storage_path
+    tracker_cache.storage.dump({'a': {'make_files': {'part.dxf': {'done': False}}}, 'b': {'make_files': {}}})
+    other_process_cache = TrackerCache(JsonTrackerStorage(storage_path))
+
+    tracker_dict = tracker_cache.load()
+    other_tracker_dict = other_process_cache.load()
+    other_tracker_dict.pop('b')
+    other_process_cache.dump(other_tracker_dict, removed_job_names=['b'])
+
+    def moveMakeFiles(tracker_dict):
+        make_file_dict = tracker_dict['a']['make_files'].pop('part.dxf')
+        tracker_dict['b']['make_files']['part.dxf'] = make_file_dict
+
+    moveMakeFiles(tracker_dict)
+    with pytest.raises(TrackerConflictError):
+        tracker_cache.dump(tracker_dict, changed_job_names=['a', 'b'], mutation=moveMakeFiles)
+
+    assert JsonTrackerStorage(storage_path).load() == {'a': {'make_files': {'part.dxf': {'done': False}}}}
+    assert tracker_cache.load() == {'a': {'make_files': {'part.dxf': {'done': False}}}}
+
+def test_stale_lock_is_broken(tmp_path):
+    """Test case to ensure a stale lock file is broken and a fresh one is not."""
+    lock_file_path = str(tmp_path / 'job_log.json.lock')
+    with open(lock_file_path, 'w') as lock_file:
+        lock_file.write('crashed 1')
+    os.utime(lock_file_path, (time.time() - 120, time.time() - 120))
+
+    with FileLock(lock_file_path, timeout=1):
+        assert os.path.exists(lock_file_path)
+        with pytest.raises(TimeoutError):
+            FileLock(lock_file_path, timeout=0.1).acquire()
+
+    assert os.listdir(tmp_path) == []
+
+def test_broken_lock_is_not_released(tmp_path):
+    """Test case to ensure a holder whose lock was broken does not remove the lock of the next holder."""
+    lock_file_path = str(tmp_path / 'job_log.json.lock')
+    slow_lock = FileLock(lock_file_path, timeout=1)
+    slow_lock.acquire()
+    os.utime(lock_file_path, (time.time() - 120, time.time() - 120))
+
+    with FileLock(lock_file_path, timeout=1):
+        slow_lock.release()
+        assert os.path.exists(lock_file_path)
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,64 @@
+import json
+import multiprocessing
+
+import pytest
+
+from src.job_tracker import JobTracker
+from src.tracker_storage import create_tracker_storage
+
+N_PROCESSES = 4
+N_UPDATES = 25
+
+
+def hammer_tracker(gv: dict, process_number: int):
+    """Mark this process its files of the shared job done and update the status of its own job."""
+    job_tracker = JobTracker(None, gv)
+
+    for update_number in range(N_UPDATES):
+        job_tracker.markFilesAsDone('shared', f'/jobs/shared/{process_number}_{update_number}.dxf', True)
+        job_tracker.updateJobKey('status', f'job_{process_number}', f'UPDATE_{update_number}')
+
+def create_tracker(gv: dict):
+    """Create a tracker with one job per process and a job shared by all processes."""
+    tracker_dict = {'shared': {'job_name': 'shared',
+                               'status': 'WACHTRIJ',
+                               'job_folder_global_path': '/jobs/shared',
+                               'make_files': {f'{process_number}_{update_number}.dxf':
+                                              {'file_global_path': f'/jobs/shared/{process_number}_{update_number}.dxf',
+                                               'done': False}
+                                              for process_number in range(N_PROCESSES)
+                                              for update_number in range(N_UPDATES)}}}
+    for process_number in range(N_PROCESSES):
+        tracker_dict[f'job_{process_number}'] = {'job_name': f'job_{process_number}',
+                                                 'status': 'WACHTRIJ',
+                                                 'job_folder_global_path': f'/jobs/job_{process_number}',
+                                                 'make_files': {}}
+
+    storage = create_tracker_storage(gv)
+    storage.create()
+    storage.dump(tracker_dict)
+    return storage
+
+@pytest.mark.parametrize('tracker_backend', ['json', 'sqlite', 'journal'])
+def test_no_lost_updates(tmp_path, tracker_backend):
+    """Test case to ensure concurrent writers from several processes do not lose updates."""
+    gv = {'TRACKER_FILE_PATH': str(tmp_path / 'job_log.json'), 'TRACKER_BACKEND': tracker_backend}
+    storage = create_tracker(gv)
+
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=hammer_tracker, args=(gv, process_number))
+                 for process_number in range(N_PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    tracker_dict = storage.load()
+    assert all(file_dict['done'] for file_dict in tracker_dict['shared']['make_files'].values())
+    for process_number in range(N_PROCESSES):
+        assert tracker_dict[f'job_{process_number}']['status'] == f'UPDATE_{N_UPDATES - 1}'
+
+    with open(str(tmp_path / 'job_log.json') + '.version' if tracker_backend != 'sqlite'
+              else str(tmp_path / 'job_log.sqlite') + '.version', 'r') as version_file:
+        assert json.load(version_file) == 2 * N_PROCESSES * N_UPDATES
@@ -0,0 +1,129 @@
+import pytest
+from PyQt6.QtWidgets import QWidget
+
+from src.job_tracker import JobTracker
+from src.qlist_widget import JobsOverviewQListWidget
+from src.tracker_cache import get_tracker_cache
+from src.tracker_index import TrackerIndex
+from src.tracker_events import (TrackerEvent, TrackerEventFeed, JOB_ADDED, JOB_REMOVED, JOB_RENAMED,
+                                STATUS_CHANGED, FILE_DONE_TOGGLED, JOB_FILES_CHANGED, JOB_CHANGED, TRACKER_RELOADED)
+
+
+def job_dict(job_name, status='WACHTRIJ', done=False):
+    return {'job_name': job_name,
+            'dynamic_job_name': job_name,
+            'status': status,
+            'job_folder_global_path': f'/jobs/{job_name}',
+            'make_files': {'part.dxf': {'file_global_path': f'/jobs/{job_name}/part.dxf',
+                                        'done': done}}}
+
+class EventRecorder:
+    def __init__(self):
+        self.events = []
+
+    def record(self, events):
+        self.events += events
+
+@pytest.fixture
+def job_tracker(tmp_path):
+    """Fixture for creating a job tracker on a json tracker file with one job."""
+    gv = {'TRACKER_FILE_PATH': str(tmp_path / 'job_log.json'), 'TRACKER_BACKEND': 'json'}
+    cache = get_tracker_cache(gv)
+    cache.storage.create()
+    cache.storage.dump({'a': job_dict('a')})
+    yield JobTracker(None, gv)
+
+def test_index_update_events():
+    """Test case to ensure updating the index returns an event per change."""
+    tracker_dict = {'a': job_dict('a'), 'b': job_dict('b')}
+    index = TrackerIndex()
+    index.rebuild(tracker_dict)
+
+    tracker_dict['a']['status'] = 'VERWERKT'
+    tracker_dict['b']['make_files']['part.dxf']['done'] = True
+    tracker_dict['c'] = job_dict('c')
+
+    assert index.update(tracker_dict, ['a', 'b', 'c']) == [
+            TrackerEvent(STATUS_CHANGED, job_name='a', status='VERWERKT', old_status='WACHTRIJ'),
+            TrackerEvent(FILE_DONE_TOGGLED, job_name='b', status='WACHTRIJ',
+                         file_global_path='/jobs/b/part.dxf', done=True),
+            TrackerEvent(JOB_ADDED, job_name='c', status='WACHTRIJ')]
+
+    tracker_dict.pop('c')
+    tracker_dict['b']['make_files'].pop('part.dxf')
+    assert index.update(tracker_dict, ['b', 'c']) == [
+            TrackerEvent(JOB_FILES_CHANGED, job_name='b', status='WACHTRIJ'),
+            TrackerEvent(JOB_REMOVED, job_name='c', status='WACHTRIJ')]
+
+def test_rename_is_one_event():
+    """Test case to ensure a removed and added job with the same job folder is a rename."""
+    tracker_dict = {'a': job_dict('a')}
+    index = TrackerIndex()
+    index.rebuild(tracker_dict)
+
+    tracker_dict['a_new'] = dict(tracker_dict.pop('a'), job_name='a_new')
+
+    assert index.update(tracker_dict, ['a_new', 'a']) == [
+            TrackerEvent(JOB_RENAMED, job_name='a_new', status='WACHTRIJ', old_job_name='a', old_status='WACHTRIJ')]
+
+def test_feed_drops_garbage_collected_subscribers():
+    """Test case to ensure the feed does not keep subscribers alive."""
+    feed = TrackerEventFeed()
+    recorder = EventRecorder()
+    feed.subscribe(recorder.record)
+    feed.publish([TrackerEvent(TRACKER_RELOADED)])
+    assert recorder.events == [TrackerEvent(TRACKER_RELOADED)]
+
+    del recorder
+    feed.publish([TrackerEvent(TRACKER_RELOADED)])
+    assert feed.subscriptions == {}
+
+def test_job_tracker_publishes_events(job_tracker):
+    """Test case to ensure job tracker mutations publish events after writing."""
+    recorder = EventRecorder()
+    job_tracker.subscribeToChanges(recorder.record)
+
+    job_tracker.markFilesAsDone('a', '/jobs/a/part.dxf', True)
+    job_tracker.updateJobName('a', 'b')
+    job_tracker.updateJobKey('status', 'b', 'VERWERKT')
+
+    assert [event.kind for event in recorder.events] == [FILE_DONE_TOGGLED, JOB_RENAMED, STATUS_CHANGED]
+
+def test_transaction_publishes_on_commit(job_tracker):
+    """Test case to ensure events of a transaction are published once it commits, and dropped on rollback."""
+    recorder = EventRecorder()
+    job_tracker.subscribeToChanges(recorder.record)
+
+    with job_tracker.transaction():
+        job_tracker.updateJobKey('status', 'a', 'VERWERKT')
+        assert recorder.events == []
+    assert [event.kind for event in recorder.events] == [STATUS_CHANGED]
+
+    with pytest.raises(AssertionError):
+        with job_tracker.transaction():
+            job_tracker.updateJobKey('status', 'a', 'AFGEKEURD')
+            job_tracker.updateJobKey('status', 'unknown', 'AFGEKEURD')
+    assert len(recorder.events) == 1
+
+def test_load_count_changes_on_external_write(job_tracker):
+    """Test case to ensure only writes from outside the process change the load count."""
+    load_count = job_tracker.getTrackerLoadCount()
+    job_tracker.updateJobKey('status', 'a', 'VERWERKT')
+    assert job_tracker.getTrackerLoadCount() == load_count
+
+    job_tracker.tracker_cache.storage.dump({'a': job_dict('a'), 'b': job_dict('b')})
+    assert job_tracker.getTrackerLoadCount() == load_count + 1
+
+def test_changed_dynamic_job_name_updates_row(job_tracker, qapp):
+    """Test case to ensure a changed dynamic job name is an event that updates the row of the job."""
+    parent = QWidget()
+    overview = JobsOverviewQListWidget(parent, job_tracker.gv, job_tracker)
+    overview.refresh()
+    assert overview.item(0).text() == 'a'
+
+    recorder = EventRecorder()
+    job_tracker.subscribeToChanges(recorder.record)
+    job_tracker.updateJobKey('dynamic_job_name', 'a', '18-10_a')
+
+    assert recorder.events == [TrackerEvent(JOB_CHANGED, job_name='a', status='WACHTRIJ')]
+    assert (overview.count(), overview.item(0).text(), overview.item(0).data(1)) == (1, '18-10_a', 'a')
@@ -0,0 +1,136 @@
+from datetime import datetime
+
+from src.tracker_index import TrackerIndex
+
+
+def job_dict(job_name, status='WACHTRIJ', material='MDF', thickness='3'):
+    return {'job_name': job_name,
+            'status': status,
+            'job_folder_global_path': f'/jobs/{job_name}',
+            'make_files': {'part.dxf': {'file_global_path': f'/jobs/{job_name}/part.dxf',
+                                        'material': material,
+                                        'thickness': thickness,
+                                        'done': False}}}
+
+def test_rebuild():
+    """Test case to ensure all lookups find the indexed jobs."""
+    tracker_dict = {'a': job_dict('a'), 'b': job_dict('b', status='VERWERKT'), 'c': job_dict('c', thickness='4')}
+    index = TrackerIndex()
+    index.rebuild(tracker_dict)
+
+    assert index.getJobNamesWithStatus('WACHTRIJ') == ['a', 'c']
+    assert index.getNumberOfJobsWithStatus('VERWERKT') == 1
+    assert index.getJobNameFromPath('/jobs/b/part.dxf') == 'b'
+    assert index.getJobNameFromPath('/jobs/b') == 'b'
+    assert index.getJobNameFromPath('/jobs/unknown/part.dxf') is None
+    assert index.getMakeFileFromPath('/jobs/c/part.dxf') == ('c', 'part.dxf')
+    assert sorted(index.getMaterialKeys('WACHTRIJ')) == [('MDF', '3'), ('MDF', '4')]
+    assert index.getMakeFiles('WACHTRIJ', 'MDF', '3') == [('a', 'part.dxf')]
+
+def test_job_folder_is_not_a_prefix_match():
+    """Test case to ensure a job folder only matches paths inside that folder."""
+    index = TrackerIndex()
+    index.rebuild({'a': job_dict('a'), 'a_(2)': job_dict('a_(2)')})
+
+    assert index.getJobNameFromPath('/jobs/a_(2)/part.dxf') == 'a_(2)'
+
+def test_update():
+    """Test case to ensure changed and removed jobs are indexed again."""
+    tracker_dict = {'a': job_dict('a'), 'b': job_dict('b')}
+    index = TrackerIndex()
+    index.rebuild(tracker_dict)
+
+    tracker_dict['a']['status'] = 'VERWERKT'
+    tracker_dict['c'] = tracker_dict.pop('b')
+    tracker_dict['c']['job_folder_global_path'] = '/jobs/c'
+    index.update(tracker_dict, ['a', 'b', 'c'])
+
+    assert index.getJobNamesWithStatus('WACHTRIJ') == ['c']
+    assert index.getJobNamesWithStatus('VERWERKT') == ['a']
+    assert index.getJobNameFromPath('/jobs/b/part.dxf') is None
+    assert index.getJobNameFromPath('/jobs/c/part.dxf') == 'c'
+    assert index.getMakeFiles('WACHTRIJ', 'MDF', '3') == [('c', 'part.dxf')]
+    assert index.getMakeFiles('VERWERKT', 'MDF', '3') == [('a', 'part.dxf')]
+
+    index.update(tracker_dict, ['a', 'c'])
+    index.update({}, ['a', 'c'])
+    assert index.status_index == {}
+    assert index.file_path_index == {}
+    assert index.material_index == {}
+
+def test_highest_job_name_suffix():
+    """Test case to ensure the highest suffix follows added, renamed and removed jobs."""
+    tracker_dict = {'a': job_dict('a'), 'a_(1)': job_dict('a_(1)'), 'a_(3)': job_dict('a_(3)'),
+                    'b.*': job_dict('b.*'), 'xa_(7)': job_dict('xa_(7)')}
+    index = TrackerIndex()
+    index.rebuild(tracker_dict)
+
+    assert index.getHighestJobNameSuffix('a') == 3
+    assert index.getHighestJobNameSuffix('a_(3)') == 0
+    assert index.getHighestJobNameSuffix('b.*') == 0
+    assert index.getHighestJobNameSuffix('b') is None
+
+    # rename a_(3) to c
+    tracker_dict['c'] = tracker_dict.pop('a_(3)')
+    index.update(tracker_dict, ['c', 'a_(3)'])
+    assert index.getHighestJobNameSuffix('a') == 1
+
+    tracker_dict.pop('a')
+    tracker_dict.pop('a_(1)')
+    index.update(tracker_dict, ['a', 'a_(1)'])
+    assert index.getHighestJobNameSuffix('a') is None
+
+def test_expired_job_names():
+    """Test case to ensure only old jobs outside the wachtrij expire."""
+    tracker_dict = {'a': dict(job_dict('a', status='VERWERKT'), created_on_timestamp=100.0),
+                    'b': dict(job_dict('b', status='WACHTRIJ'), created_on_timestamp=50.0),
+                    'c': dict(job_dict('c', status='AFGEKEURD'), created_on_timestamp=300.0),
+                    'd': dict(job_dict('d', status='VERWERKT'), created_on_timestamp=200.0)}
+    index = TrackerIndex()
+    index.rebuild(tracker_dict)
+
+    assert index.getExpiredJobNames(200.0) == ['a', 'd']
+    assert index.getExpiredJobNames(10.0) == []
+
+    tracker_dict['b']['status'] = 'VERWERKT'
+    tracker_dict.pop('a')
+    index.update(tracker_dict, ['a', 'b'])
+    assert index.getExpiredJobNames(1000.0) == ['b', 'd', 'c']
+
+def test_expiry_falls_back_to_created_on_date():
+    """Test case to ensure jobs without a timestamp expire on their creation date."""
+    index = TrackerIndex()
+    index.rebuild({'a': dict(job_dict('a', status='VERWERKT'), created_on_date='02-01-2020')})
+
+    assert index.getExpiredJobNames(datetime(2020, 1, 1).timestamp()) == []
+    assert index.getExpiredJobNames(datetime(2020, 1, 2).timestamp()) == ['a']
+
+def test_stats_follow_updates():
+    """Test case to ensure the counters per status and material match a full recount after every update."""
+    tracker_dict = {'a': job_dict('a'), 'b': job_dict('b', material='Plexiglas'), 'c': job_dict('c', thickness='4')}
+    tracker_dict['a']['make_files']['plate.dxf'] = dict(tracker_dict['a']['make_files']['part.dxf'],
+                                                        file_global_path='/jobs/a/plate.dxf', done=True)
+    index = TrackerIndex()
+    index.rebuild(tracker_dict)
+
+    assert index.getStats() == {'jobs_per_status': {'WACHTRIJ': 3},
+                                'jobs_in_queue': 3,
+                                'materials_in_queue': {'MDF': {'jobs': 2, 'make_files': 3, 'make_files_not_done': 2},
+                                                       'Plexiglas': {'jobs': 1, 'make_files': 1, 'make_files_not_done': 1}}}
+
+    tracker_dict['a']['make_files']['part.dxf']['done'] = True
+    tracker_dict['b']['status'] = 'VERWERKT'
+    tracker_dict.pop('c')
+    index.update(tracker_dict, ['a', 'b', 'c'])
+
+    assert index.getStats() == {'jobs_per_status': {'WACHTRIJ': 1, 'VERWERKT': 1},
+                                'jobs_in_queue': 1,
+                                'materials_in_queue': {'MDF': {'jobs': 1, 'make_files': 2, 'make_files_not_done': 0}}}
+    assert index.getStats(['WACHTRIJ', 'VERWERKT'])['jobs_in_queue'] == 2
+    assert index.getMaterialKeysNotDone('WACHTRIJ') == []
+
+    index.update(tracker_dict, ['a', 'b'])
+    rebuilt_index = TrackerIndex()
+    rebuilt_index.rebuild(tracker_dict)
+    assert index.not_done_counts == rebuilt_index.not_done_counts
+    assert index.material_job_counts == rebuilt_index.material_job_counts
@@ -0,0 +1,67 @@
+from src.tracker_index import TrackerIndex
+from src.tracker_query import plan_job_query, plan_make_file_query, query_jobs, query_make_files
+
+
+def job_dict(job_name, status='WACHTRIJ', material='MDF', thickness='3', created_on_timestamp=0.0):
+    return {'job_name': job_name,
+            'dynamic_job_name': job_name.upper(),
+            'status': status,
+            'created_on_timestamp': created_on_timestamp,
+            'job_folder_global_path': f'/jobs/{job_name}',
+            'make_files': {'part.dxf': {'file_global_path': f'/jobs/{job_name}/part.dxf',
+                                        'material': material,
+                                        'thickness': thickness,
+                                        'done': False},
+                           'plate.dxf': {'file_global_path': f'/jobs/{job_name}/plate.dxf',
+                                         'material': material,
+                                         'thickness': '5',
+                                         'done': True}}}
+
+def create_tracker():
+    tracker_dict = {'a': job_dict('a', created_on_timestamp=3.0),
+                    'b': job_dict('b', status='VERWERKT', material='Plexiglas', created_on_timestamp=1.0),
+                    'c': job_dict('c', material='Plexiglas', created_on_timestamp=2.0),
+                    'd': job_dict('d', status='GESLICED')}
+    index = TrackerIndex()
+    index.rebuild(tracker_dict)
+    return tracker_dict, index
+
+def test_query_jobs():
+    """Test case to ensure jobs are filtered, sorted, projected and limited."""
+    tracker_dict, index = create_tracker()
+
+    assert query_jobs(tracker_dict, index, where={'status': 'WACHTRIJ'}) == ['a', 'c']
+    assert query_jobs(tracker_dict, index, where={'status': ('WACHTRIJ', 'GESLICED')},
+                      order_by='created_on_timestamp', fields=('job_name', 'dynamic_job_name')) == \
+        [('d', 'D'), ('c', 'C'), ('a', 'A')]
+    assert query_jobs(tracker_dict, index, order_by='created_on_timestamp', descending=True,
+                      fields='job_name', limit=2) == ['a', 'c']
+    assert query_jobs(tracker_dict, index, where={'job_name': lambda job_name: job_name > 'b',
+                                                  'status': 'WACHTRIJ'}) == ['c']
+    assert query_jobs(tracker_dict, index, where={'job_folder_global_path': '/jobs/b/'}) == []
+    assert query_jobs(tracker_dict, index, where={'job_folder_global_path': '/jobs/b'}) == ['b']
+
+def test_query_make_files():
+    """Test case to ensure make files are filtered on file and job fields."""
+    tracker_dict, index = create_tracker()
+
+    assert query_make_files(tracker_dict, index, where={'status': 'WACHTRIJ', 'material': 'MDF', 'thickness': '3'},
+                            fields=('file_key', 'file_global_path', 'done')) == [('part.dxf', '/jobs/a/part.dxf', False)]
+    assert query_make_files(tracker_dict, index, where={'material': 'Plexiglas', 'done': True}) == \
+        [('b', 'plate.dxf'), ('c', 'plate.dxf')]
+    assert query_make_files(tracker_dict, index, where={'file_global_path': '/jobs/d/part.dxf'}, fields='status') == \
+        ['GESLICED']
+    assert set(query_make_files(tracker_dict, index, where={'status': 'WACHTRIJ'}, fields='material')) == \
+        {'MDF', 'Plexiglas'}
+    assert len(query_make_files(tracker_dict, index, where={'done': False})) == 4
+
+def test_index_selection():
+    """Test case to ensure conditions an index answers use that index and other conditions scan."""
+    _, index = create_tracker()
+
+    assert plan_job_query(index, {'status': 'WACHTRIJ', 'created_on_timestamp': 3.0})[0] == 'status_index'
+    assert plan_job_query(index, {'job_folder_global_path': '/jobs/a'}) == ('job_folder_index', ['a'])
+    assert plan_job_query(index, {'status': lambda status: status != 'VERWERKT'}) == ('scan', None)
+    assert plan_make_file_query(index, {'material': 'MDF', 'thickness': ('3', '4')}) == \
+        ('material_index', [('a', 'part.dxf'), ('d', 'part.dxf')])
+    assert plan_make_file_query(index, {'done': False}) == ('scan', None)
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from src.job_tracker import JobTracker
+from src.tracker_cache import get_tracker_cache
+from src.tracker_search import SearchIndex
+from src.tracker_serializers import create_benchmark_tracker_dict
+
+
+def job_dict(job_name, sender_name='Sender Name', material='MDF', status='WACHTRIJ'):
+    return {'job_name': job_name,
+            'dynamic_job_name': job_name,
+            'status': status,
+            'job_folder_global_path': f'/jobs/{job_name}',
+            'sender_name': sender_name,
+            'sender_mail_adress': 'sender@example.com',
+            'make_files': {'part.dxf': {'file_name': 'part.dxf',
+                                        'file_global_path': f'/jobs/{job_name}/part.dxf',
+                                        'material': material,
+                                        'done': False}}}
+
+@pytest.fixture
+def job_tracker(tmp_path):
+    """Fixture for creating a job tracker on a json tracker file with three jobs."""
+    gv = {'TRACKER_FILE_PATH': str(tmp_path / 'job_log.json'), 'TRACKER_BACKEND': 'json'}
+    cache = get_tracker_cache(gv)
+    cache.storage.create()
+    cache.storage.dump({'bracket': job_dict('bracket', sender_name='Anna de Vries'),
+                        'plate': job_dict('plate', material='Plexiglas'),
+                        'anna_box': job_dict('anna_box')})
+    yield JobTracker(None, gv)
+
+def test_search_ranks_and_matches_all_terms():
+    """Test case to ensure every query word should match and job names rank above other fields."""
+    index = SearchIndex()
+    index.addJob('bracket', job_dict('bracket', sender_name='Anna de Vries'))
+    index.addJob('anna_box', job_dict('anna_box'))
+    index.addJob('plate', job_dict('plate', material='Plexiglas'))
+
+    scores = index.search('ANN')
+    assert sorted(scores, key=scores.get, reverse=True) == ['anna_box', 'bracket']
+    assert list(index.search('anna plexi')) == []
+    assert list(index.search('plexi part')) == ['plate']
+    assert list(index.search('Ännä')) == list(index.search('anna'))
+
+def test_remove_job_cleans_vocabulary():
+    """Test case to ensure removing a job removes the words no other job has."""
+    index = SearchIndex()
+    index.addJob('plate', job_dict('plate', material='Plexiglas'))
+    index.addJob('bracket', job_dict('bracket'))
+
+    index.removeJob('plate')
+    assert index.getTokensWithPrefix('pl') == []
+    assert list(index.search('mdf')) == ['bracket']
+    assert index.vocabulary == sorted(index.postings)
+
+def test_search_follows_tracker_changes(job_tracker):
+    """Test case to ensure the search index follows added, renamed, changed and removed jobs."""
+    assert job_tracker.searchJobs('plexi') == [('plate', 'plate')]
+
+    job_tracker.updateJobName('plate', 'window')
+    job_tracker.updateJobKey('status', 'bracket', 'VERWERKT')
+    assert job_tracker.searchJobs('plexi') == [('window', 'window')]
+    assert job_tracker.searchJobs('verwerkt') == [('bracket', 'bracket')]
+    assert job_tracker.searchJobs('plate') == []
+
+def test_search_includes_archived_jobs(job_tracker):
+    """Test case to ensure archived jobs are found once and marked as archived."""
+    job_tracker.job_archive.archiveJobs([job_dict('old_plate', material='Plexiglas'), job_dict('plate')])
+
+    assert job_tracker.searchJobs('plexi') == [('plate', 'plate'), ('old_plate', 'old_plate (archived)')]
+    assert job_tracker.searchJobs('plexi', include_archived=False) == [('plate', 'plate')]
+
+def test_empty_query_returns_all_jobs(job_tracker):
+    """Test case to ensure a query without words returns all jobs."""
+    assert sorted(job_tracker.searchJobs(' ')) == [('anna_box', 'anna_box'), ('bracket', 'bracket'), ('plate', 'plate')]
+
+def test_search_is_fast_for_many_jobs():
+    """Test case to ensure a search among tens of thousands of jobs takes about a millisecond, exact matches first."""
+    index = SearchIndex()
+    index.rebuild(create_benchmark_tracker_dict(20000))
+
+    start_time = time.perf_counter()
+    for _ in range(100):
+        scores = index.search('job_1234')
+    search_seconds = (time.perf_counter() - start_time) / 100
+
+    assert max(scores, key=scores.get) == 'job_1234'
+    assert len(scores) == 11
+    assert search_seconds < 0.005
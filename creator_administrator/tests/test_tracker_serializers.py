@@ -0,0 +1,57 @@
+import pytest
+
+from src.tracker_serializers import (SERIALIZERS, TrackerFormatError, benchmark_serializers,
+                                     create_benchmark_tracker_dict, read_tracker_file, write_tracker_file_atomic)
+from src.tracker_storage import create_tracker_storage
+
+
+@pytest.mark.parametrize('tracker_format', list(SERIALIZERS))
+def test_round_trip(tmp_path, tracker_format):
+    """Test case to ensure every format loads what it dumped, detected from the file."""
+    tracker_dict = create_benchmark_tracker_dict(10)
+    file_path = str(tmp_path / 'job_log.json')
+
+    write_tracker_file_atomic(file_path, tracker_dict, SERIALIZERS[tracker_format])
+    assert read_tracker_file(file_path) == tracker_dict
+
+def test_compact_formats_are_smaller():
+    """Test case to ensure the compact formats write smaller files than pretty json."""
+    sizes = {result[0]: result[2] for result in benchmark_serializers((100,))}
+
+    assert sizes['compact_json'] < sizes['json']
+    assert sizes['marshal'] < sizes['json']
+
+def test_truncated_binary_file(tmp_path):
+    """Test case to ensure a truncated binary tracker file raises a TrackerFormatError."""
+    file_path = str(tmp_path / 'job_log.json')
+    write_tracker_file_atomic(file_path, create_benchmark_tracker_dict(10), SERIALIZERS['marshal'])
+
+    with open(file_path, 'rb') as tracker_file:
+        data = tracker_file.read()
+    with open(file_path, 'wb') as tracker_file:
+        tracker_file.write(data[:-20])
+
+    with pytest.raises(TrackerFormatError):
+        read_tracker_file(file_path)
+
+@pytest.mark.parametrize('tracker_backend', ['json', 'journal'])
+def test_switch_format(tmp_path, tracker_backend):
+    """Test case to ensure a tracker written in one format is loaded after changing TRACKER_FORMAT."""
+    gv = {'TRACKER_FILE_PATH': str(tmp_path / 'job_log.json'), 'TRACKER_BACKEND': tracker_backend, 'TRACKER_FORMAT': 'json'}
+    tracker_dict = create_benchmark_tracker_dict(10)
+    storage = create_tracker_storage(gv)
+    storage.create()
+    storage.dump(tracker_dict)
+
+    gv['TRACKER_FORMAT'] = 'marshal'
+    storage = create_tracker_storage(gv)
+    assert storage.load() == tracker_dict
+
+    tracker_dict.pop('job_0')
+    storage.dump(tracker_dict, removed_job_names=['job_0'])
+    if tracker_backend == 'journal':
+        storage.compact()
+    assert storage.load() == tracker_dict
+
+    with open(gv['TRACKER_FILE_PATH'], 'rb') as tracker_file:
+        assert tracker_file.read(1) == b'\x00'
@@ -0,0 +1,110 @@
+import json
+
+from src.tracker_storage import JsonTrackerStorage, SQLiteTrackerStorage, JournalTrackerStorage,\
+        migrate_json_to_sqlite, replay_journal_records
+
+
+def job_dict(job_name):
+    return {'job_name': job_name,
+            'status': 'WACHTRIJ',
+            'job_folder_global_path': f'/jobs/{job_name}',
+            'make_files': {'part.dxf': {'file_global_path': f'/jobs/{job_name}/part.dxf',
+                                        'material': 'MDF',
+                                        'thickness': '3',
+                                        'done': False}}}
+
+def test_sqlite_dump_and_load(tmp_path):
+    """Test case to ensure the SQLite storage returns what was dumped."""
+    storage = SQLiteTrackerStorage(str(tmp_path / 'job_log.sqlite'))
+    storage.create()
+
+    tracker_dict = {'a': job_dict('a'), 'b': job_dict('b')}
+    storage.dump(tracker_dict)
+    assert storage.load() == tracker_dict
+
+def test_sqlite_partial_dump(tmp_path):
+    """Test case to ensure only changed and removed jobs are written."""
+    storage = SQLiteTrackerStorage(str(tmp_path / 'job_log.sqlite'))
+    storage.dump({'a': job_dict('a'), 'b': job_dict('b')})
+
+    tracker_dict = storage.load()
+    tracker_dict['a']['status'] = 'VERWERKT'
+    tracker_dict['a']['make_files']['part.dxf']['done'] = True
+    tracker_dict.pop('b')
+    tracker_dict['c'] = job_dict('c')
+    storage.dump(tracker_dict, changed_job_names=['a', 'c'], removed_job_names=['b'])
+
+    assert storage.load() == tracker_dict
+    assert list(storage.load()) == ['a', 'c']
+
+def test_migrate_json_to_sqlite(tmp_path):
+    """Test case to ensure all jobs are migrated from the json tracker file."""
+    json_file_path = str(tmp_path / 'job_log.json')
+    sqlite_file_path = str(tmp_path / 'job_log.sqlite')
+
+    tracker_dict = {'a': job_dict('a'), 'b': job_dict('b')}
+    with open(json_file_path, 'w') as tracker_file:
+        json.dump(tracker_dict, tracker_file)
+
+    assert migrate_json_to_sqlite(json_file_path, sqlite_file_path) == 2
+    assert SQLiteTrackerStorage(sqlite_file_path).load() == JsonTrackerStorage(json_file_path).load()
+
+def test_journal_replay(tmp_path):
+    """Test case to ensure the journal is replayed over the snapshot."""
+    storage = JournalTrackerStorage(str(tmp_path / 'job_log.json'))
+    storage.create()
+
+    tracker_dict = {'a': job_dict('a'), 'b': job_dict('b')}
+    storage.dump(tracker_dict, changed_job_names=['a', 'b'])
+    tracker_dict['a']['status'] = 'VERWERKT'
+    tracker_dict['c'] = tracker_dict.pop('b')
+    storage.dump(tracker_dict, changed_job_names=['a', 'c'], removed_job_names=['b'])
+
+    assert JsonTrackerStorage(storage.storage_path).load() == {}
+    assert storage.load() == tracker_dict
+
+def test_journal_torn_tail(tmp_path):
+    """Test case to ensure an interrupted append is ignored and cut off."""
+    storage = JournalTrackerStorage(str(tmp_path / 'job_log.json'))
+    storage.create()
+    storage.dump({'a': job_dict('a')}, changed_job_names=['a'])
+
+    with open(storage.journal_path, 'ab') as journal_file:
+        journal_file.write(b'{"op": "put", "job_name": "b", "job_d')
+
+    assert list(storage.load()) == ['a']
+
+    storage.dump({'a': job_dict('a'), 'c': job_dict('c')}, changed_job_names=['c'])
+    assert list(storage.load()) == ['a', 'c']
+
+def test_journal_compaction(tmp_path):
+    """Test case to ensure compaction keeps the tracker and empties the journal."""
+    storage = JournalTrackerStorage(str(tmp_path / 'job_log.json'))
+    storage.create()
+
+    tracker_dict = {}
+    for job_name in ('a', 'b', 'c'):
+        tracker_dict[job_name] = job_dict(job_name)
+        storage.dump(tracker_dict, changed_job_names=[job_name])
+    tracker_dict.pop('b')
+    storage.dump(tracker_dict, removed_job_names=['b'])
+
+    with open(storage.journal_path, 'rb') as journal_file:
+        old_journal_bytes = journal_file.read()
+
+    storage.compact()
+    assert JsonTrackerStorage(storage.storage_path).load() == tracker_dict
+    assert storage.load() == tracker_dict
+
+    # a crash after replacing the snapshot leaves the old journal, replaying it is harmless
+    with open(storage.journal_path, 'wb') as journal_file:
+        journal_file.write(old_journal_bytes)
+    assert storage.load() == tracker_dict
+
+def test_replay_journal_records():
+    """Test case to ensure put and pop records are applied in order."""
+    tracker_dict = {'a': job_dict('a')}
+    replay_journal_records(tracker_dict, [{'op': 'put', 'job_name': 'b', 'job_dict': job_dict('b')},
+                                          {'op': 'pop', 'job_name': 'a'},
+                                          {'op': 'pop', 'job_name': 'x'}])
+    assert tracker_dict == {'b': job_dict('b')}